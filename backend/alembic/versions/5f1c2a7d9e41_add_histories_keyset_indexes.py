@@ -0,0 +1,58 @@
+"""add histories keyset indexes
+
+Revision ID: 5f1c2a7d9e41
+Revises: 34da144647d5
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f1c2a7d9e41"
+down_revision: Union[str, Sequence[str], None] = "34da144647d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 稼働中のテーブルへの書き込みを止めないよう、トランザクション外でCONCURRENTLYに作成する
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_histories_user_id_created_at_id",
+            "histories",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_histories_user_id_type_created_at_id",
+            "histories",
+            ["user_id", "type", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_histories_user_id_type_created_at_id",
+            table_name="histories",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_histories_user_id_created_at_id",
+            table_name="histories",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
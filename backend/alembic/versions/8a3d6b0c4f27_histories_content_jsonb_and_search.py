@@ -0,0 +1,159 @@
+"""histories content jsonb and search
+
+Revision ID: 8a3d6b0c4f27
+Revises: 5f1c2a7d9e41
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8a3d6b0c4f27"
+down_revision: Union[str, Sequence[str], None] = "5f1c2a7d9e41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 既存行の埋め戻しを1トランザクションあたりこの件数ずつ行う
+BACKFILL_BATCH_ROWS = 5000
+
+# content（rags/llmsの各項目）から危険性・有害性とリスク低減措置の文字列を取り出す
+SEARCH_TEXT_FUNCTION = """
+CREATE OR REPLACE FUNCTION history_search_text(c jsonb) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT string_agg(
+        concat_ws(E'\\n', item->>'危険性・有害性', item->>'リスク低減措置'), E'\\n'
+    )
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(c->'rags') = 'array' THEN c->'rags' ELSE '[]'::jsonb END
+        || CASE WHEN jsonb_typeof(c->'llms') = 'array' THEN c->'llms' ELSE '[]'::jsonb END
+    ) AS item
+$$
+"""
+
+# 日本語は分かち書きされないため、1文字と2文字のn-gramで索引する（空白を含むものは除く）。
+# pg_trgmの3-gramでは「墜落」のような2文字の語に索引が効かない
+NGRAMS_FUNCTION = """
+CREATE OR REPLACE FUNCTION history_ngrams(t text) RETURNS text[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(array_agg(DISTINCT g), '{}')
+    FROM (
+        SELECT substr(lower(t), i, 1) AS g FROM generate_series(1, length(t)) AS i
+        UNION ALL
+        SELECT substr(lower(t), i, 2) FROM generate_series(1, length(t) - 1) AS i
+    ) AS grams
+    WHERE g !~ '\\s'
+$$
+"""
+
+# 移行中: JSON列への書き込みをjsonb列・検索用の列にも反映する
+TRANSITION_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION histories_search_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.content_jsonb := NEW.content::jsonb;
+    NEW.search_text := history_search_text(NEW.content_jsonb);
+    NEW.search_ngrams := history_ngrams(NEW.search_text);
+    RETURN NEW;
+END
+$$
+"""
+
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION histories_search_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_text := history_search_text(NEW.content);
+    NEW.search_ngrams := history_ngrams(NEW.search_text);
+    RETURN NEW;
+END
+$$
+"""
+
+CREATE_TRIGGER = """
+CREATE TRIGGER histories_search_update
+BEFORE INSERT OR UPDATE OF content ON histories
+FOR EACH ROW EXECUTE FUNCTION histories_search_update()
+"""
+
+
+def _backfill() -> None:
+    """既存行をid範囲ごとに更新してトリガーを通す（バッチごとにコミット）"""
+    backfill = (
+        "UPDATE histories SET content = content "
+        "WHERE id >= {start} AND id < {end} AND content_jsonb IS NULL"
+    )
+    if context.is_offline_mode():
+        op.execute(backfill.format(start=0, end=2**31 - 1))
+        return
+    connection = op.get_bind()
+    max_id = connection.execute(sa.text("SELECT max(id) FROM histories")).scalar()
+    for start in range(0, (max_id or 0) + 1, BACKFILL_BATCH_ROWS):
+        connection.execute(
+            sa.text(backfill.format(start=start, end=start + BACKFILL_BATCH_ROWS))
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ALTER COLUMN ... TYPE jsonbはテーブルを書き換える間ロックし続けるため、
+    # 新しい列を追加→トリガーで同期→バッチで埋め戻し→列を入れ替える手順で移行する
+    op.add_column("histories", sa.Column("content_jsonb", postgresql.JSONB()))
+    op.add_column("histories", sa.Column("search_text", sa.Text()))
+    op.add_column("histories", sa.Column("search_ngrams", postgresql.ARRAY(sa.Text())))
+    op.execute(SEARCH_TEXT_FUNCTION)
+    op.execute(NGRAMS_FUNCTION)
+    op.execute(TRANSITION_TRIGGER_FUNCTION)
+    op.execute(CREATE_TRIGGER)
+
+    with op.get_context().autocommit_block():
+        _backfill()
+        op.create_index(
+            "ix_histories_content",
+            "histories",
+            ["content_jsonb"],
+            postgresql_using="gin",
+            postgresql_ops={"content_jsonb": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_histories_search_ngrams",
+            "histories",
+            ["search_ngrams"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+    # 入れ替えはカタログの変更だけなので、排他ロックは短時間で済む。
+    # トリガーは旧content列に依存するため作り直す
+    op.execute("LOCK TABLE histories IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER histories_search_update ON histories")
+    op.drop_column("histories", "content")
+    op.alter_column("histories", "content_jsonb", new_column_name="content")
+    op.execute(TRIGGER_FUNCTION)
+    op.execute(CREATE_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS histories_search_update ON histories")
+    op.execute("DROP FUNCTION IF EXISTS histories_search_update()")
+    op.drop_index("ix_histories_search_ngrams", table_name="histories")
+    op.drop_index("ix_histories_content", table_name="histories")
+    op.drop_column("histories", "search_ngrams")
+    op.drop_column("histories", "search_text")
+    op.execute("DROP FUNCTION IF EXISTS history_ngrams(text)")
+    op.execute("DROP FUNCTION IF EXISTS history_search_text(jsonb)")
+    op.alter_column(
+        "histories",
+        "content",
+        type_=sa.JSON(),
+        postgresql_using="content::json",
+    )
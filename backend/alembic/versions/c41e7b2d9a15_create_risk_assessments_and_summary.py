@@ -0,0 +1,191 @@
+"""create risk assessments and summary
+
+Revision ID: c41e7b2d9a15
+Revises: 8a3d6b0c4f27
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e7b2d9a15"
+down_revision: Union[str, Sequence[str], None] = "8a3d6b0c4f27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SUMMARY_KEYS = (
+    "user_id, severity, probability, risk_level, "
+    "severity_after, probability_after, risk_level_after, measure_type"
+)
+
+# 変更された行をキーごとにまとめ、集計表へ差分を加算する。
+# 行単位ではなく文単位のトリガーなので、COPYなどの一括投入でも集計表の更新は1回で済む。
+# ORDER BYでロック順をそろえ、同時に走る更新どうしのデッドロックを避ける
+SUMMARY_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION risk_metrics_summary_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO risk_metrics_summary AS s
+            ({SUMMARY_KEYS}, row_count, risk_score_sum, risk_score_after_sum)
+        SELECT {SUMMARY_KEYS}, -count(*), -sum(risk_score), -sum(risk_score_after)
+        FROM old_rows
+        GROUP BY {SUMMARY_KEYS}
+        ORDER BY {SUMMARY_KEYS}
+        ON CONFLICT ({SUMMARY_KEYS}) DO UPDATE SET
+            row_count = s.row_count + EXCLUDED.row_count,
+            risk_score_sum = s.risk_score_sum + EXCLUDED.risk_score_sum,
+            risk_score_after_sum = s.risk_score_after_sum + EXCLUDED.risk_score_after_sum;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO risk_metrics_summary AS s
+            ({SUMMARY_KEYS}, row_count, risk_score_sum, risk_score_after_sum)
+        SELECT {SUMMARY_KEYS}, count(*), sum(risk_score), sum(risk_score_after)
+        FROM new_rows
+        GROUP BY {SUMMARY_KEYS}
+        ORDER BY {SUMMARY_KEYS}
+        ON CONFLICT ({SUMMARY_KEYS}) DO UPDATE SET
+            row_count = s.row_count + EXCLUDED.row_count,
+            risk_score_sum = s.risk_score_sum + EXCLUDED.risk_score_sum,
+            risk_score_after_sum = s.risk_score_after_sum + EXCLUDED.risk_score_after_sum;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# 遷移テーブルを使うトリガーは1つのイベントにしか付けられないため、3つに分ける
+TRIGGERS = {
+    "risk_assessments_summary_insert": ("INSERT", "NEW TABLE AS new_rows"),
+    "risk_assessments_summary_update": (
+        "UPDATE",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    ),
+    "risk_assessments_summary_delete": ("DELETE", "OLD TABLE AS old_rows"),
+}
+
+
+def _score(suffix: str = "") -> str:
+    return f"severity{suffix} + probability{suffix} + exposure{suffix}"
+
+
+def _level(suffix: str = "") -> str:
+    score = _score(suffix)
+    return (
+        f"CASE WHEN {score} >= 15 THEN 'IV' WHEN {score} >= 12 THEN 'III' "
+        f"WHEN {score} >= 8 THEN 'II' ELSE 'I' END"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "risk_assessments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("work", sa.String(length=200), nullable=False),
+        sa.Column("work_element", sa.String(length=200), nullable=False),
+        sa.Column("knowledge_file", sa.String(length=200), nullable=True),
+        sa.Column("reference", sa.Text(), nullable=True),
+        sa.Column("hazard", sa.Text(), nullable=False),
+        sa.Column("risk_reduction", sa.Text(), nullable=False),
+        sa.Column("measure_type", sa.String(length=20), nullable=False),
+        sa.Column("severity", sa.SmallInteger(), nullable=False),
+        sa.Column("probability", sa.SmallInteger(), nullable=False),
+        sa.Column("exposure", sa.SmallInteger(), nullable=False),
+        sa.Column("severity_after", sa.SmallInteger(), nullable=False),
+        sa.Column("probability_after", sa.SmallInteger(), nullable=False),
+        sa.Column("exposure_after", sa.SmallInteger(), nullable=False),
+        sa.Column(
+            "risk_score", sa.SmallInteger(), sa.Computed(_score(), persisted=True)
+        ),
+        sa.Column(
+            "risk_level", sa.String(length=3), sa.Computed(_level(), persisted=True)
+        ),
+        sa.Column(
+            "risk_score_after",
+            sa.SmallInteger(),
+            sa.Computed(_score("_after"), persisted=True),
+        ),
+        sa.Column(
+            "risk_level_after",
+            sa.String(length=3),
+            sa.Computed(_level("_after"), persisted=True),
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint(
+            "severity BETWEEN 1 AND 10 AND severity_after BETWEEN 1 AND 10",
+            name="ck_risk_assessments_severity",
+        ),
+        sa.CheckConstraint(
+            "probability BETWEEN 1 AND 6 AND probability_after BETWEEN 1 AND 6",
+            name="ck_risk_assessments_probability",
+        ),
+        sa.CheckConstraint(
+            "exposure BETWEEN 1 AND 6 AND exposure_after BETWEEN 1 AND 6",
+            name="ck_risk_assessments_exposure",
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_risk_assessments_user_id_created_at_id",
+        "risk_assessments",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_table(
+        "risk_metrics_summary",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("severity", sa.SmallInteger(), nullable=False),
+        sa.Column("probability", sa.SmallInteger(), nullable=False),
+        sa.Column("risk_level", sa.String(length=3), nullable=False),
+        sa.Column("severity_after", sa.SmallInteger(), nullable=False),
+        sa.Column("probability_after", sa.SmallInteger(), nullable=False),
+        sa.Column("risk_level_after", sa.String(length=3), nullable=False),
+        sa.Column("measure_type", sa.String(length=20), nullable=False),
+        sa.Column("row_count", sa.BigInteger(), nullable=False),
+        sa.Column("risk_score_sum", sa.BigInteger(), nullable=False),
+        sa.Column("risk_score_after_sum", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint(
+            "user_id",
+            "severity",
+            "probability",
+            "risk_level",
+            "severity_after",
+            "probability_after",
+            "risk_level_after",
+            "measure_type",
+        ),
+    )
+    op.execute(SUMMARY_FUNCTION)
+    for name, (event, referencing) in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER {event} ON risk_assessments "
+            f"REFERENCING {referencing} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION risk_metrics_summary_apply()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON risk_assessments")
+    op.execute("DROP FUNCTION IF EXISTS risk_metrics_summary_apply()")
+    op.drop_table("risk_metrics_summary")
+    op.drop_index(
+        "ix_risk_assessments_user_id_created_at_id", table_name="risk_assessments"
+    )
+    op.drop_table("risk_assessments")
@@ -0,0 +1,41 @@
+"""create knowledge index versions
+
+Revision ID: d7e3a1f5c820
+Revises: c41e7b2d9a15
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d7e3a1f5c820"
+down_revision: Union[str, Sequence[str], None] = "c41e7b2d9a15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table = op.create_table(
+        "knowledge_index_versions",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.bulk_insert(table, [{"name": "knowledge", "version": 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("knowledge_index_versions")
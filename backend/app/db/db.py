@@ -1,23 +1,66 @@
+import importlib.util
 import os
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from app.db.pool import async_engine_options
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# 非同期ドライバ（asyncpg）用のURL。未指定ならDATABASE_URLのドライバを置き換える
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+# ドライバのモジュール。aiosqliteは開発用依存（ベンチマーク・ローカル実行用）のみ
+ASYNC_DRIVER_MODULES = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    module = ASYNC_DRIVER_MODULES[backend]
+    if importlib.util.find_spec(module) is None:
+        raise RuntimeError(
+            f"{backend}のDATABASE_URLには非同期ドライバ{module}が必要です"
+            "（poetry installで開発用依存を含めてインストールするか、"
+            "ASYNC_DATABASE_URLを指定してください）"
+        )
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# 同期エンジン（Alembicのマイグレーション・CLI用）
 engine = create_engine(DATABASE_URL, echo=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 非同期エンジン（APIリクエスト用）。プール設定はPostgreSQLの場合のみ適用する
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    **(
+        async_engine_options()
+        if make_url(ASYNC_DATABASE_URL).get_backend_name() == "postgresql"
+        else {}
+    ),
+)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# コミット後も属性を読めるよう、expire_on_commitは無効にする
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,12 @@
 from .user import User
 from .history import History
+from .risk_assessment import RiskAssessment, RiskMetricsSummary
+from .knowledge_index import KnowledgeIndexVersion
 
-__all__ = ["User", "History"]
+__all__ = [
+    "User",
+    "History",
+    "RiskAssessment",
+    "RiskMetricsSummary",
+    "KnowledgeIndexVersion",
+]
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from app.db.db import Base
 
 
@@ -12,11 +13,43 @@ class History(Base):
     type = Column(String(50), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
-    content = Column(JSON, nullable=True)
+    content = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     uploaded_files = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     user = relationship("User", back_populates="histories")
+    # contentの危険性・有害性とリスク低減措置の文字列と、その1〜2文字のn-gram。
+    # DBのトリガー（histories_search_update）が更新するため、アプリからは書き込まない
+    search_text = deferred(Column(Text, nullable=True))
+    search_ngrams = deferred(
+        Column(ARRAY(Text).with_variant(JSON(), "sqlite"), nullable=True)
+    )
+
+    __table_args__ = (
+        # 履歴一覧のキーセットページング用（新しい順）
+        Index(
+            "ix_histories_user_id_created_at_id",
+            user_id,
+            created_at.desc(),
+            id.desc(),
+        ),
+        Index(
+            "ix_histories_user_id_type_created_at_id",
+            user_id,
+            type,
+            created_at.desc(),
+            id.desc(),
+        ),
+        # content @> '{...}' の検索用
+        Index(
+            "ix_histories_content",
+            content,
+            postgresql_using="gin",
+            postgresql_ops={"content": "jsonb_path_ops"},
+        ),
+        # 本文の部分一致検索の絞り込み用
+        Index("ix_histories_search_ngrams", "search_ngrams", postgresql_using="gin"),
+    )
 
     def __repr__(self):
         return f"<History(id={self.id}, user_id={self.user_id}, type='{self.type}', title='{self.title}')>"
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.sql import func
+from app.db.db import Base
+
+
+class KnowledgeIndexVersion(Base):
+    """
+    ナレッジインデックスの世代番号。取り込み・キャッシュ破棄のたびに進め、
+    全APIワーカー・CLIで共有する（RAG結果キャッシュの有効判定に使う）
+    """
+
+    __tablename__ = "knowledge_index_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<KnowledgeIndexVersion(name='{self.name}', version={self.version})>"
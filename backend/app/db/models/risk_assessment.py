@@ -0,0 +1,115 @@
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+)
+from sqlalchemy.sql import func
+from app.db.db import Base
+
+# 対策分類
+MEASURE_TYPES = ("設計時対策", "工学的対策", "管理的対策", "個人用保護具")
+# リスクレベル（高い順）とスコアの下限。フロントエンドのRISK_LEVEL_THRESHOLDSと同じ
+RISK_LEVEL_THRESHOLDS = (("IV", 15), ("III", 12), ("II", 8), ("I", 0))
+HIGH_RISK_LEVELS = ("IV", "III")
+
+
+def _risk_score_sql(suffix: str = "") -> str:
+    return f"severity{suffix} + probability{suffix} + exposure{suffix}"
+
+
+def _risk_level_sql(suffix: str = "") -> str:
+    score = _risk_score_sql(suffix)
+    whens = " ".join(
+        f"WHEN {score} >= {threshold} THEN '{level}'"
+        for level, threshold in RISK_LEVEL_THRESHOLDS[:-1]
+    )
+    return f"CASE {whens} ELSE '{RISK_LEVEL_THRESHOLDS[-1][0]}' END"
+
+
+class RiskAssessment(Base):
+    __tablename__ = "risk_assessments"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    work = Column(String(200), nullable=False)
+    work_element = Column(String(200), nullable=False)
+    knowledge_file = Column(String(200), nullable=True)
+    reference = Column(Text, nullable=True)
+    hazard = Column(Text, nullable=False)
+    risk_reduction = Column(Text, nullable=False)
+    measure_type = Column(String(20), nullable=False)
+    severity = Column(SmallInteger, nullable=False)
+    probability = Column(SmallInteger, nullable=False)
+    exposure = Column(SmallInteger, nullable=False)
+    severity_after = Column(SmallInteger, nullable=False)
+    probability_after = Column(SmallInteger, nullable=False)
+    exposure_after = Column(SmallInteger, nullable=False)
+    # スコア・レベルは入力値からDBで計算する（足し算）
+    risk_score = Column(SmallInteger, Computed(_risk_score_sql(), persisted=True))
+    risk_level = Column(String(3), Computed(_risk_level_sql(), persisted=True))
+    risk_score_after = Column(
+        SmallInteger, Computed(_risk_score_sql("_after"), persisted=True)
+    )
+    risk_level_after = Column(
+        String(3), Computed(_risk_level_sql("_after"), persisted=True)
+    )
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        CheckConstraint(
+            "severity BETWEEN 1 AND 10 AND severity_after BETWEEN 1 AND 10",
+            name="ck_risk_assessments_severity",
+        ),
+        CheckConstraint(
+            "probability BETWEEN 1 AND 6 AND probability_after BETWEEN 1 AND 6",
+            name="ck_risk_assessments_probability",
+        ),
+        CheckConstraint(
+            "exposure BETWEEN 1 AND 6 AND exposure_after BETWEEN 1 AND 6",
+            name="ck_risk_assessments_exposure",
+        ),
+        Index(
+            "ix_risk_assessments_user_id_created_at_id",
+            user_id,
+            created_at.desc(),
+            id.desc(),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<RiskAssessment(id={self.id}, user_id={self.user_id}, work='{self.work}')>"
+
+
+class RiskMetricsSummary(Base):
+    """
+    risk_assessmentsの集計表。ダッシュボードの集計値はすべてこの表から求める。
+    PostgreSQLではrisk_assessmentsへの変更のたびにトリガーが差分を加算する
+    """
+
+    __tablename__ = "risk_metrics_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    severity = Column(SmallInteger, primary_key=True)
+    probability = Column(SmallInteger, primary_key=True)
+    risk_level = Column(String(3), primary_key=True)
+    severity_after = Column(SmallInteger, primary_key=True)
+    probability_after = Column(SmallInteger, primary_key=True)
+    risk_level_after = Column(String(3), primary_key=True)
+    measure_type = Column(String(20), primary_key=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
+    risk_score_sum = Column(BigInteger, nullable=False, default=0)
+    risk_score_after_sum = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<RiskMetricsSummary(user_id={self.user_id}, row_count={self.row_count})>"
+        )
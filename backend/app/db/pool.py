@@ -0,0 +1,127 @@
+# app/db/pool.py
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+from dotenv import load_dotenv
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+load_dotenv()
+
+# DB接続プール設定
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# フェイルオーバー後の切れた接続を使い続けないよう、一定時間で接続を作り直す
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# 1文あたりのタイムアウト（ミリ秒、0で無効）
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# PgBouncer（transactionモード）経由で接続する場合はtrue
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+
+@dataclass
+class DBPoolStats:
+    """接続プールの取得待ち・オーバーフローの記録"""
+
+    checkouts: int = 0
+    connections_created: int = 0
+    overflow_connections: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def snapshot(self) -> dict:
+        data = asdict(self)
+        data["avg_wait_ms"] = (
+            self.total_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0
+        )
+        data["max_wait_ms"] = data.pop("max_wait_seconds") * 1000
+        return data
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """接続の取得待ち時間・オーバーフロー・タイムアウトを記録するプール"""
+
+    # dispose()でプールが作り直されても記録を引き継ぐため、クラス属性に持つ
+    stats = DBPoolStats()
+    _stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.stats.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.stats.checkouts += 1
+            self.stats.total_wait_seconds += waited
+            self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+        return connection
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()
+        if created:
+            with self._stats_lock:
+                self.stats.connections_created += 1
+                # pool_sizeを超えて作った接続
+                if self._overflow > 0:
+                    self.stats.overflow_connections += 1
+        return created
+
+
+def async_engine_options() -> dict:
+    """APIリクエスト用の非同期エンジン（asyncpg）のcreate_async_engine引数"""
+    connect_args = {}
+    if DB_PGBOUNCER:
+        # transactionモードでは接続ごとのプリペアドステートメントを使い回せない
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = (
+            lambda: f"__asyncpg_{uuid.uuid4().hex}__"
+        )
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        if DB_PGBOUNCER:
+            # PgBouncerは起動パラメータのstatement_timeoutを受け付けないため、クライアント側で打ち切る
+            connect_args["command_timeout"] = DB_STATEMENT_TIMEOUT_MS / 1000
+        else:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)
+            }
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def pool_status(engine) -> dict:
+    """現在のプールの状態（チェックアウト中の接続数など）と累計の記録"""
+    pool = engine.pool
+    data = {"pool_class": type(pool).__name__}
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        data.update(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            timeout_seconds=pool.timeout(),
+            recycle_seconds=DB_POOL_RECYCLE,
+            pre_ping=DB_POOL_PRE_PING,
+            statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+            pgbouncer=DB_PGBOUNCER,
+            **InstrumentedAsyncQueuePool.stats.snapshot(),
+        )
+    return data
@@ -0,0 +1,51 @@
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+from typing import List
+
+
+class AnalyticsModel(BaseModel):
+    """フロントエンドの型（types/risk-assessment.ts）に合わせてcamelCaseで返す"""
+
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+
+class RiskMetrics(AnalyticsModel):
+    total_risks: int
+    high_risks: int
+    medium_risks: int
+    low_risks: int
+    average_risk_score: float
+    average_risk_score_after: float
+    improvement_rate: float
+    risk_reduction_rate: float
+
+
+class RiskLevelCount(AnalyticsModel):
+    level: str
+    count: int
+    color: str
+
+
+class RiskMatrixCell(AnalyticsModel):
+    """リスクマトリックスの1マス（該当するリスクの一覧は含めない）"""
+
+    severity: int
+    probability: int
+    count: int
+
+
+class SankeyLink(AnalyticsModel):
+    source: str
+    target: str
+    value: int
+
+
+class RiskDashboard(AnalyticsModel):
+    """ダッシュボードの表示に必要な集計をまとめたもの"""
+
+    metrics: RiskMetrics
+    risk_levels: List[RiskLevelCount]
+    risk_levels_after: List[RiskLevelCount]
+    risk_matrix: List[RiskMatrixCell]
+    risk_matrix_after: List[RiskMatrixCell]
+    sankey: List[SankeyLink]
@@ -0,0 +1,30 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import Any, List, Optional
+
+
+class HistorySummary(BaseModel):
+    """履歴一覧の1件（content・uploaded_filesは含めない）"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: str
+    title: str
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class HistoryDetail(HistorySummary):
+    """履歴の詳細"""
+
+    content: Optional[Any] = None
+    uploaded_files: Optional[Any] = None
+
+
+class HistoryPage(BaseModel):
+    """履歴一覧の1ページ。next_cursorを次のリクエストのcursorに渡す"""
+
+    items: List[HistorySummary]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+
+class IngestFileStatus(BaseModel):
+    """取り込みジョブ内の1ファイルの進捗"""
+
+    file_name: str
+    sha256: str
+    size: int
+    status: Literal["pending", "extracted", "done", "skipped", "failed"]
+    records: int = 0
+    upserted: int = 0
+    error: Optional[str] = None
+
+
+class IngestJob(BaseModel):
+    """ナレッジ取り込みジョブのスキーマ"""
+
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    force: bool = False
+    files: List[IngestFileStatus]
+    records: int = 0
+    upserted: int = 0
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal
+
+
+class RAGRequest(BaseModel):
+    """RAGリクエストのスキーマ"""
+
+    task: str
+    element: str
+
+
+class RiskItem(BaseModel):
+    """LLMが生成する危険性・有害性とリスク低減措置の1件"""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    hazard: str = Field(alias="危険性・有害性")
+    risk_mitigation: str = Field(alias="リスク低減措置")
+    measure_type: Literal["設計時対策", "工学的対策", "管理的対策", "個人用保護具"] = (
+        Field(alias="対策分類")
+    )
+    file_name: str = Field(alias="使用ナレッジファイル名")
+
+
+class RAGResult(BaseModel):
+    """LLM出力全体のスキーマ"""
+
+    rags: List[RiskItem]
+    llms: List[RiskItem]
@@ -0,0 +1,49 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
+
+
+class RiskAssessmentRow(BaseModel):
+    """
+    取り込むリスクアセスメントの1行。
+    エイリアスはフロントエンドのExcel出力（excel-utils.ts）の列名
+    """
+
+    model_config = ConfigDict(
+        populate_by_name=True, str_strip_whitespace=True, frozen=True
+    )
+
+    work: str = Field(alias="作業", min_length=1, max_length=200)
+    work_element: str = Field(alias="作業要素", min_length=1, max_length=200)
+    knowledge_file: Optional[str] = Field(
+        None, alias="使用ナレッジファイル名", max_length=200
+    )
+    reference: Optional[str] = Field(None, alias="参照")
+    hazard: str = Field(alias="危険性・有害性", min_length=1)
+    risk_reduction: str = Field(alias="リスク低減措置", min_length=1)
+    measure_type: Literal["設計時対策", "工学的対策", "管理的対策", "個人用保護具"] = (
+        Field(alias="対策分類")
+    )
+    severity: int = Field(alias="重篤度", ge=1, le=10)
+    probability: int = Field(alias="発生確率", ge=1, le=6)
+    exposure: int = Field(alias="暴露頻度", ge=1, le=6)
+    severity_after: int = Field(alias="低減後重篤度", ge=1, le=10)
+    probability_after: int = Field(alias="低減後発生確率", ge=1, le=6)
+    exposure_after: int = Field(alias="低減後暴露頻度", ge=1, le=6)
+
+
+class ImportRowError(BaseModel):
+    """取り込めなかった行（rowはヘッダーを1行目とした行番号）"""
+
+    row: int
+    errors: List[str]
+
+
+class RiskAssessmentImportResult(BaseModel):
+    file_name: str
+    total_rows: int
+    imported: int
+    rejected: int
+    errors: List[ImportRowError]
+    # エラーが多すぎて一部しか返していない場合はtrue
+    errors_truncated: bool = False
+    seconds: float
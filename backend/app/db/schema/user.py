@@ -1,6 +1,9 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
+# 全ユーザー共通のデータ（ナレッジ・キャッシュ）を操作できるロール
+ADMIN_ROLE = "admin"
+
 class UserBase(BaseModel):
     """ユーザーの基本情報スキーマ"""
     name: str
@@ -14,7 +17,9 @@ class UserCreate(UserBase):
 
 class UserInfo(UserBase):
     """APIレスポンス用のユーザー情報スキーマ"""
+    id: Optional[int] = None
     is_active: bool
+    role: Optional[str] = None
     email: Optional[EmailStr] = None
 
     class Config:
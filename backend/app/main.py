@@ -1,19 +1,53 @@
 import os
 from app.middleware.auth_middleware import AuthMiddleware
+from app.middleware.server_timing_middleware import ServerTimingMiddleware
 from app.routers import auth
 from app.routers import user
+from app.routers import rag
+from app.routers import knowledge
+from app.routers import database
+from app.routers import history
+from app.routers import analytics
+from app.routers import risk_assessment
+from app.routers import metrics
 from fastapi import FastAPI, Depends
 from sqlalchemy.orm import Session
-from app.db.db import get_db
+from app.db.db import get_db, async_engine
 from app.db.models import User, History
 from app.usecases.user_usecase import UserUseCase
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from app.services.client_registry import client_registry
+from app.services.retriever import retriever
+from app.usecases.rag_usecase import warm_up_token_counters
+from app.usecases.ingest_usecase import shutdown_extract_pool
+from app.services.password_hasher import password_hasher
+from app.services.history_writer import history_writer
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 import json
 from pathlib import Path
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 外部APIクライアントの接続プールを起動時に生成し、終了時に解放
+    await client_registry.startup()
+    await run_in_threadpool(warm_up_token_counters)
+    await retriever.startup()
+    await history_writer.start()
+    try:
+        yield
+    finally:
+        # 未書き込みの履歴をDBに書き切ってからエンジンを閉じる
+        await history_writer.stop()
+        shutdown_extract_pool()
+        password_hasher.shutdown()
+        await client_registry.shutdown()
+        await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY")
 
 origins = [
@@ -30,9 +64,22 @@ app.add_middleware(
 
 app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET_KEY)
 app.add_middleware(AuthMiddleware)
+# 認証も含めて計測するため最も外側に置く
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(user.router, prefix="/api/v1/user", tags=["user"])
+app.include_router(rag.router, prefix="/api/v1/rag", tags=["rag"])
+app.include_router(knowledge.router, prefix="/api/v1/knowledge", tags=["knowledge"])
+app.include_router(database.router, prefix="/api/v1/db", tags=["db"])
+app.include_router(history.router, prefix="/api/v1/history", tags=["history"])
+app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
+app.include_router(
+    risk_assessment.router,
+    prefix="/api/v1/risk-assessments",
+    tags=["risk-assessments"],
+)
+app.include_router(metrics.router)
 
 
 @app.get("/health")
@@ -1,75 +1,115 @@
 # app/middleware/auth.py
-from app.db.db import SessionLocal
-from fastapi import Request, Response, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+import time
+from typing import Optional
+
+from starlette.requests import cookie_parser
 from starlette.responses import JSONResponse
-from app.services.auth_service import AuthService
+from starlette.types import ASGIApp, Receive, Scope, Send
+from fastapi import status
+from app.db.db import AsyncSessionLocal
+from app.services.auth_cache import auth_cache
+from app.services.metrics import record_server_timing
 from app.repositories.user_repository import UserRepository
 from app.db.schema.user import UserInfo
 
-class AuthMiddleware(BaseHTTPMiddleware):
+# 認証不要のパス（完全一致）
+PUBLIC_PATHS = frozenset([
+    "/",
+    "/health",
+    # Prometheusのスクレイプ用（METRICS_TOKENで保護し、未設定なら無効）
+    "/metrics",
+    "/api/v1/auth/login",
+    "/api/v1/auth/google",
+    "/api/v1/auth/google/callback",
+    "/api/v1/auth/refresh",
+    "/docs", "/redoc", "/openapi.json",
+])
+# 認証不要のパス（前方一致。Swagger UIのoauth2-redirectなど）
+PUBLIC_PREFIXES = ("/docs/",)
+
+
+def is_public_path(path: str) -> bool:
+    return path in PUBLIC_PATHS or path.startswith(PUBLIC_PREFIXES)
+
+
+def _get_cookie(scope: Scope, name: str) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == b"cookie":
+            # Request.cookiesと同じパーサーを使う
+            return cookie_parser(value.decode("latin-1")).get(name)
+    return None
+
+
+async def _load_user(user_id: int) -> Optional[UserInfo]:
+    """DBからユーザーを取得"""
+    async with AsyncSessionLocal() as db:
+        user = await UserRepository(db).get_user_by_id(user_id)
+        if not user or not user.is_active:
+            return None
+        return UserInfo.model_validate(user)
+
+
+class AuthMiddleware:
     """
     Cookieからアクセストークンを検証し、
-    認証済みユーザー情報をリクエストのstateにセット
+    認証済みユーザー情報をリクエストのstateにセット（ASGIミドルウェア）
     """
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        public_paths = [
-            "/api/v1/auth/login",
-            "/api/v1/auth/google",
-            "/api/v1/auth/google/callback",
-            "/api/v1/auth/refresh",
-            "/",
-            "/docs", "/redoc", "/openapi.json"
-        ]
-
-        if any(request.url.path.startswith(p) for p in public_paths):
-            response = await call_next(request)
-            return response
-
-        access_token = request.cookies.get("access_token")
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # CORSのプリフライトはCORSMiddlewareに任せる
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or is_public_path(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        user_info = await self.authenticate(scope)
+        if isinstance(user_info, JSONResponse):
+            await user_info(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["user"] = user_info
+        await self.app(scope, receive, send)
+
+    async def authenticate(self, scope: Scope):
+        """認証済みならUserInfo、失敗時は401のレスポンスを返す"""
+        access_token = _get_cookie(scope, "access_token")
         if not access_token:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Not authenticated. Access token missing."}
-            )
+            return _unauthorized("Not authenticated. Access token missing.")
 
-        payload = AuthService.verify_token(access_token, "access")
+        started = time.perf_counter()
+        payload = auth_cache.verify_token(access_token, "access")
         if not payload:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Invalid or expired access token."}
-            )
-        
+            return _unauthorized("Invalid or expired access token.")
+
         user_id_str = payload.get("sub")
         if not user_id_str:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Invalid token payload: user ID missing."}
-            )
+            return _unauthorized("Invalid token payload: user ID missing.")
 
         try:
             user_id = int(user_id_str)
         except ValueError:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Invalid user ID format in token."}
-            )
+            return _unauthorized("Invalid user ID format in token.")
 
-        db = SessionLocal()
-        try:
-            user_repo = UserRepository(db)
-            user = user_repo.get_user_by_id(user_id)
-
-            if not user or not user.is_active:
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "User inactive or not found."}
-                )
-            
-            request.state.user = UserInfo.model_validate(user)
-
-        finally:
-            db.close()
-
-        response = await call_next(request)
-        return response
\ No newline at end of file
+        user_info = auth_cache.get_user(user_id)
+        if user_info is None:
+            user_info = await _load_user(user_id)
+            if user_info is None:
+                return _unauthorized("User inactive or not found.")
+            auth_cache.put_user(user_id, user_info)
+
+        elapsed = time.perf_counter() - started
+        auth_cache.record(elapsed)
+        record_server_timing("auth", elapsed)
+        return user_info
+
+
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        content={"detail": detail}
+    )
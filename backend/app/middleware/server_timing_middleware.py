@@ -0,0 +1,44 @@
+# app/middleware/server_timing_middleware.py
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import (
+    SERVER_TIMING_ENABLED,
+    begin_server_timing,
+    format_server_timing,
+)
+
+
+class ServerTimingMiddleware:
+    """
+    リクエスト中に記録した処理時間をServer-Timingヘッダーで返す（ASGIミドルウェア）。
+    ヘッダーはレスポンス開始時点までの記録で作るため、
+    ストリーミングではレスポンス開始後の処理は含まれない
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not SERVER_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = begin_server_timing()
+
+        async def send_with_timing(message: Message) -> None:
+            # 計測した処理があるレスポンスにだけ付ける
+            if message["type"] == "http.response.start" and timings:
+                value = format_server_timing(timings, time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", value.encode("latin-1")),
+                    ],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,104 @@
+# app/repositories/analytics_repository.py
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RiskAssessment, RiskMetricsSummary
+
+SUMMARY_KEYS = (
+    "user_id",
+    "severity",
+    "probability",
+    "risk_level",
+    "severity_after",
+    "probability_after",
+    "risk_level_after",
+    "measure_type",
+)
+
+
+class AnalyticsRepository:
+    """
+    リスク集計の取得。読むのは集計表（risk_metrics_summary）だけなので、
+    risk_assessmentsの件数によらず、読む行数はキーの組み合わせ数で頭打ちになる
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _grouped(self, user_id: int, *keys) -> list:
+        query = (
+            select(
+                *keys,
+                func.sum(RiskMetricsSummary.row_count).label("count"),
+                func.sum(RiskMetricsSummary.risk_score_sum).label("risk_score_sum"),
+                func.sum(RiskMetricsSummary.risk_score_after_sum).label(
+                    "risk_score_after_sum"
+                ),
+            )
+            .where(RiskMetricsSummary.user_id == user_id)
+            .group_by(*keys)
+            .having(func.sum(RiskMetricsSummary.row_count) > 0)
+            .order_by(*keys)
+        )
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def level_totals(self, user_id: int) -> list:
+        """対策前後のリスクレベルの組ごとの件数とスコア合計"""
+        return await self._grouped(
+            user_id, RiskMetricsSummary.risk_level, RiskMetricsSummary.risk_level_after
+        )
+
+    async def matrix(self, user_id: int, after: bool = False) -> list:
+        """重篤度×発生確率ごとの件数"""
+        if after:
+            keys = (
+                RiskMetricsSummary.severity_after.label("severity"),
+                RiskMetricsSummary.probability_after.label("probability"),
+            )
+        else:
+            keys = (RiskMetricsSummary.severity, RiskMetricsSummary.probability)
+        return await self._grouped(user_id, *keys)
+
+    async def flows(self, user_id: int) -> list:
+        """対策前レベル→対策分類→対策後レベルごとの件数"""
+        return await self._grouped(
+            user_id,
+            RiskMetricsSummary.risk_level,
+            RiskMetricsSummary.measure_type,
+            RiskMetricsSummary.risk_level_after,
+        )
+
+    async def rebuild_summary(self, user_id: Optional[int] = None) -> int:
+        """
+        集計表をrisk_assessmentsから作り直す。
+        トリガーのないDB（SQLiteなど）での利用や、集計表の修復に使う
+        """
+        if self.db.bind.dialect.name == "postgresql":
+            # 作り直している間の書き込みで差分が二重に数えられないよう止める
+            await self.db.execute(
+                text("LOCK TABLE risk_assessments IN SHARE ROW EXCLUSIVE MODE")
+            )
+        summary = RiskMetricsSummary.__table__
+        clear = delete(summary)
+        keys = [getattr(RiskAssessment, key) for key in SUMMARY_KEYS]
+        source = select(
+            *keys,
+            func.count(),
+            func.sum(RiskAssessment.risk_score),
+            func.sum(RiskAssessment.risk_score_after),
+        ).group_by(*keys)
+        if user_id is not None:
+            clear = clear.where(summary.c.user_id == user_id)
+            source = source.where(RiskAssessment.user_id == user_id)
+        await self.db.execute(clear)
+        result = await self.db.execute(
+            insert(summary).from_select(
+                [*SUMMARY_KEYS, "row_count", "risk_score_sum", "risk_score_after_sum"],
+                source,
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
@@ -0,0 +1,129 @@
+# app/repositories/history_repository.py
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import History
+
+# 一覧で返す列（重いcontent・uploaded_filesは読まない）
+SUMMARY_COLUMNS = (
+    History.id,
+    History.type,
+    History.title,
+    History.description,
+    History.created_at,
+    History.updated_at,
+)
+
+# エクスポートで返す列
+EXPORT_COLUMNS = (
+    History.id,
+    History.user_id,
+    History.type,
+    History.title,
+    History.description,
+    History.content,
+    History.created_at,
+    History.updated_at,
+)
+
+
+class HistoryRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def bulk_insert(self, rows: List[dict]) -> int:
+        """複数行を1回のINSERT（multi-row VALUES）で登録"""
+        if not rows:
+            return 0
+        await self.db.execute(insert(History).values(rows))
+        await self.db.commit()
+        return len(rows)
+
+    async def list_summaries(
+        self,
+        user_id: int,
+        limit: int,
+        type: Optional[str] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> list:
+        """
+        ユーザーの履歴を新しい順に取得する。
+        beforeには前のページ末尾の(created_at, id)を渡す（キーセットページング）
+        """
+        query = select(*SUMMARY_COLUMNS).where(History.user_id == user_id)
+        if type is not None:
+            query = query.where(History.type == type)
+        if before is not None:
+            query = query.where(tuple_(History.created_at, History.id) < before)
+        query = query.order_by(History.created_at.desc(), History.id.desc()).limit(
+            limit
+        )
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def search_summaries(
+        self,
+        user_id: int,
+        terms: List[str],
+        grams: List[str],
+        limit: int,
+        type: Optional[str] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> list:
+        """
+        危険性・有害性／リスク低減措置にtermsをすべて含む履歴を新しい順に取得する。
+        n-gramのGINインデックスで候補を絞り、部分一致で確定させる
+        """
+        query = select(*SUMMARY_COLUMNS).where(
+            History.user_id == user_id, History.search_ngrams.contains(grams)
+        )
+        for term in terms:
+            query = query.where(History.search_text.icontains(term, autoescape=True))
+        if type is not None:
+            query = query.where(History.type == type)
+        if before is not None:
+            query = query.where(tuple_(History.created_at, History.id) < before)
+        query = query.order_by(History.created_at.desc(), History.id.desc()).limit(
+            limit
+        )
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def get_by_id(self, user_id: int, history_id: int) -> Optional[History]:
+        """ユーザー自身の履歴を1件取得"""
+        result = await self.db.execute(
+            select(History).where(History.id == history_id, History.user_id == user_id)
+        )
+        return result.scalars().first()
+
+    async def stream_export(
+        self,
+        partition_rows: int,
+        user_id: Optional[int] = None,
+        type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[list]:
+        """
+        EXPORT_COLUMNSの行をサーバー側カーソルからpartition_rows件ずつ返す。
+        user_idを省略すると全ユーザーが対象
+        """
+        query = select(*EXPORT_COLUMNS)
+        if user_id is not None:
+            query = query.where(History.user_id == user_id).order_by(
+                History.created_at, History.id
+            )
+        else:
+            query = query.order_by(History.id)
+        if type is not None:
+            query = query.where(History.type == type)
+        if created_from is not None:
+            query = query.where(History.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(History.created_at < created_to)
+        result = await self.db.stream(query.execution_options(yield_per=partition_rows))
+        async for partition in result.partitions():
+            yield partition
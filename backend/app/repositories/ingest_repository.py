@@ -0,0 +1,138 @@
+# app/repositories/ingest_repository.py
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import BinaryIO, List, Optional
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _write_json(path: str, data: dict) -> None:
+    """途中までの書き込みを読まないよう、一時ファイルからリネームする"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class IngestRepository:
+    """
+    ナレッジ取り込みのジョブ・ファイルごとのチェックポイント・抽出済みレコードの保存先。
+    チェックポイントはファイル内容のsha256ごとに持ち、中断したジョブはここから再開する
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        for name in ("uploads", "jobs", "checkpoints"):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def save_upload(self, stream: BinaryIO, file_name: str, max_bytes: int) -> dict:
+        """アップロードをチャンク単位でコピーしながらハッシュを計算"""
+        tmp_path = os.path.join(self.directory, "uploads", f"{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while chunk := stream.read(COPY_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(
+                            f"{file_name}: ファイルサイズが上限を超えています"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            extension = os.path.splitext(file_name)[1].lower()
+            path = os.path.join(self.directory, "uploads", f"{sha256}{extension}")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return {"file_name": file_name, "sha256": sha256, "size": size, "path": path}
+
+    def register_local_file(self, path: str) -> dict:
+        """サーバー上のファイルはコピーせず、そのパスのまま取り込む"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(COPY_CHUNK_BYTES):
+                digest.update(chunk)
+        return {
+            "file_name": os.path.basename(path),
+            "sha256": digest.hexdigest(),
+            "size": os.path.getsize(path),
+            "path": os.path.abspath(path),
+        }
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, "jobs", f"{job_id}.json")
+
+    def create_job(self, files: List[dict], force: bool = False) -> dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "force": force,
+            "files": files,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        self.save_job(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        if not job_id.isalnum():
+            return None
+        return _read_json(self._job_path(job_id))
+
+    def save_job(self, job: dict) -> None:
+        job["updated_at"] = _now()
+        _write_json(self._job_path(job["job_id"]), job)
+
+    def _checkpoint_path(self, sha256: str, suffix: str = ".json") -> str:
+        return os.path.join(self.directory, "checkpoints", f"{sha256}{suffix}")
+
+    def get_checkpoint(self, sha256: str) -> Optional[dict]:
+        return _read_json(self._checkpoint_path(sha256))
+
+    def save_checkpoint(self, checkpoint: dict) -> None:
+        checkpoint["updated_at"] = _now()
+        _write_json(self._checkpoint_path(checkpoint["sha256"]), checkpoint)
+
+    def has_records(self, sha256: str) -> bool:
+        return os.path.exists(self._checkpoint_path(sha256, ".records.jsonl"))
+
+    def save_records(self, sha256: str, records: List[dict]) -> None:
+        path = self._checkpoint_path(sha256, ".records.jsonl")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def load_records(self, sha256: str) -> List[dict]:
+        with open(
+            self._checkpoint_path(sha256, ".records.jsonl"), encoding="utf-8"
+        ) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def remove_upload(self, path: str) -> None:
+        """取り込み完了後にアップロードのコピーを削除（サーバー上の元ファイルは残す）"""
+        uploads = os.path.join(self.directory, "uploads")
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(uploads):
+            return
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,39 @@
+# app/repositories/knowledge_index_repository.py
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import KnowledgeIndexVersion
+
+# RAG結果キャッシュが参照するナレッジインデックスの行
+KNOWLEDGE_INDEX_NAME = "knowledge"
+
+
+class KnowledgeIndexRepository:
+    def __init__(self, db: AsyncSession, name: str = KNOWLEDGE_INDEX_NAME):
+        self.db = db
+        self.name = name
+
+    async def get_version(self) -> int:
+        """行が無ければ0（一度も更新されていない）"""
+        version = await self.db.scalar(
+            select(KnowledgeIndexVersion.version).where(
+                KnowledgeIndexVersion.name == self.name
+            )
+        )
+        return version or 0
+
+    async def bump_version(self) -> int:
+        """世代番号を1つ進めて返す。同時に呼ばれても番号が重複しないようDB側で加算する"""
+        version = await self.db.scalar(
+            update(KnowledgeIndexVersion)
+            .where(KnowledgeIndexVersion.name == self.name)
+            .values(version=KnowledgeIndexVersion.version + 1)
+            .returning(KnowledgeIndexVersion.version)
+        )
+        if version is None:
+            version = 1
+            await self.db.execute(
+                insert(KnowledgeIndexVersion).values(name=self.name, version=version)
+            )
+        await self.db.commit()
+        return version
@@ -0,0 +1,112 @@
+# app/repositories/risk_assessment_repository.py
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RiskAssessment
+
+# COPYで投入する列（スコア・レベルは生成列、日時は既定値に任せる）
+COPY_COLUMNS = (
+    "user_id",
+    "work",
+    "work_element",
+    "knowledge_file",
+    "reference",
+    "hazard",
+    "risk_reduction",
+    "measure_type",
+    "severity",
+    "probability",
+    "exposure",
+    "severity_after",
+    "probability_after",
+    "exposure_after",
+)
+
+# エクスポートで返す列（フロントエンドのExcel出力と同じ並び＋ユーザーID）
+EXPORT_COLUMNS = (
+    RiskAssessment.id,
+    RiskAssessment.work,
+    RiskAssessment.work_element,
+    RiskAssessment.knowledge_file,
+    RiskAssessment.reference,
+    RiskAssessment.hazard,
+    RiskAssessment.risk_reduction,
+    RiskAssessment.measure_type,
+    RiskAssessment.severity,
+    RiskAssessment.probability,
+    RiskAssessment.exposure,
+    RiskAssessment.risk_score,
+    RiskAssessment.risk_level,
+    RiskAssessment.severity_after,
+    RiskAssessment.probability_after,
+    RiskAssessment.exposure_after,
+    RiskAssessment.risk_score_after,
+    RiskAssessment.risk_level_after,
+    RiskAssessment.created_at,
+    RiskAssessment.updated_at,
+    RiskAssessment.user_id,
+)
+
+
+class RiskAssessmentRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @property
+    def is_postgresql(self) -> bool:
+        return self.db.bind.dialect.name == "postgresql"
+
+    async def copy_records(self, records: List[Sequence]) -> int:
+        """
+        COPY_COLUMNSの順に並んだ行をまとめて投入する（コミットはしない）。
+        PostgreSQLではCOPY（バイナリ形式）、それ以外ではexecutemanyのINSERTを使う
+        """
+        if not records:
+            return 0
+        if self.is_postgresql:
+            connection = await self.db.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                RiskAssessment.__tablename__, records=records, columns=COPY_COLUMNS
+            )
+        else:
+            await self.db.execute(
+                insert(RiskAssessment.__table__),
+                [dict(zip(COPY_COLUMNS, record)) for record in records],
+            )
+        return len(records)
+
+    async def commit(self) -> None:
+        await self.db.commit()
+
+    async def stream_export(
+        self,
+        partition_rows: int,
+        user_id: Optional[int] = None,
+        measure_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[list]:
+        """
+        EXPORT_COLUMNSの行をサーバー側カーソルからpartition_rows件ずつ返す。
+        user_idを省略すると全ユーザーが対象
+        """
+        query = select(*EXPORT_COLUMNS)
+        if user_id is not None:
+            query = query.where(RiskAssessment.user_id == user_id).order_by(
+                RiskAssessment.created_at, RiskAssessment.id
+            )
+        else:
+            query = query.order_by(RiskAssessment.id)
+        if measure_type is not None:
+            query = query.where(RiskAssessment.measure_type == measure_type)
+        if created_from is not None:
+            query = query.where(RiskAssessment.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(RiskAssessment.created_at < created_to)
+        result = await self.db.stream(query.execution_options(yield_per=partition_rows))
+        async for partition in result.partitions():
+            yield partition
@@ -1,29 +1,33 @@
 # app/repositories/user_repository.py
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import User
 from app.db.schema.user import UserCreate
+from app.services.auth_cache import auth_cache
 from typing import Optional
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
         """IDでユーザーを取得します。"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        return await self.db.get(User, user_id)
 
-    def get_user_by_name(self, name: str) -> Optional[User]:
+    async def get_user_by_name(self, name: str) -> Optional[User]:
         """ユーザー名でユーザーを取得"""
-        return self.db.query(User).filter(User.name == name).first()
+        result = await self.db.execute(select(User).where(User.name == name))
+        return result.scalars().first()
 
-    def get_user_by_email(self, email: str) -> Optional[User]:
+    async def get_user_by_email(self, email: str) -> Optional[User]:
         """メールアドレスのユーザーを取得"""
-        return self.db.query(User).filter(User.email == email).first()
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
     # def get_user_by_google_id(self, google_id: str) -> Optional[User]:
     #     """Google IDでユーザーを取得します。"""
     #     return self.db.query(User).filter(User.google_id == google_id).first()
 
-    def create_user(self, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    async def create_user(self, user: UserCreate, hashed_password: Optional[str] = None) -> User:
         """新しいユーザーの作成"""
         db_user = User(
             name=user.name,
@@ -32,14 +36,16 @@ class UserRepository:
             role=user.role
         )
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
         return db_user
 
-    def update_user(self, user: User, **kwargs) -> User:
+    async def update_user(self, user: User, **kwargs) -> User:
         """既存のユーザー情報を更新します。"""
         for key, value in kwargs.items():
             setattr(user, key, value)
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
+        # AuthMiddlewareがキャッシュした古いユーザー情報（is_activeなど）を破棄
+        auth_cache.invalidate_user(user.id)
         return user
\ No newline at end of file
@@ -0,0 +1,71 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db import get_db
+from app.db.schema.analytics import (
+    RiskDashboard,
+    RiskLevelCount,
+    RiskMatrixCell,
+    RiskMetrics,
+    SankeyLink,
+)
+from app.db.schema.user import UserInfo
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.routers.auth import get_current_user
+from app.usecases.analytics_usecase import AnalyticsUseCase
+
+router = APIRouter()
+
+
+@router.get("/dashboard", response_model=RiskDashboard)
+async def get_dashboard(
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """ダッシュボードの集計（メトリクス・レベル別件数・マトリックス・サンキー）をまとめて返す"""
+    usecase = AnalyticsUseCase(AnalyticsRepository(db))
+    return await usecase.get_dashboard(current_user.id)
+
+
+@router.get("/metrics", response_model=RiskMetrics)
+async def get_metrics(
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """件数・平均リスクスコア（対策前後）・改善率・リスク低減率"""
+    usecase = AnalyticsUseCase(AnalyticsRepository(db))
+    return await usecase.get_metrics(current_user.id)
+
+
+@router.get("/risk-levels", response_model=List[RiskLevelCount])
+async def get_risk_levels(
+    after: bool = False,
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """リスクレベル別の件数（after=trueで対策後）"""
+    usecase = AnalyticsUseCase(AnalyticsRepository(db))
+    return await usecase.get_risk_levels(current_user.id, after)
+
+
+@router.get("/risk-matrix", response_model=List[RiskMatrixCell])
+async def get_risk_matrix(
+    after: bool = False,
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """重篤度×発生確率ごとの件数（after=trueで対策後）"""
+    usecase = AnalyticsUseCase(AnalyticsRepository(db))
+    return await usecase.get_risk_matrix(current_user.id, after)
+
+
+@router.get("/sankey", response_model=List[SankeyLink])
+async def get_sankey(
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """対策前レベル→対策分類→対策後レベルの流れ"""
+    usecase = AnalyticsUseCase(AnalyticsRepository(db))
+    return await usecase.get_sankey(current_user.id)
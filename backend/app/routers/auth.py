@@ -1,11 +1,13 @@
 from app.db.db import get_db
 from fastapi import APIRouter, Depends, Response, Request, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.user_repository import UserRepository
 from app.usecases.auth_usecase import AuthUseCase, GOOGLE_CLIENT_ID, GOOGLE_REDIRECT_URI
 from app.db.schema.auth import LoginRequest, LoginResponse
-from app.db.schema.user import UserInfo
+from app.db.schema.user import ADMIN_ROLE, UserInfo
 from app.services.auth_service import AuthService
+from app.services.auth_cache import auth_cache
+from app.services.password_hasher import password_hasher
 from urllib.parse import urlencode
 import uuid
 
@@ -20,17 +22,26 @@ async def get_current_user(request: Request) -> UserInfo:
         )
     return user_info
 
+async def get_admin_user(current_user: UserInfo = Depends(get_current_user)) -> UserInfo:
+    """全ユーザー共通のデータを変更するAPI用。管理者以外は403"""
+    if current_user.role != ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理者のみ実行できます"
+        )
+    return current_user
+
 @router.post("/login", response_model=LoginResponse)
 async def login(
     login_data: LoginRequest,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     ログイン後、アクセストークンとリフレッシュトークンをCookieに設定
     """
     usecase = AuthUseCase(UserRepository(db))
-    return usecase.login(login_data.name, login_data.password, response)
+    return await usecase.login(login_data.name, login_data.password, response)
 
 # @router.get("/auth/google")
 # async def google_auth_start(request: Request):
@@ -59,7 +70,7 @@ async def login(
 #     state: str,
 #     request: Request,
 #     response: Response,
-#     db: Session = Depends(get_db)
+#     db: AsyncSession = Depends(get_db)
 # ):
 #     """
 #     Google OAuth認証のコールバックエンドポイント。
@@ -69,23 +80,28 @@ async def login(
 #     usecase = AuthUseCase(UserRepository(db))
 #     return await usecase.google_login(code, state, request, response)
 
+@router.get("/stats")
+async def get_auth_stats(current_user: UserInfo = Depends(get_current_user)):
+    """認証キャッシュのヒット率・1リクエストあたりの認証時間（マイクロ秒）とパスワード検証の状況"""
+    return {"cache": auth_cache.stats(), "password_hasher": password_hasher.stats()}
+
 @router.post("/refresh", response_model=LoginResponse)
 async def refresh_tokens(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Cookieからリフレッシュトークンを読み取り、検証後に新しいトークンをCookieに設定
     """
     usecase = AuthUseCase(UserRepository(db))
-    return usecase.refresh_tokens(request, response)
+    return await usecase.refresh_tokens(request, response)
 
 @router.post("/logout", response_model=LoginResponse)
 async def logout(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: UserInfo = Depends(get_current_user) # ログアウトは認証済みユーザーのみ可能とする
 ):
     """
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from app.db.db import async_engine
+from app.db.pool import pool_status
+from app.db.schema.user import UserInfo
+from app.routers.auth import get_admin_user
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def get_pool_status(current_user: UserInfo = Depends(get_admin_user)):
+    """DB接続プールの利用状況（チェックアウト中の接続数・取得待ち時間・オーバーフロー）（管理者のみ）"""
+    return pool_status(async_engine)
@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db import get_db
+from app.db.schema.history import HistoryDetail, HistoryPage
+from app.db.schema.user import UserInfo
+from app.repositories.history_repository import HistoryRepository
+from app.routers.auth import get_current_user
+from app.usecases.export_usecase import (
+    EXPORT_MEDIA_TYPES,
+    ExportUseCase,
+    export_headers,
+)
+from app.usecases.history_usecase import (
+    HISTORY_PAGE_DEFAULT_LIMIT,
+    HISTORY_PAGE_MAX_LIMIT,
+    HISTORY_SEARCH_MAX_LENGTH,
+    HistoryUseCase,
+)
+
+router = APIRouter()
+
+
+@router.get("", response_model=HistoryPage)
+async def list_histories(
+    type: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_DEFAULT_LIMIT, ge=1, le=HISTORY_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    ログインユーザーの履歴一覧（新しい順）。
+    続きはレスポンスのnext_cursorをcursorに指定して取得する
+    """
+    usecase = HistoryUseCase(HistoryRepository(db))
+    return await usecase.list_histories(current_user.id, limit, type, cursor)
+
+
+@router.get("/search", response_model=HistoryPage)
+async def search_histories(
+    q: str = Query(..., min_length=1, max_length=HISTORY_SEARCH_MAX_LENGTH),
+    type: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_DEFAULT_LIMIT, ge=1, le=HISTORY_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    危険性・有害性／リスク低減措置の本文検索（例: q=墜落）。
+    空白区切りの語はAND条件。ページングは一覧と同じくnext_cursorで行う
+    """
+    usecase = HistoryUseCase(HistoryRepository(db))
+    return await usecase.search_histories(current_user.id, q, limit, type, cursor)
+
+
+@router.get("/export")
+async def export_histories(
+    format: Literal["csv", "xlsx"] = "csv",
+    user_id: Optional[int] = None,
+    type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: UserInfo = Depends(get_current_user),
+):
+    """
+    履歴をCSV / XLSXでダウンロードする（古い順）。
+    created_fromは以上、created_toは未満。user_idは管理者のみ他のユーザーを指定でき、省略時は全ユーザー
+    """
+    usecase = ExportUseCase(current_user)
+    return StreamingResponse(
+        usecase.export_histories(format, user_id, type, created_from, created_to),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=export_headers("histories", format),
+    )
+
+
+@router.get("/{history_id}", response_model=HistoryDetail)
+async def get_history(
+    history_id: int,
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """履歴の詳細（生成結果のcontentを含む）"""
+    usecase = HistoryUseCase(HistoryRepository(db))
+    return await usecase.get_history(current_user.id, history_id)
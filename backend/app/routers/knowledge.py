@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, File, UploadFile, status
+from typing import List
+from app.db.schema.user import UserInfo
+from app.routers.auth import get_admin_user
+from app.usecases.ingest_usecase import IngestUseCase
+
+router = APIRouter()
+
+
+@router.post("/ingest", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_knowledge(
+    files: List[UploadFile] = File(...),
+    force: bool = False,
+    current_user: UserInfo = Depends(get_admin_user),
+):
+    """
+    PDF・CSV・XLSXのナレッジファイルを取り込むジョブを開始する（管理者のみ）。
+    取り込み済みの内容のファイルはforce=trueを指定しない限り読み飛ばす
+    """
+    usecase = IngestUseCase()
+    return await usecase.create_job_from_uploads(files, force)
+
+
+# ジョブの読み込みはファイルI/Oのため、同期関数にしてスレッドプールで実行させる
+@router.get("/ingest/{job_id}")
+def get_ingest_job(job_id: str, current_user: UserInfo = Depends(get_admin_user)):
+    """取り込みジョブとファイルごとの進捗"""
+    usecase = IngestUseCase()
+    return usecase.get_job(job_id)
+
+
+@router.post("/ingest/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED)
+async def resume_ingest_job(
+    job_id: str, current_user: UserInfo = Depends(get_admin_user)
+):
+    """中断・失敗したジョブをファイルごとのチェックポイントから再開"""
+    usecase = IngestUseCase()
+    return await usecase.resume(job_id)
@@ -0,0 +1,25 @@
+import secrets
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import Response
+
+from app.services.metrics import CONTENT_TYPE, METRICS_TOKEN, render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """
+    Prometheus形式のメトリクス。Authorization: Bearer <METRICS_TOKEN> が必要。
+    METRICS_TOKENが未設定なら無効（404）にして、外部に公開しない
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    authorization = request.headers.get("authorization", "")
+    if not secrets.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token.",
+        )
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db import get_db
+from app.db.schema.risk_assessment import RiskAssessmentImportResult
+from app.db.schema.user import UserInfo
+from app.repositories.risk_assessment_repository import RiskAssessmentRepository
+from app.routers.auth import get_current_user
+from app.usecases.export_usecase import (
+    EXPORT_MEDIA_TYPES,
+    ExportUseCase,
+    export_headers,
+)
+from app.usecases.risk_assessment_usecase import RiskAssessmentUseCase
+
+router = APIRouter()
+
+
+@router.post("/import", response_model=RiskAssessmentImportResult)
+async def import_risk_assessments(
+    file: UploadFile = File(...),
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    CSV・XLSX（1行目が列名。列名はExcel出力と同じ）のリスクアセスメントを取り込む。
+    ID・リスク点数・リスクレベル・作成日・更新日の列は読まず、サーバー側で付け直す
+    """
+    usecase = RiskAssessmentUseCase(RiskAssessmentRepository(db))
+    return await usecase.import_file(current_user.id, file)
+
+
+@router.get("/export")
+async def export_risk_assessments(
+    format: Literal["csv", "xlsx"] = "csv",
+    user_id: Optional[int] = None,
+    measure_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: UserInfo = Depends(get_current_user),
+):
+    """
+    リスクアセスメントをCSV / XLSXでダウンロードする（列名はExcel出力・取り込みと同じ）。
+    created_fromは以上、created_toは未満。user_idは管理者のみ他のユーザーを指定でき、省略時は全ユーザー
+    """
+    usecase = ExportUseCase(current_user)
+    return StreamingResponse(
+        usecase.export_risk_assessments(
+            format, user_id, measure_type, created_from, created_to
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=export_headers("risk_assessments", format),
+    )
@@ -0,0 +1,149 @@
+# app/services/auth_cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+from app.db.schema.user import UserInfo
+from app.services.auth_service import AuthService
+
+# 認証キャッシュ設定
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000"))
+# 無効化は同じプロセス内の更新にしか届かないため、他プロセスでの変更はこの秒数で反映される
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+
+
+@dataclass
+class AuthCacheStats:
+    requests: int = 0
+    token_hits: int = 0
+    token_misses: int = 0
+    user_hits: int = 0
+    user_misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+class AuthCache:
+    """
+    AuthMiddleware用のキャッシュ。
+    検証済みJWTのペイロードはトークンのダイジェストをキーに有効期限(exp)まで、
+    ユーザー情報はユーザーIDをキーに短いTTLで保持する
+    """
+
+    def __init__(
+        self,
+        token_max_entries: int = AUTH_TOKEN_CACHE_MAX_ENTRIES,
+        user_max_entries: int = AUTH_USER_CACHE_MAX_ENTRIES,
+        user_ttl_seconds: float = AUTH_USER_CACHE_TTL_SECONDS,
+        enabled: bool = AUTH_CACHE_ENABLED,
+    ):
+        self.token_max_entries = token_max_entries
+        self.user_max_entries = user_max_entries
+        self.user_ttl_seconds = user_ttl_seconds
+        self.enabled = enabled
+        self.counters = AuthCacheStats()
+        # ダイジェスト -> (ペイロード, exp)
+        self._tokens: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        # ユーザーID -> (ユーザー情報, 保存時刻)
+        self._users: "OrderedDict[int, Tuple[UserInfo, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_digest(token: str) -> str:
+        # トークン本体をメモリ上のキーとして残さない
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def verify_token(self, token: str, token_type: str) -> Optional[dict]:
+        """AuthService.verify_tokenの結果をexpまでキャッシュする"""
+        if not self.enabled:
+            return AuthService.verify_token(token, token_type)
+        key = self.token_digest(token)
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached is not None:
+                payload, expires_at = cached
+                if time.time() < expires_at:
+                    self._tokens.move_to_end(key)
+                    self.counters.token_hits += 1
+                    return payload if payload.get("type") == token_type else None
+                del self._tokens[key]
+                self.counters.expired += 1
+            self.counters.token_misses += 1
+
+        payload = AuthService.verify_token(token, token_type)
+        # 不正なトークンやexpの無いトークンはキャッシュしない
+        if payload and isinstance(payload.get("exp"), (int, float)):
+            with self._lock:
+                self._tokens[key] = (payload, float(payload["exp"]))
+                while len(self._tokens) > self.token_max_entries:
+                    self._tokens.popitem(last=False)
+                    self.counters.evictions += 1
+        return payload
+
+    def get_user(self, user_id: int) -> Optional[UserInfo]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None:
+                user, stored_at = cached
+                if time.monotonic() - stored_at < self.user_ttl_seconds:
+                    self._users.move_to_end(user_id)
+                    self.counters.user_hits += 1
+                    return user
+                del self._users[user_id]
+                self.counters.expired += 1
+            self.counters.user_misses += 1
+            return None
+
+    def put_user(self, user_id: int, user: UserInfo) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._users[user_id] = (user, time.monotonic())
+            while len(self._users) > self.user_max_entries:
+                self._users.popitem(last=False)
+                self.counters.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """ユーザー情報の更新時に呼ぶ"""
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self.counters.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+            self.counters.invalidations += 1
+
+    def record(self, seconds: float) -> None:
+        """認証1回あたりの所要時間を記録"""
+        with self._lock:
+            self.counters.requests += 1
+            self.counters.total_seconds += seconds
+            self.counters.max_seconds = max(self.counters.max_seconds, seconds)
+
+    def stats(self) -> dict:
+        data = asdict(self.counters)
+        requests = data["requests"]
+        data["avg_us"] = data["total_seconds"] / requests * 1e6 if requests else 0.0
+        data["max_us"] = data.pop("max_seconds") * 1e6
+        data["token_entries"] = len(self._tokens)
+        data["user_entries"] = len(self._users)
+        data["enabled"] = self.enabled
+        data["user_ttl_seconds"] = self.user_ttl_seconds
+        return data
+
+
+auth_cache = AuthCache()
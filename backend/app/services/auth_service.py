@@ -6,7 +6,10 @@ from fastapi import HTTPException, status
 import os
 import uuid
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcryptのコスト。変更するとログイン時に既存のハッシュが新しいコストで作り直される
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = "HS256"
@@ -14,6 +17,11 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 class AuthService:
+    SECRET_KEY = SECRET_KEY
+    ALGORITHM = ALGORITHM
+    ACCESS_TOKEN_EXPIRE_MINUTES = ACCESS_TOKEN_EXPIRE_MINUTES
+    REFRESH_TOKEN_EXPIRE_DAYS = REFRESH_TOKEN_EXPIRE_DAYS
+
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """パスワードの検証"""
@@ -0,0 +1,285 @@
+# app/services/client_registry.py
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+import aiohttp
+import httpx
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
+from langchain_community.vectorstores.azuresearch import AzureSearch
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from starlette.concurrency import run_in_threadpool
+from app.services.embedding_cache import CachedEmbeddings, embedding_cache
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+AZURE_API_KEY = os.getenv("AZURE_API_KEY")
+AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
+AZURE_INDEX_NAME = os.getenv("AZURE_INDEX_NAME")
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+CHAT_MODEL = "gpt-4-1106-preview"
+FULL_VECTOR_DIM = 3072
+# 埋め込みの次元数（text-embedding-3系のdimensions指定。検索先のインデックスも同じ次元数で作り直すこと）
+VECTOR_DIM = int(os.getenv("EMBEDDING_DIMENSIONS", str(FULL_VECTOR_DIM)))
+
+# 接続プール設定
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "100"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "120"))
+AZURE_SEARCH_POOL_SIZE = int(os.getenv("AZURE_SEARCH_POOL_SIZE", "50"))
+AZURE_SEARCH_CONNECT_TIMEOUT = float(os.getenv("AZURE_SEARCH_CONNECT_TIMEOUT", "10"))
+AZURE_SEARCH_READ_TIMEOUT = float(os.getenv("AZURE_SEARCH_READ_TIMEOUT", "30"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+
+
+@dataclass
+class PoolStats:
+    """接続プールごとの利用状況"""
+
+    pool_size: int
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    pool_waits: int = 0
+    total_seconds: float = 0.0
+
+    def begin(self) -> float:
+        self.in_flight += 1
+        self.requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.perf_counter()
+
+    def end(self, started: float, failed: bool = False) -> None:
+        self.in_flight -= 1
+        self.total_seconds += time.perf_counter() - started
+        if failed:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        data = asdict(self)
+        data["avg_seconds"] = (
+            self.total_seconds / self.requests if self.requests else 0.0
+        )
+        return data
+
+
+class _InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """リクエスト数・同時実行数を記録するhttpxトランスポート"""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = self.stats.begin()
+        try:
+            response = await super().handle_async_request(request)
+        except Exception:
+            self.stats.end(started, failed=True)
+            raise
+        self.stats.end(started, failed=response.status_code >= 500)
+        return response
+
+    def connection_counts(self) -> dict:
+        connections = getattr(self._pool, "connections", [])
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+        }
+
+
+def _build_trace_config(stats: PoolStats) -> aiohttp.TraceConfig:
+    """aiohttpのトレースフックで接続プールの利用状況を記録"""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.started = stats.begin()
+
+    async def on_request_end(session, ctx, params):
+        stats.end(ctx.started, failed=params.response.status >= 500)
+
+    async def on_request_exception(session, ctx, params):
+        stats.end(ctx.started, failed=True)
+
+    async def on_connection_create_end(session, ctx, params):
+        stats.connections_created += 1
+
+    async def on_connection_reuseconn(session, ctx, params):
+        stats.connections_reused += 1
+
+    async def on_connection_queued_start(session, ctx, params):
+        stats.pool_waits += 1
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_connection_queued_start.append(on_connection_queued_start)
+    return trace_config
+
+
+def embedding_cache_namespace() -> str:
+    """次元数を変えた場合は別のキャッシュキーになるようにする"""
+    if VECTOR_DIM == FULL_VECTOR_DIM:
+        return EMBEDDING_MODEL
+    return f"{EMBEDDING_MODEL}:{VECTOR_DIM}"
+
+
+class ClientRegistry:
+    """
+    OpenAI / Azure AI Search のクライアントをプロセス内で共有するレジストリ。
+    FastAPIのlifespanで起動・終了し、keep-alive接続プールを使い回す
+    """
+
+    def __init__(self):
+        self.openai_stats = PoolStats(pool_size=OPENAI_POOL_SIZE)
+        self.azure_stats = PoolStats(pool_size=AZURE_SEARCH_POOL_SIZE)
+        self._openai_transport: Optional[_InstrumentedTransport] = None
+        self._openai_http: Optional[httpx.AsyncClient] = None
+        self._azure_session: Optional[aiohttp.ClientSession] = None
+        self._embeddings: Optional[CachedEmbeddings] = None
+        self._llms: Dict[str, ChatOpenAI] = {}
+        self._vectorstore: Optional[AzureSearch] = None
+        self._vectorstore_lock = asyncio.Lock()
+
+    async def startup(self) -> None:
+        """接続プールとOpenAIクライアントの生成"""
+        self._openai_transport = _InstrumentedTransport(
+            self.openai_stats,
+            limits=httpx.Limits(
+                max_connections=OPENAI_POOL_SIZE,
+                max_keepalive_connections=OPENAI_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            ),
+        )
+        self._openai_http = httpx.AsyncClient(
+            transport=self._openai_transport,
+            timeout=httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        )
+        self._azure_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=AZURE_SEARCH_POOL_SIZE,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ),
+            trace_configs=[_build_trace_config(self.azure_stats)],
+        )
+        self._embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                openai_api_key=OPENAI_API_KEY,
+                model=EMBEDDING_MODEL,
+                dimensions=VECTOR_DIM if VECTOR_DIM != FULL_VECTOR_DIM else None,
+                http_async_client=self._openai_http,
+            ),
+            model=embedding_cache_namespace(),
+            cache=embedding_cache,
+        )
+
+    async def shutdown(self) -> None:
+        """進行中の接続を閉じてプールを解放"""
+        if self._vectorstore is not None:
+            await self._vectorstore.async_client.close()
+            self._vectorstore.client.close()
+            self._vectorstore = None
+        self._llms.clear()
+        self._embeddings = None
+        if self._openai_http is not None:
+            await self._openai_http.aclose()
+            self._openai_http = None
+        if self._azure_session is not None:
+            await self._azure_session.close()
+            self._azure_session = None
+
+    @property
+    def embeddings(self) -> CachedEmbeddings:
+        if self._embeddings is None:
+            raise RuntimeError("ClientRegistry is not started")
+        return self._embeddings
+
+    def get_llm(self, model: str = CHAT_MODEL) -> ChatOpenAI:
+        """モデル名ごとにChatOpenAIを1つだけ生成して共有"""
+        if self._openai_http is None:
+            raise RuntimeError("ClientRegistry is not started")
+        llm = self._llms.get(model)
+        if llm is None:
+            llm = ChatOpenAI(
+                openai_api_key=OPENAI_API_KEY,
+                model=model,
+                temperature=0,
+                http_async_client=self._openai_http,
+            )
+            self._llms[model] = llm
+        return llm
+
+    async def get_vectorstore(self) -> AzureSearch:
+        """
+        初回呼び出し時にAzureSearchを生成する。
+        コンストラクタでインデックス取得の同期通信が走るため、起動時ではなく
+        初回利用時にスレッドプールで生成する
+        """
+        if self._azure_session is None:
+            raise RuntimeError("ClientRegistry is not started")
+        if self._vectorstore is None:
+            async with self._vectorstore_lock:
+                if self._vectorstore is None:
+                    vectorstore = await run_in_threadpool(self._build_vectorstore)
+                    # 非同期クライアントを共有セッション上のものに差し替える
+                    await vectorstore.async_client.close()
+                    vectorstore.async_client = AsyncSearchClient(
+                        endpoint=AZURE_SEARCH_ENDPOINT,
+                        index_name=AZURE_INDEX_NAME,
+                        credential=AzureKeyCredential(AZURE_API_KEY),
+                        transport=AioHttpTransport(
+                            session=self._azure_session, session_owner=False
+                        ),
+                        connection_timeout=AZURE_SEARCH_CONNECT_TIMEOUT,
+                        read_timeout=AZURE_SEARCH_READ_TIMEOUT,
+                        user_agent="langchain",
+                    )
+                    self._vectorstore = vectorstore
+        return self._vectorstore
+
+    def _build_vectorstore(self) -> AzureSearch:
+        return AzureSearch(
+            azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
+            azure_search_key=AZURE_API_KEY,
+            index_name=AZURE_INDEX_NAME,
+            embedding_function=self.embeddings,
+            fields={"vector": "contentVector"},
+            # 次元数を明示し、次元数確認用の埋め込みAPI呼び出しを省略
+            vector_search_dimensions=VECTOR_DIM,
+            additional_search_client_options={
+                "connection_timeout": AZURE_SEARCH_CONNECT_TIMEOUT,
+                "read_timeout": AZURE_SEARCH_READ_TIMEOUT,
+            },
+        )
+
+    def stats(self) -> dict:
+        """接続プールの利用状況"""
+        openai = self.openai_stats.snapshot()
+        if self._openai_transport is not None:
+            openai.update(self._openai_transport.connection_counts())
+        azure = self.azure_stats.snapshot()
+        if self._azure_session is not None and self._azure_session.connector:
+            connector = self._azure_session.connector
+            idle = sum(len(c) for c in getattr(connector, "_conns", {}).values())
+            in_use = len(getattr(connector, "_acquired", ()))
+            azure["open_connections"] = idle + in_use
+            azure["idle_connections"] = idle
+        return {
+            "started": self._openai_http is not None,
+            "openai": openai,
+            "azure_search": azure,
+            "vectorstore_ready": self._vectorstore is not None,
+            "llm_models": sorted(self._llms),
+        }
+
+
+client_registry = ClientRegistry()
@@ -0,0 +1,292 @@
+# app/services/embedding_cache.py
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from starlette.concurrency import run_in_threadpool
+
+# 埋め込みキャッシュ設定
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+# 空文字の場合はファイル層を無効化
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "/tmp/daiichi-embedding-cache")
+# ファイル層の合計サイズの上限。超えたら最終利用が古いファイルから削除する
+EMBEDDING_CACHE_DISK_MAX_BYTES = int(
+    os.getenv("EMBEDDING_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024))
+)
+# 削除時は上限のこの割合まで減らし、書き込みのたびに走査しないようにする
+DISK_PRUNE_RATIO = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """全角・半角の揺れと空白の差異を吸収したキャッシュ用テキスト"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """正規化したテキストのキー（埋め込みには正規化前のテキストを渡す）"""
+    normalized = normalize_text(text)
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    disk_evictions: int = 0
+    disk_errors: int = 0
+
+
+class EmbeddingCache:
+    """
+    埋め込みベクトルのコンテンツアドレス型キャッシュ。
+    1層目はバイト数上限付きのLRU、2層目はfloat32のバイナリファイル
+    （合計サイズが上限を超えたら、更新日時が古いファイルから削除する）
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        directory: Optional[str] = EMBEDDING_CACHE_DIR,
+        disk_max_bytes: int = EMBEDDING_CACHE_DISK_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory or None
+        self.disk_max_bytes = disk_max_bytes
+        self.counters = EmbeddingCacheStats()
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # ファイル層の合計サイズ（Noneなら未走査）。他のワーカーの書き込み分は
+        # 含まないため、削除時の走査で実際の値に合わせる
+        self._disk_bytes: Optional[int] = None
+        self._disk_lock = threading.Lock()
+
+    def get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.counters.memory_hits += 1
+            return vector
+
+    def put_memory(self, key: str, vector: np.ndarray) -> None:
+        if vector.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.counters.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.f32")
+
+    def get_disk(self, key: str) -> Optional[np.ndarray]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            vector = np.fromfile(path, dtype=np.float32)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            self.counters.disk_errors += 1
+            return None
+        if vector.size == 0:
+            return None
+        self.counters.disk_hits += 1
+        try:
+            # 更新日時を最終利用日時として使い、よく使うファイルを削除対象から外す
+            os.utime(path)
+        except OSError:
+            pass
+        return vector
+
+    def put_disk(self, key: str, vector: np.ndarray) -> None:
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            vector.astype(np.float32, copy=False).tofile(tmp_path)
+            # 書き込み途中のファイルを読まないよう、リネームで置き換える
+            os.replace(tmp_path, path)
+        except OSError:
+            self.counters.disk_errors += 1
+            return
+        with self._disk_lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += vector.nbytes
+            if self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """ファイル層の合計サイズを数え直し、上限を超えていれば古いファイルから削除"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".f32"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if total > self.disk_max_bytes:
+            target = self.disk_max_bytes * DISK_PRUNE_RATIO
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    self.counters.disk_errors += 1
+                    continue
+                total -= size
+                self.counters.disk_evictions += 1
+        self._disk_bytes = total
+
+    def lookup(self, key: str) -> Optional[np.ndarray]:
+        """メモリ→ファイルの順に検索し、ファイル層のヒットはメモリに昇格"""
+        vector = self.get_memory(key)
+        if vector is not None:
+            return vector
+        vector = self.get_disk(key)
+        if vector is not None:
+            self.put_memory(key, vector)
+            return vector
+        self.counters.misses += 1
+        return None
+
+    def store(self, key: str, vector: np.ndarray) -> None:
+        self.put_memory(key, vector)
+        self.put_disk(key, vector)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        data = asdict(self.counters)
+        lookups = data["memory_hits"] + data["disk_hits"] + data["misses"]
+        data["hit_rate"] = (
+            (data["memory_hits"] + data["disk_hits"]) / lookups if lookups else 0.0
+        )
+        data["entries"] = len(self._entries)
+        data["bytes"] = self._bytes
+        data["max_bytes"] = self.max_bytes
+        data["disk_enabled"] = bool(self.directory)
+        data["disk_bytes"] = self._disk_bytes
+        data["disk_max_bytes"] = self.disk_max_bytes
+        return data
+
+
+embedding_cache = EmbeddingCache()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    EmbeddingCacheを挟んだEmbeddings。
+    AzureSearchのembedding_functionとしてそのまま渡せる
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    async def aembed_arrays(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        複数テキストの埋め込みをfloat32配列で返す。
+        キャッシュに無いテキストだけを1回のAPI呼び出しにまとめて生成
+        """
+        keys = [cache_key(self.model, text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        for key in keys:
+            if key in vectors:
+                continue
+            vector = self.cache.get_memory(key)
+            if vector is not None:
+                vectors[key] = vector
+
+        pending = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if pending:
+            # ファイル層の読み込みはディスクI/Oのためスレッドプールで実行
+            found = await run_in_threadpool(
+                lambda: {key: self.cache.lookup(key) for key in pending}
+            )
+            vectors.update({k: v for k, v in found.items() if v is not None})
+
+        # 同じキーのテキストは最初のものだけ埋め込む
+        misses = list(
+            {
+                key: text
+                for key, text in reversed(list(zip(keys, texts)))
+                if key not in vectors
+            }.items()
+        )[::-1]
+        if misses:
+            embedded = await self.embeddings.aembed_documents(
+                [text for _, text in misses]
+            )
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32)
+                for (key, _), vector in zip(misses, embedded)
+            }
+            vectors.update(new_vectors)
+            await run_in_threadpool(
+                lambda: [self.cache.store(k, v) for k, v in new_vectors.items()]
+            )
+        return [vectors[key] for key in keys]
+
+    async def aembed_arrays_uncached(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        キャッシュを読み書きせずに埋め込みを生成する（ナレッジの一括取り込み用）。
+        文書の埋め込みで問い合わせ用のLRUとファイル層を埋めないようにする
+        """
+        embedded = await self.embeddings.aembed_documents(list(texts))
+        return [np.asarray(vector, dtype=np.float32) for vector in embedded]
+
+    async def aembed_array(self, text: str) -> np.ndarray:
+        return (await self.aembed_arrays([text]))[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in await self.aembed_arrays(texts)]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_array(text)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        results = []
+        for text in texts:
+            key = cache_key(self.model, text)
+            vector = self.cache.lookup(key)
+            if vector is None:
+                vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+                self.cache.store(key, vector)
+            results.append(vector.tolist())
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,157 @@
+# app/services/history_writer.py
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from app.db.db import AsyncSessionLocal
+from app.repositories.history_repository import HistoryRepository
+
+logger = logging.getLogger(__name__)
+
+# 履歴のwrite-behind設定
+HISTORY_WRITE_ENABLED = os.getenv("HISTORY_WRITE_ENABLED", "true").lower() == "true"
+HISTORY_FLUSH_INTERVAL_MS = int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500"))
+HISTORY_FLUSH_MAX_ROWS = int(os.getenv("HISTORY_FLUSH_MAX_ROWS", "200"))
+HISTORY_QUEUE_MAX_SIZE = int(os.getenv("HISTORY_QUEUE_MAX_SIZE", "10000"))
+# キューが満杯のときに空きを待つ時間。超えたら履歴を諦めてレスポンスを優先する
+HISTORY_ENQUEUE_TIMEOUT_MS = int(os.getenv("HISTORY_ENQUEUE_TIMEOUT_MS", "100"))
+
+
+@dataclass
+class HistoryWriterStats:
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0
+    flushes: int = 0
+    backpressure_waits: int = 0
+    total_flush_seconds: float = 0.0
+
+
+class HistoryWriter:
+    """
+    RAG結果などの履歴をキューに積み、バックグラウンドで
+    HISTORY_FLUSH_INTERVAL_MSごと、またはHISTORY_FLUSH_MAX_ROWS件ごとにまとめてINSERTする
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = HISTORY_FLUSH_INTERVAL_MS,
+        flush_max_rows: int = HISTORY_FLUSH_MAX_ROWS,
+        queue_max_size: int = HISTORY_QUEUE_MAX_SIZE,
+        enqueue_timeout_ms: int = HISTORY_ENQUEUE_TIMEOUT_MS,
+        enabled: bool = HISTORY_WRITE_ENABLED,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_rows = flush_max_rows
+        self.queue_max_size = queue_max_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.enabled = enabled
+        self.counters = HistoryWriterStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 停止時に書き込み漏れが出ないよう、集めている途中・書き込み中のバッチを持つ
+        self._pending: List[dict] = []
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_max_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """受付を止め、キューに残った履歴を書き込んでから終了する"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if self._inflight is not None:
+            await self._inflight
+        if self._pending:
+            rows, self._pending = self._pending, []
+            await self._write(rows)
+        await self._drain()
+        self._queue = None
+
+    async def enqueue(self, row: dict) -> bool:
+        """
+        履歴を1件積む。満杯なら最大HISTORY_ENQUEUE_TIMEOUT_MSだけ空きを待ち、
+        それでも空かなければ破棄してFalseを返す
+        """
+        queue = self._queue
+        if queue is None:
+            return False
+        try:
+            queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.counters.backpressure_waits += 1
+            try:
+                await asyncio.wait_for(queue.put(row), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.counters.dropped += 1
+                logger.warning("history queue is full; dropped a history row")
+                return False
+        self.counters.enqueued += 1
+        return True
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            rows = self._pending = [await queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.flush_max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._pending = []
+            self._inflight = asyncio.create_task(self._write(rows))
+            # 停止時のキャンセルで書き込み途中のバッチを失わない
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _drain(self) -> None:
+        queue = self._queue
+        while queue is not None and not queue.empty():
+            rows = []
+            while not queue.empty() and len(rows) < self.flush_max_rows:
+                rows.append(queue.get_nowait())
+            await self._write(rows)
+
+    async def _write(self, rows: List[dict]) -> None:
+        """まとめてINSERTする。失敗した履歴はログに残して破棄する"""
+        started = time.perf_counter()
+        try:
+            await self._insert(rows)
+            self.counters.written += len(rows)
+        except Exception:
+            self.counters.failed += len(rows)
+            logger.exception("failed to write %d history rows", len(rows))
+        finally:
+            self.counters.flushes += 1
+            self.counters.total_flush_seconds += time.perf_counter() - started
+
+    async def _insert(self, rows: List[dict]) -> None:
+        async with AsyncSessionLocal() as db:
+            await HistoryRepository(db).bulk_insert(rows)
+
+    def stats(self) -> dict:
+        data = asdict(self.counters)
+        data["queued"] = self._queue.qsize() if self._queue is not None else 0
+        data["enabled"] = self.enabled
+        data["running"] = self._task is not None
+        return data
+
+
+history_writer = HistoryWriter()
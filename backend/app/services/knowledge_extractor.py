@@ -0,0 +1,224 @@
+# app/services/knowledge_extractor.py
+"""
+ナレッジファイル（PDF / CSV / XLSX）から危険性・リスク低減措置のレコードを抽出する。
+プロセスプールで実行するため、アプリの設定やクライアントには依存させない
+"""
+import csv
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from app.services.spreadsheet import ENCODING_SAMPLE_BYTES, detect_encoding
+
+SUPPORTED_EXTENSIONS = (".pdf", ".csv", ".xlsx")
+
+HAZARD_HEADERS = ("危険性・有害性", "危険性又は有害性", "危険性", "有害性", "hazard")
+MITIGATION_HEADERS = ("リスク低減措置", "低減措置", "対策", "risk_mitigation")
+TASK_HEADERS = ("作業", "作業名", "task")
+ELEMENT_HEADERS = ("作業要素", "element")
+# ヘッダー行を探す範囲
+HEADER_SEARCH_ROWS = 20
+
+PDF_PAIR_PATTERN = re.compile(
+    r"(?:危険性・有害性|危険性又は有害性|危険性)\s*[:：]\s*(?P<hazard>.+?)\s*"
+    r"(?:リスク低減措置|低減措置|対策)\s*[:：]\s*(?P<mitigation>.+?)"
+    r"(?=(?:危険性・有害性|危険性又は有害性|危険性)\s*[:：]|\Z)",
+    re.DOTALL,
+)
+# 次の組の先頭に付いた番号（「2.」など）
+TRAILING_NUMBER_PATTERN = re.compile(r"\s+(?:\d+|[①-⑳])[.)、]?\s*$")
+
+
+def _clean(value) -> str:
+    if value is None:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", str(value)).split())
+
+
+def build_record(
+    file_name: str,
+    locator: str,
+    hazard: str,
+    risk_mitigation: str,
+    task: str = "",
+    element: str = "",
+) -> dict:
+    """インデックスに登録する1件。IDは内容から決めるため、再取り込みは上書きになる"""
+    lines = []
+    if task:
+        lines.append(f"作業: {task}")
+    if element:
+        lines.append(f"作業要素: {element}")
+    lines.append(f"危険性・有害性: {hazard}")
+    if risk_mitigation:
+        lines.append(f"リスク低減措置: {risk_mitigation}")
+    digest = hashlib.sha1(
+        "\x1f".join([file_name, locator, hazard, risk_mitigation]).encode("utf-8")
+    ).hexdigest()
+    metadata = {
+        "hazard": hazard,
+        "risk_mitigation": risk_mitigation,
+        "file_name": file_name,
+        "source": locator,
+    }
+    if task:
+        metadata["task"] = task
+    if element:
+        metadata["element"] = element
+    return {"id": digest, "content": "\n".join(lines), "metadata": metadata}
+
+
+def _find_column(headers: Sequence[str], aliases: Iterable[str]) -> Optional[int]:
+    aliases = [_clean(alias).lower() for alias in aliases]
+    normalized = [_clean(header).lower() for header in headers]
+    for alias in aliases:
+        if alias in normalized:
+            return normalized.index(alias)
+    return None
+
+
+def _rows_to_records(
+    file_name: str, rows: Iterator[Sequence], prefix: str
+) -> List[dict]:
+    """ヘッダー行を探し、以降の行をレコードにする"""
+    columns = None
+    records = []
+    for number, row in enumerate(rows, start=1):
+        if columns is None:
+            if number > HEADER_SEARCH_ROWS:
+                break
+            hazard = _find_column(row, HAZARD_HEADERS)
+            mitigation = _find_column(row, MITIGATION_HEADERS)
+            if hazard is not None and mitigation is not None:
+                columns = (
+                    hazard,
+                    mitigation,
+                    _find_column(row, TASK_HEADERS),
+                    _find_column(row, ELEMENT_HEADERS),
+                )
+            continue
+
+        def cell(index: Optional[int]) -> str:
+            return _clean(row[index]) if index is not None and index < len(row) else ""
+
+        hazard_text = cell(columns[0])
+        if not hazard_text:
+            continue
+        records.append(
+            build_record(
+                file_name,
+                f"{prefix}{number}",
+                hazard_text,
+                cell(columns[1]),
+                cell(columns[2]),
+                cell(columns[3]),
+            )
+        )
+    if columns is None:
+        raise ValueError("危険性・リスク低減措置の列が見つかりません")
+    return records
+
+
+def _detect_encoding(path: str) -> str:
+    with open(path, "rb") as f:
+        return detect_encoding(f.read(ENCODING_SAMPLE_BYTES))
+
+
+def extract_csv(path: str, file_name: str) -> List[dict]:
+    with open(path, encoding=_detect_encoding(path), newline="") as f:
+        return _rows_to_records(file_name, csv.reader(f), "row:")
+
+
+def extract_xlsx(path: str, file_name: str) -> List[dict]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        records = []
+        for sheet in workbook.worksheets:
+            try:
+                records.extend(
+                    _rows_to_records(
+                        file_name,
+                        sheet.iter_rows(values_only=True),
+                        f"{sheet.title}!row:",
+                    )
+                )
+            except ValueError:
+                # 該当列の無いシートは読み飛ばす
+                continue
+        if not records:
+            raise ValueError("危険性・リスク低減措置の列を持つシートがありません")
+        return records
+    finally:
+        workbook.close()
+
+
+def _chunk_text(text: str, max_chars: int) -> List[str]:
+    """行の区切りを優先してmax_chars以内に分割する"""
+    chunks, current = [], ""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        while len(line) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def extract_pdf(path: str, file_name: str, chunk_chars: int = 800) -> List[dict]:
+    """
+    「危険性: … 対策: …」の形式の記載は組ごとに、
+    それ以外のページは本文をchunk_chars文字程度に分割してレコードにする
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    records = []
+    for page_number, page in enumerate(reader.pages, start=1):
+        text = unicodedata.normalize("NFKC", page.extract_text() or "")
+        pairs = list(PDF_PAIR_PATTERN.finditer(text))
+        if pairs:
+            for index, match in enumerate(pairs, start=1):
+                records.append(
+                    build_record(
+                        file_name,
+                        f"page:{page_number}:{index}",
+                        _clean(match.group("hazard")),
+                        _clean(
+                            TRAILING_NUMBER_PATTERN.sub("", match.group("mitigation"))
+                        ),
+                    )
+                )
+            continue
+        for index, chunk in enumerate(_chunk_text(text, chunk_chars), start=1):
+            records.append(
+                build_record(
+                    file_name, f"page:{page_number}:{index}", _clean(chunk), ""
+                )
+            )
+    return records
+
+
+def extract_records(path: str, file_name: str) -> List[dict]:
+    """拡張子に応じて抽出処理を選ぶ（プロセスプールのワーカーで実行）"""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == ".pdf":
+        return extract_pdf(path, file_name)
+    if extension == ".csv":
+        return extract_csv(path, file_name)
+    if extension == ".xlsx":
+        return extract_xlsx(path, file_name)
+    raise ValueError(f"未対応のファイル形式です: {file_name}")
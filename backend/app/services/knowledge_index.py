@@ -0,0 +1,44 @@
+# app/services/knowledge_index.py
+import base64
+import json
+from typing import List
+
+import numpy as np
+from langchain_community.vectorstores.azuresearch import (
+    FIELDS_CONTENT,
+    FIELDS_CONTENT_VECTOR,
+    FIELDS_ID,
+    FIELDS_METADATA,
+)
+
+from app.services.client_registry import client_registry
+
+
+class KnowledgeIndexService:
+    @staticmethod
+    async def upsert(records: List[dict], vectors: List[np.ndarray]) -> int:
+        """
+        レコードをAzure AI Searchに登録（同じIDは上書き）。
+        LangChainのAzureSearchと同じフィールド形式で書き込み、検索側はそのまま読める
+        """
+        vectorstore = await client_registry.get_vectorstore()
+        documents = [
+            {
+                FIELDS_ID: base64.urlsafe_b64encode(
+                    record["id"].encode("utf-8")
+                ).decode("ascii"),
+                FIELDS_CONTENT: record["content"],
+                FIELDS_CONTENT_VECTOR: np.asarray(vector, dtype=np.float32).tolist(),
+                FIELDS_METADATA: json.dumps(record["metadata"], ensure_ascii=False),
+            }
+            for record, vector in zip(records, vectors)
+        ]
+        results = await vectorstore.async_client.merge_or_upload_documents(
+            documents=documents
+        )
+        failed = [result for result in results if not result.succeeded]
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)}件の登録に失敗しました: {failed[0].error_message}"
+            )
+        return len(documents)
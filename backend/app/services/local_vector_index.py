@@ -0,0 +1,373 @@
+# app/services/local_vector_index.py
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ローカルベクトルインデックスの設定
+RAG_LOCAL_INDEX_DIR = os.getenv("RAG_LOCAL_INDEX_DIR", "/tmp/daiichi-local-index")
+RAG_LOCAL_INDEX_BLOCK_ROWS = int(os.getenv("RAG_LOCAL_INDEX_BLOCK_ROWS", "65536"))
+# 量子化（none / int8 / binary）と、float32で再スコアリングする候補数
+RAG_LOCAL_INDEX_QUANTIZATION = os.getenv("RAG_LOCAL_INDEX_QUANTIZATION", "none")
+RAG_LOCAL_INDEX_RESCORE_CANDIDATES = int(
+    os.getenv("RAG_LOCAL_INDEX_RESCORE_CANDIDATES", "100")
+)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+INT8_FILE = "vectors.i8"
+INT8_SCALES_FILE = "scales.f32"
+BINARY_FILE = "vectors.b1"
+METADATA_FILE = "metadata.jsonl"
+# プロンプトの組み立てに使うメタデータ項目
+METADATA_FIELDS = ("hazard", "risk_mitigation", "file_name")
+QUANTIZATIONS = ("none", "int8", "binary")
+INT8_BLOCK_ROWS = 1024
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def reduce_dimensions(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """
+    先頭dim次元に切り詰めて正規化する。
+    text-embedding-3系はAPIのdimensions指定と同じ結果になる
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        return _unit_rows(vectors[None, :dim])[0]
+    return _unit_rows(vectors[:, :dim])
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """行ごとのスケールによる対称int8量子化"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """各次元の符号を1ビットに詰める（次元数の1/32のサイズ）"""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def _block_top_k(
+    score_block: Callable[[int, int], np.ndarray],
+    count: int,
+    k: int,
+    block_rows: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ブロックごとにスコアを計算してargpartitionで候補を絞り、
+    最後にまとめてスコアの降順に並べ替える
+    """
+    candidate_rows: List[np.ndarray] = []
+    candidate_scores: List[np.ndarray] = []
+    for start in range(0, count, block_rows):
+        scores = score_block(start, min(start + block_rows, count))
+        if scores.shape[0] > k:
+            top = np.argpartition(scores, -k)[-k:]
+            scores = scores[top]
+            rows = top + start
+        else:
+            rows = np.arange(start, start + scores.shape[0])
+        candidate_rows.append(rows)
+        candidate_scores.append(scores)
+
+    rows = np.concatenate(candidate_rows)
+    scores = np.concatenate(candidate_scores)
+    order = np.argsort(scores, kind="stable")[::-1][:k]
+    return rows[order], scores[order]
+
+
+class LocalVectorIndex:
+    """
+    プロセス内で検索するナレッジのベクトルインデックス。
+    ベクトルは正規化済みfloat32行列をメモリマップし、メタデータは別ファイルに持つ。
+    量子化を指定した場合は量子化済みベクトルで候補を絞り、候補だけをfloat32で再スコアリングする
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        metadata: List[dict],
+        manifest: Optional[dict] = None,
+        directory: Optional[str] = None,
+        quantization: str = RAG_LOCAL_INDEX_QUANTIZATION,
+        rescore_candidates: int = RAG_LOCAL_INDEX_RESCORE_CANDIDATES,
+        block_rows: int = RAG_LOCAL_INDEX_BLOCK_ROWS,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"未対応の量子化方式です: {quantization}")
+        self.vectors = vectors
+        self.metadata = metadata
+        self.manifest = manifest or {}
+        self.directory = directory
+        self.quantization = quantization
+        self.rescore_candidates = rescore_candidates
+        self.block_rows = block_rows
+        self._int8: Optional[np.ndarray] = None
+        self._int8_scales: Optional[np.ndarray] = None
+        self._binary: Optional[np.ndarray] = None
+        if quantization == "int8":
+            self._int8, self._int8_scales = self._load_int8()
+        elif quantization == "binary":
+            self._binary = self._load_binary()
+
+    @property
+    def count(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def scan_bytes(self) -> int:
+        """検索1回で走査する行列のバイト数"""
+        if self._int8 is not None:
+            return self._int8.nbytes + self._int8_scales.nbytes
+        if self._binary is not None:
+            return self._binary.nbytes
+        return self.vectors.nbytes
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        quantization: str = RAG_LOCAL_INDEX_QUANTIZATION,
+        rescore_candidates: int = RAG_LOCAL_INDEX_RESCORE_CANDIDATES,
+        block_rows: int = RAG_LOCAL_INDEX_BLOCK_ROWS,
+    ) -> "LocalVectorIndex":
+        """manifest.jsonを最後に書く前提で、書き込み完了済みのインデックスだけを読む"""
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"未対応のインデックス形式です: {manifest.get('version')}")
+        count, dim = manifest["count"], manifest["dim"]
+
+        vectors = _memmap(os.path.join(directory, VECTORS_FILE), np.float32, count, dim)
+        if vectors is None:
+            raise ValueError("ベクトルファイルのサイズがmanifestと一致しません")
+
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            metadata = [json.loads(line) for line in f if line.strip()]
+        if len(metadata) != count:
+            raise ValueError("メタデータの件数がmanifestと一致しません")
+        return cls(
+            vectors,
+            metadata,
+            manifest=manifest,
+            directory=directory,
+            quantization=quantization,
+            rescore_candidates=rescore_candidates,
+            block_rows=block_rows,
+        )
+
+    def _load_int8(self) -> Tuple[np.ndarray, np.ndarray]:
+        """書き出し済みの量子化ファイルがあれば使い、無ければfloat32から生成"""
+        if self.directory:
+            quantized = _memmap(
+                os.path.join(self.directory, INT8_FILE), np.int8, self.count, self.dim
+            )
+            scales = _memmap(
+                os.path.join(self.directory, INT8_SCALES_FILE), np.float32, self.count
+            )
+            if quantized is not None and scales is not None:
+                return quantized, scales
+        parts = [
+            quantize_int8(np.asarray(self.vectors[start : start + self.block_rows]))
+            for start in range(0, self.count, self.block_rows)
+        ]
+        if not parts:
+            return np.empty((0, self.dim), np.int8), np.empty(0, np.float32)
+        return (
+            np.concatenate([q for q, _ in parts]),
+            np.concatenate([s for _, s in parts]),
+        )
+
+    def _load_binary(self) -> np.ndarray:
+        width = (self.dim + 7) // 8
+        if self.directory:
+            packed = _memmap(
+                os.path.join(self.directory, BINARY_FILE), np.uint8, self.count, width
+            )
+            if packed is not None:
+                return packed
+        parts = [
+            quantize_binary(np.asarray(self.vectors[start : start + self.block_rows]))
+            for start in range(0, self.count, self.block_rows)
+        ]
+        return np.concatenate(parts) if parts else np.empty((0, width), np.uint8)
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """コサイン類似度の上位k件を (行番号, 類似度) で返す"""
+        if self.count == 0 or k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(f"次元数が一致しません: {query.shape} != ({self.dim},)")
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+
+        if self.quantization == "none":
+            rows, scores = _block_top_k(
+                lambda start, end: self.vectors[start:end] @ query,
+                self.count,
+                k,
+                self.block_rows,
+            )
+            return [(int(row), float(score)) for row, score in zip(rows, scores)]
+
+        # 量子化ベクトルで候補を絞り、候補だけをfloat32で再スコアリング
+        shortlist = max(k, self.rescore_candidates)
+        if self.quantization == "int8":
+            # float32への変換がキャッシュに収まるよう、小さいブロックで計算
+            rows, _ = _block_top_k(
+                lambda start, end: (self._int8[start:end].astype(np.float32) @ query)
+                * self._int8_scales[start:end],
+                self.count,
+                shortlist,
+                min(self.block_rows, INT8_BLOCK_ROWS),
+            )
+        else:
+            query_bits = quantize_binary(query)
+            rows, _ = _block_top_k(
+                # ハミング距離が小さいほど上位
+                lambda start, end: -np.bitwise_count(
+                    self._binary[start:end] ^ query_bits
+                ).sum(axis=1, dtype=np.int32),
+                self.count,
+                shortlist,
+                self.block_rows,
+            )
+        # メモリマップ上の読み込みが連続するよう行番号順に並べてから取得
+        rows = np.sort(rows)
+        scores = self.vectors[rows] @ query
+        order = np.argsort(scores, kind="stable")[::-1][:k]
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "dim": self.dim,
+            "quantization": self.quantization,
+            "rescore_candidates": self.rescore_candidates,
+            "scan_bytes": self.scan_bytes,
+            "created_at": self.manifest.get("created_at"),
+        }
+
+
+def _memmap(path: str, dtype, *shape: int) -> Optional[np.ndarray]:
+    """サイズが一致する場合だけメモリマップを返す"""
+    expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if not os.path.exists(path) or os.path.getsize(path) != expected:
+        return None
+    if expected == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r").reshape(shape)
+
+
+class LocalVectorIndexWriter:
+    """
+    ローカルインデックスの書き出し。ベクトルは逐次追記し、
+    commit()で各ファイルを置き換えてからmanifest.jsonを書く
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dim: int,
+        source: Optional[Dict] = None,
+        block_rows: int = RAG_LOCAL_INDEX_BLOCK_ROWS,
+    ):
+        self.directory = directory
+        self.dim = dim
+        self.source = source or {}
+        self.block_rows = block_rows
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+        self._suffix = f".{os.getpid()}.tmp"
+        self._vectors = open(self._tmp(VECTORS_FILE), "wb")
+        self._metadata = open(self._tmp(METADATA_FILE), "w", encoding="utf-8")
+
+    def _tmp(self, name: str) -> str:
+        return os.path.join(self.directory, name + self._suffix)
+
+    def add(self, vectors: np.ndarray, metadata: List[dict]) -> None:
+        """次元数が多いベクトルは先頭dim次元に切り詰めて書き込む"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(len(metadata), -1)
+        if vectors.shape[1] < self.dim:
+            raise ValueError(f"次元数が不足しています: {vectors.shape[1]} < {self.dim}")
+        reduce_dimensions(vectors, self.dim).tofile(self._vectors)
+        for item in metadata:
+            self._metadata.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.count += vectors.shape[0]
+
+    def _write_quantized(self) -> None:
+        """int8・binaryの量子化ファイルをfloat32のファイルからブロックごとに生成"""
+        vectors = _memmap(self._tmp(VECTORS_FILE), np.float32, self.count, self.dim)
+        with (
+            open(self._tmp(INT8_FILE), "wb") as int8_file,
+            open(self._tmp(INT8_SCALES_FILE), "wb") as scales_file,
+            open(self._tmp(BINARY_FILE), "wb") as binary_file,
+        ):
+            for start in range(0, self.count, self.block_rows):
+                block = np.asarray(vectors[start : start + self.block_rows])
+                quantized, scales = quantize_int8(block)
+                quantized.tofile(int8_file)
+                scales.tofile(scales_file)
+                quantize_binary(block).tofile(binary_file)
+        del vectors
+
+    def commit(self) -> dict:
+        self._vectors.close()
+        self._metadata.close()
+        self._write_quantized()
+        manifest = {
+            "version": FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": "float32",
+            "normalized": True,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "source": self.source,
+        }
+        # 読み込み側が古いmanifestで新しいファイルを読まないよう、先に消しておく
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for name in (
+            VECTORS_FILE,
+            METADATA_FILE,
+            INT8_FILE,
+            INT8_SCALES_FILE,
+            BINARY_FILE,
+        ):
+            os.replace(self._tmp(name), os.path.join(self.directory, name))
+        with open(self._tmp(MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(self._tmp(MANIFEST_FILE), manifest_path)
+        return manifest
+
+    def abort(self) -> None:
+        self._vectors.close()
+        self._metadata.close()
+        for name in (
+            VECTORS_FILE,
+            METADATA_FILE,
+            INT8_FILE,
+            INT8_SCALES_FILE,
+            BINARY_FILE,
+        ):
+            if os.path.exists(self._tmp(name)):
+                os.remove(self._tmp(name))
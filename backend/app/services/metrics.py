@@ -0,0 +1,84 @@
+# app/services/metrics.py
+"""
+Prometheusのメトリクス（prometheus_client）と、
+リクエスト単位の処理時間（Server-Timingヘッダー用）の記録。
+複数ワーカーで動かす場合はPROMETHEUS_MULTIPROC_DIRを設定すると、全ワーカー分を集計して返す
+"""
+import os
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# /metricsを保護するBearerトークン（空なら/metricsは無効）
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# レスポンスにServer-Timingヘッダーを付けるか
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+# 外部API呼び出しを含む処理時間（秒）のバケット
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def render_metrics() -> bytes:
+    """テキスト形式のメトリクス（マルチプロセスモードなら全ワーカーの合計）"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+# リクエスト内の処理ごとの合計時間（秒）と回数。ServerTimingMiddlewareが設定する
+_server_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "server_timings", default=None
+)
+
+
+def begin_server_timing() -> Dict[str, List[float]]:
+    """このリクエスト（と、ここから生成するタスク）の処理時間の記録先を用意する"""
+    timings: Dict[str, List[float]] = {}
+    _server_timings.set(timings)
+    return timings
+
+
+def record_server_timing(name: str, seconds: float) -> None:
+    timings = _server_timings.get()
+    if timings is None:
+        return
+    entry = timings.setdefault(name, [0.0, 0])
+    entry[0] += seconds
+    entry[1] += 1
+
+
+def format_server_timing(timings: Dict[str, List[float]], total: float) -> str:
+    """
+    例: embedding;dur=12.3, search;dur=45.6, llm_rags;desc="x2";dur=2100.0, total;dur=2200.1
+    同じ処理が複数回あれば合計時間（並行実行分も足し合わせる）と回数を出す
+    """
+    parts = []
+    for name, (seconds, count) in timings.items():
+        desc = f';desc="x{count}"' if count > 1 else ""
+        parts.append(f"{name}{desc};dur={seconds * 1000:.1f}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,116 @@
+# app/services/password_hasher.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.services.auth_service import pwd_context
+
+# パスワードハッシュ処理の設定
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# 実行中のほかに待たせておける件数。超えた分は503で断る
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+
+def _verify_and_update(
+    password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """検証し、コストが設定と異なれば新しいハッシュも返す（ワーカープロセスで実行）"""
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+@dataclass
+class PasswordHasherStats:
+    verifications: int = 0
+    hashes: int = 0
+    rehashed: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    total_seconds: float = 0.0
+
+
+class PasswordHasher:
+    """
+    bcryptの検証・ハッシュ化をプロセスプールで実行する。
+    イベントループを止めないよう呼び出し元はawaitで待ち、
+    待ち件数が上限を超えたリクエストはすぐに503を返す
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.counters = PasswordHasherStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, func, *args):
+        counters = self.counters
+        if counters.in_flight >= self.workers + self.max_pending:
+            counters.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent login attempts. Please retry.",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+            )
+        counters.in_flight += 1
+        counters.peak_in_flight = max(counters.peak_in_flight, counters.in_flight)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), func, *args
+            )
+        finally:
+            counters.in_flight -= 1
+            counters.total_seconds += time.perf_counter() - started
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        valid, new_hash = await self._run(_verify_and_update, password, hashed_password)
+        self.counters.verifications += 1
+        if new_hash:
+            self.counters.rehashed += 1
+        return valid, new_hash
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(_hash, password)
+        self.counters.hashes += 1
+        return hashed
+
+    def stats(self) -> dict:
+        data = asdict(self.counters)
+        completed = data["verifications"] + data["hashes"]
+        data["avg_ms"] = data["total_seconds"] / completed * 1000 if completed else 0.0
+        data["workers"] = self.workers
+        data["max_pending"] = self.max_pending
+        return data
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,84 @@
+# app/services/rag_metrics.py
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Histogram
+
+from app.services.metrics import LATENCY_BUCKETS, record_server_timing
+
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+DOC_BUCKETS = (0, 1, 2, 3, 5, 8, 10, 20)
+
+RAG_STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "RAGパイプラインの処理ごとの所要時間（秒）",
+    ("stage", "outcome"),
+    buckets=LATENCY_BUCKETS,
+)
+RAG_LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "rag_llm_first_token_seconds",
+    "ストリーミング生成で最初のトークンが届くまでの時間（秒）",
+    ("group",),
+    buckets=LATENCY_BUCKETS,
+)
+RAG_PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "LLMに送ったプロンプトのトークン数",
+    ("group",),
+    buckets=TOKEN_BUCKETS,
+)
+RAG_COMPLETION_TOKENS = Histogram(
+    "rag_completion_tokens",
+    "LLMが返した出力のトークン数",
+    ("group",),
+    buckets=TOKEN_BUCKETS,
+)
+RAG_RETRIEVED_DOCS = Histogram(
+    "rag_retrieved_docs",
+    "類似事例検索で取得した件数",
+    buckets=DOC_BUCKETS,
+)
+RAG_PROMPT_EXAMPLES = Histogram(
+    "rag_prompt_examples",
+    "重複除去・トークン予算の適用後にプロンプトへ含めた参考事例の件数",
+    buckets=DOC_BUCKETS,
+)
+RAG_PARSES = Counter(
+    "rag_parses",
+    "LLM出力のJSON解析結果（fallbackはraw_responseを返した件数）",
+    ("outcome",),
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    処理の所要時間をヒストグラムとServer-Timingに記録する。
+    例外で抜けた場合はoutcome=error、取り消し・クライアント切断ならcancelled
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        RAG_STAGE_SECONDS.labels(stage=name, outcome=outcome).observe(elapsed)
+        record_server_timing(name, elapsed)
+
+
+def observe_prompt(group: str, prompt_tokens: int) -> None:
+    RAG_PROMPT_TOKENS.labels(group=group).observe(prompt_tokens)
+
+
+def observe_completion(group: str, completion_tokens: int) -> None:
+    RAG_COMPLETION_TOKENS.labels(group=group).observe(completion_tokens)
+
+
+def observe_parse(ok: bool) -> None:
+    RAG_PARSES.labels(outcome="ok" if ok else "fallback").inc()
@@ -0,0 +1,249 @@
+# app/services/rag_result_cache.py
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.db.db import AsyncSessionLocal
+from app.repositories.knowledge_index_repository import KnowledgeIndexRepository
+from app.services.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# RAG結果キャッシュ設定
+RAG_CACHE_ENABLED = os.getenv("RAG_CACHE_ENABLED", "true").lower() == "true"
+RAG_CACHE_TTL_SECONDS = float(os.getenv("RAG_CACHE_TTL_SECONDS", "86400"))
+RAG_CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "2000"))
+RAG_CACHE_SIMILARITY_THRESHOLD = float(
+    os.getenv("RAG_CACHE_SIMILARITY_THRESHOLD", "0.97")
+)
+# DBの世代番号（他のワーカー・CLIでの取り込みを検知するため）を確認する間隔
+RAG_CACHE_VERSION_CHECK_SECONDS = float(
+    os.getenv("RAG_CACHE_VERSION_CHECK_SECONDS", "5")
+)
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    vector: np.ndarray
+    result: dict
+    created_at: float
+    index_version: int
+
+
+@dataclass
+class RAGResultCacheStats:
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class RAGResultCache:
+    """
+    (作業, 作業要素) ごとのRAG回答キャッシュ。
+    完全一致を優先し、無ければ入力埋め込みのコサイン類似度で近似一致を探す
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = RAG_CACHE_TTL_SECONDS,
+        max_entries: int = RAG_CACHE_MAX_ENTRIES,
+        similarity_threshold: float = RAG_CACHE_SIMILARITY_THRESHOLD,
+        enabled: bool = RAG_CACHE_ENABLED,
+        version_check_seconds: float = RAG_CACHE_VERSION_CHECK_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.enabled = enabled
+        self.version_check_seconds = version_check_seconds
+        # ナレッジインデックスの世代番号（DBの値を最後に確認したもの）
+        self.index_version = 0
+        self._version_checked_at = float("-inf")
+        self.counters = RAGResultCacheStats()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return "\x1f".join(normalize_text(part) for part in parts)
+
+    def _is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        return (
+            entry.index_version == self.index_version
+            and now - entry.created_at < self.ttl_seconds
+        )
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def get_exact(self, key: str) -> Optional[CacheEntry]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry, time.monotonic()):
+                self._drop(key)
+                self.counters.expired += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters.exact_hits += 1
+            return entry
+
+    def get_similar(self, vector: np.ndarray) -> Optional[Tuple[CacheEntry, float]]:
+        """閾値以上で最も類似度の高いエントリを返す"""
+        if not self.enabled:
+            return None
+        query = _unit(vector)
+        with self._lock:
+            if not self._entries:
+                self.counters.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack(
+                    [self._entries[key].vector for key in self._matrix_keys]
+                )
+            similarities = self._matrix @ query
+            now = time.monotonic()
+            for index in np.argsort(similarities)[::-1]:
+                similarity = float(similarities[index])
+                if similarity < self.similarity_threshold:
+                    break
+                key = self._matrix_keys[index]
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if not self._is_fresh(entry, now):
+                    self._drop(key)
+                    self.counters.expired += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.counters.semantic_hits += 1
+                return entry, similarity
+            self.counters.misses += 1
+            return None
+
+    def put(
+        self,
+        key: str,
+        vector: np.ndarray,
+        result: dict,
+        index_version: Optional[int] = None,
+    ) -> None:
+        """index_versionには生成開始時点の世代番号を渡す（生成中の無効化を検知するため）"""
+        if not self.enabled:
+            return
+        version = self.index_version if index_version is None else index_version
+        if version != self.index_version:
+            return
+        entry = CacheEntry(
+            key=key,
+            vector=_unit(vector),
+            result=result,
+            created_at=time.monotonic(),
+            index_version=version,
+        )
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.evictions += 1
+            self._matrix = None
+
+    async def refresh_version(self) -> int:
+        """
+        DBの世代番号を一定間隔ごとに確認し、進んでいれば全エントリを破棄する。
+        DBに接続できないときは手元の世代番号のまま続ける
+        """
+        now = time.monotonic()
+        if (
+            not self.enabled
+            or now - self._version_checked_at < self.version_check_seconds
+        ):
+            return self.index_version
+        # 確認中に届いた呼び出しが重ねて問い合わせないよう、先に時刻を更新する
+        self._version_checked_at = now
+        try:
+            async with AsyncSessionLocal() as db:
+                version = await KnowledgeIndexRepository(db).get_version()
+        except Exception:
+            logger.warning(
+                "ナレッジインデックスの世代番号を取得できませんでした", exc_info=True
+            )
+            return self.index_version
+        self._apply_version(version)
+        return self.index_version
+
+    async def invalidate(self) -> int:
+        """
+        ナレッジインデックス更新時にDBの世代番号を進め、全エントリを破棄する。
+        他のワーカーは次のrefresh_versionで破棄する
+        """
+        async with AsyncSessionLocal() as db:
+            version = await KnowledgeIndexRepository(db).bump_version()
+        self._apply_version(version)
+        self._version_checked_at = time.monotonic()
+        return version
+
+    def _apply_version(self, version: int) -> None:
+        with self._lock:
+            if version == self.index_version:
+                return
+            self.index_version = version
+            self._entries.clear()
+            self._matrix = None
+            self.counters.invalidations += 1
+
+    def stats(self) -> dict:
+        data = asdict(self.counters)
+        data["entries"] = len(self._entries)
+        data["index_version"] = self.index_version
+        data["version_check_seconds"] = self.version_check_seconds
+        data["enabled"] = self.enabled
+        data["similarity_threshold"] = self.similarity_threshold
+        data["ttl_seconds"] = self.ttl_seconds
+        return data
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def with_cache_info(
+    result: dict,
+    match: Optional[str] = None,
+    entry: Optional[CacheEntry] = None,
+    similarity: Optional[float] = None,
+) -> dict:
+    """レスポンスにキャッシュ利用の有無を付与"""
+    if entry is None:
+        return {**result, "cache": {"hit": False}}
+    info = {
+        "hit": True,
+        "match": match,
+        "age_seconds": round(time.monotonic() - entry.created_at, 3),
+    }
+    if similarity is not None:
+        info["similarity"] = round(similarity, 4)
+    return {**result, "cache": info}
+
+
+rag_result_cache = RAGResultCache()
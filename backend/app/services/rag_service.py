@@ -0,0 +1,83 @@
+# app/services/rag_service.py
+from typing import AsyncIterator, List
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
+
+from app.services.client_registry import CHAT_MODEL, client_registry
+from app.services.rag_metrics import RAG_RETRIEVED_DOCS, stage
+from app.services.retriever import retriever
+
+
+class RAGService:
+    @staticmethod
+    async def get_openai_embeddings(input_texts: List[str]) -> List[np.ndarray]:
+        """複数テキストの埋め込み生成（キャッシュに無いものだけを1回のAPI呼び出しで生成）"""
+        with stage("embedding"):
+            return await client_registry.embeddings.aembed_arrays(input_texts)
+
+    @staticmethod
+    async def search_azure_vector(text: str) -> List[Document]:
+        """類似事例検索（検索先はRAG_RETRIEVERで切り替え。既定はAzure AI Search）"""
+        with stage("search"):
+            docs_and_scores = await retriever.search(text, k=10)
+        docs = [doc for doc, _ in docs_and_scores]
+        RAG_RETRIEVED_DOCS.observe(len(docs))
+        return docs
+
+    @staticmethod
+    async def call_chatgpt_with_function_calling(
+        prompt: str, function_def: list, model: str = CHAT_MODEL
+    ) -> str:
+        """
+        ChatGPTによる危険性・有害性の生成。
+        function_defの関数呼び出しを強制し、その引数（JSON文字列）を返す
+        """
+        llm = RAGService._bind_function(function_def, model)
+        response = await llm.ainvoke(RAGService._build_messages(prompt))
+        return _function_arguments(response)
+
+    @staticmethod
+    async def stream_chatgpt_with_function_calling(
+        prompt: str, function_def: list, model: str = CHAT_MODEL
+    ) -> AsyncIterator[str]:
+        """ChatGPTの出力（関数呼び出しの引数）をトークン単位で逐次返す"""
+        llm = RAGService._bind_function(function_def, model)
+        async for chunk in llm.astream(RAGService._build_messages(prompt)):
+            for tool_call in chunk.tool_call_chunks:
+                if tool_call.get("args"):
+                    yield tool_call["args"]
+            if chunk.content:
+                yield chunk.content
+
+    @staticmethod
+    def _bind_function(
+        function_def: list, model: str
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        """
+        関数定義をtoolsとして渡し、その関数の呼び出しを強制する。
+        定義はrag_promptでキャッシュ済みのため、bind_toolsの変換を通さずそのまま渡す
+        """
+        [function] = function_def
+        return client_registry.get_llm(model).bind(
+            tools=[{"type": "function", "function": function}],
+            tool_choice={"type": "function", "function": {"name": function["name"]}},
+        )
+
+    @staticmethod
+    def _build_messages(prompt: str) -> list:
+        return [
+            SystemMessage(content="あなたは労働安全衛生の専門家です。"),
+            HumanMessage(content=prompt),
+        ]
+
+
+def _function_arguments(message: AIMessage) -> str:
+    """関数呼び出しの引数。呼び出しが無ければ本文を返す（解析できなければraw_response）"""
+    tool_calls = message.additional_kwargs.get("tool_calls") or []
+    if tool_calls:
+        return tool_calls[0]["function"]["arguments"]
+    return message.content
@@ -0,0 +1,119 @@
+# app/services/retriever.py
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import time
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from starlette.concurrency import run_in_threadpool
+
+from app.services.client_registry import client_registry
+from app.services.local_vector_index import RAG_LOCAL_INDEX_DIR, LocalVectorIndex
+
+# 類似事例の検索先（azure: Azure AI Search / local: ローカルインデックス）
+RAG_RETRIEVER = os.getenv("RAG_RETRIEVER", "azure")
+
+
+class Retriever(ABC):
+    """類似事例検索の共通インターフェース（実装は_searchを定義する）"""
+
+    name = "base"
+
+    def __init__(self):
+        self.searches = 0
+        self.total_seconds = 0.0
+
+    async def startup(self) -> None:
+        """起動時の準備（必要な実装のみ）"""
+
+    async def search(self, text: str, k: int) -> List[Tuple[Document, float]]:
+        started = time.perf_counter()
+        try:
+            return await self._search(text, k)
+        finally:
+            self.searches += 1
+            self.total_seconds += time.perf_counter() - started
+
+    @abstractmethod
+    async def _search(self, text: str, k: int) -> List[Tuple[Document, float]]:
+        """上位k件の(文書, スコア)"""
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "searches": self.searches,
+            "avg_ms": (
+                self.total_seconds / self.searches * 1000 if self.searches else 0.0
+            ),
+        }
+
+
+class AzureSearchRetriever(Retriever):
+    """Azure AI Searchのベクトル検索"""
+
+    name = "azure"
+
+    async def _search(self, text: str, k: int) -> List[Tuple[Document, float]]:
+        vectorstore = await client_registry.get_vectorstore()
+        # 埋め込み生成・ベクトル検索ともに非同期クライアントで実行
+        return await vectorstore.asimilarity_search_with_score(text, k=k)
+
+
+class LocalIndexRetriever(Retriever):
+    """
+    ローカルインデックス（app.tools.export_local_index で作成）のベクトル検索。
+    埋め込みはEmbeddingCache経由のため、入力テキストの埋め込みは再計算されない
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str = RAG_LOCAL_INDEX_DIR):
+        super().__init__()
+        self.directory = directory
+        self._index: Optional[LocalVectorIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def startup(self) -> None:
+        await self.get_index()
+
+    async def get_index(self) -> LocalVectorIndex:
+        if self._index is None:
+            async with self._lock:
+                if self._index is None:
+                    self._index = await run_in_threadpool(
+                        LocalVectorIndex.load, self.directory
+                    )
+        return self._index
+
+    async def _search(self, text: str, k: int) -> List[Tuple[Document, float]]:
+        index = await self.get_index()
+        vector = await client_registry.embeddings.aembed_array(text)
+        hits = await run_in_threadpool(index.search, vector, k)
+        return [(_to_document(index.metadata[row]), score) for row, score in hits]
+
+    def stats(self) -> dict:
+        data = super().stats()
+        data["directory"] = self.directory
+        data["loaded"] = self._index is not None
+        if self._index is not None:
+            data.update(self._index.stats())
+        return data
+
+
+def _to_document(item: dict) -> Document:
+    return Document(
+        page_content=item.get("content") or "",
+        metadata={key: value for key, value in item.items() if key != "content"},
+    )
+
+
+def build_retriever(backend: str = RAG_RETRIEVER) -> Retriever:
+    if backend == "azure":
+        return AzureSearchRetriever()
+    if backend == "local":
+        return LocalIndexRetriever()
+    raise ValueError(f"未対応のRAG_RETRIEVERです: {backend}")
+
+
+retriever = build_retriever()
@@ -0,0 +1,100 @@
+# app/services/singleflight.py
+import asyncio
+import os
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+from prometheus_client import Counter
+
+# 同じ入力のRAGリクエストが処理中なら、その結果を待って共有する
+RAG_SINGLEFLIGHT_ENABLED = (
+    os.getenv("RAG_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+)
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls",
+    "相乗りの対象になった呼び出し数（leaderは実行した件数、followerは相乗りで省いた件数）",
+    ("name", "role"),
+)
+
+
+@dataclass
+class SingleFlightStats:
+    # 実際に処理を実行した回数
+    executed: int = 0
+    # 処理中の呼び出しに相乗りし、実行を省いた回数
+    shared: int = 0
+    # 結果を待たずに取り消された（クライアントが切断した）呼び出し
+    cancelled_waiters: int = 0
+    # 待っている呼び出しが無くなったため処理を中断した回数
+    abandoned: int = 0
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中なら新たに実行せず、その結果（例外を含む）を共有する。
+    処理は呼び出し元とは別のタスクで動かすため、1つの呼び出しが取り消されても
+    他の呼び出しは結果を受け取れる。待つ呼び出しが無くなった時点で処理を取り消す
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self.counters = SingleFlightStats()
+        self._calls: Dict[str, _Call] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """結果と、相乗りしたかどうかを返す"""
+        if not self.enabled:
+            return await func(), False
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.create_task(func()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.counters.executed += 1
+        else:
+            self.counters.shared += 1
+        SINGLEFLIGHT_CALLS.labels(
+            name=self.name, role="follower" if shared else "leader"
+        ).inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if not call.task.done():
+                self.counters.cancelled_waiters += 1
+                if call.waiters == 1:
+                    # 以降の呼び出しが取り消し中の処理に相乗りしないよう先に外す
+                    self._forget(key, call)
+                    call.task.cancel()
+                    self.counters.abandoned += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 誰も待っていない処理の例外で警告が出ないよう回収しておく
+        call.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def stats(self) -> dict:
+        data = asdict(self.counters)
+        data["inflight"] = len(self._calls)
+        data["enabled"] = self.enabled
+        return data
+
+
+rag_singleflight = SingleFlight("rag", enabled=RAG_SINGLEFLIGHT_ENABLED)
@@ -0,0 +1,149 @@
+# app/services/spreadsheet.py
+"""
+CSV / XLSXを1行ずつ読み書きする。ファイル全体をメモリに載せないよう、
+CSVはストリームのまま、XLSXはread_only / write_onlyモードで扱う。
+書き出しで数式とみなされないよう前置した'は、読み込み時に取り除く
+"""
+import csv
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, Sequence
+
+SPREADSHEET_EXTENSIONS = (".csv", ".xlsx")
+# 文字コードの判定に読む先頭のバイト数
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+# Excelの1セルの文字数上限と、XLSXに書けない制御文字
+XLSX_MAX_CELL_CHARS = 32767
+XLSX_ILLEGAL_CHARACTERS = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+# Excelの1シートの行数上限（ヘッダー行を含む）
+XLSX_MAX_ROWS = 1048576
+# 表計算ソフトが数式として解釈する先頭文字（CSVインジェクション対策で'を前置する）
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+FORMULA_ESCAPE = "'"
+
+
+def detect_encoding(head: bytes) -> str:
+    """先頭のバイト列からUTF-8（BOM付き含む）かShift_JIS（cp932）かを判定する"""
+    for encoding in ("utf-8-sig", "cp932"):
+        try:
+            head.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            # 読み込み範囲の末尾で文字が途切れた場合は判定できたものとする
+            if e.start >= len(head) - 4:
+                return encoding
+    return "utf-8-sig"
+
+
+def iter_csv_rows(file: BinaryIO) -> Iterator[Sequence]:
+    encoding = detect_encoding(file.read(ENCODING_SAMPLE_BYTES))
+    file.seek(0)
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    try:
+        for row in csv.reader(text):
+            yield [unescape_cell(value) for value in row]
+    finally:
+        # 呼び出し元のファイルを閉じないよう切り離す
+        text.detach()
+
+
+def iter_xlsx_rows(file: BinaryIO) -> Iterator[Sequence]:
+    """先頭のシートを読む"""
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except zipfile.BadZipFile:
+        raise ValueError("XLSXファイルとして読み込めません")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield [unescape_cell(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_rows(file: BinaryIO, file_name: str) -> Iterator[Sequence]:
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == ".csv":
+        return iter_csv_rows(file)
+    if extension == ".xlsx":
+        return iter_xlsx_rows(file)
+    raise ValueError(f"未対応のファイル形式です: {extension or file_name}")
+
+
+def format_cell(value):
+    """
+    日時は秒までの文字列、JSONは文字列にする（CSV・XLSXで同じ表記にする）。
+    数式として解釈される文字で始まる文字列は、先頭に'を付けて文字列のまま表示させる。
+    元から'の後に数式の文字が続く文字列にも'を付け、読み込み時に元の値に戻るようにする
+    """
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str) and value.lstrip(FORMULA_ESCAPE).startswith(
+        FORMULA_PREFIXES
+    ):
+        return FORMULA_ESCAPE + value
+    return value
+
+
+def unescape_cell(value):
+    """format_cellで前置した'を取り除く（エクスポートしたファイルを読み込み直せるように）"""
+    if (
+        isinstance(value, str)
+        and value.startswith(FORMULA_ESCAPE)
+        and value.lstrip(FORMULA_ESCAPE).startswith(FORMULA_PREFIXES)
+    ):
+        return value[1:]
+    return value
+
+
+def csv_bytes(rows: Iterable[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([format_cell(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class XlsxStreamWriter:
+    """
+    openpyxlのwrite_onlyモードでXLSXを書く。
+    シートの行数がExcelの上限に達したら、同じヘッダーの新しいシートに続きを書く。
+    追加した行は一時ファイルに書き出されるため、行数によらずメモリは一定。
+    lxmlがインストールされていれば、openpyxlはXMLの書き出しにlxmlを使う（数倍速い）
+    """
+
+    def __init__(self, header: Sequence[str], max_rows: int = XLSX_MAX_ROWS):
+        from openpyxl import Workbook
+
+        self.workbook = Workbook(write_only=True)
+        self.header = list(header)
+        self.max_rows = max_rows
+        self._add_sheet()
+
+    def _add_sheet(self) -> None:
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(self.header)
+        self.sheet_rows = 1
+
+    @staticmethod
+    def _cell(value):
+        value = format_cell(value)
+        if isinstance(value, str):
+            # Excelが開けない制御文字と、セルの文字数上限を超える部分を取り除く
+            value = XLSX_ILLEGAL_CHARACTERS.sub("", value)[:XLSX_MAX_CELL_CHARS]
+        return value
+
+    def append(self, rows: Iterable[Sequence]) -> None:
+        for row in rows:
+            if self.sheet_rows >= self.max_rows:
+                self._add_sheet()
+            self.sheet.append([self._cell(value) for value in row])
+            self.sheet_rows += 1
+
+    def save(self, file: BinaryIO) -> None:
+        self.workbook.save(file)
@@ -0,0 +1,538 @@
+# app/tools/benchmark_api.py
+"""
+APIの負荷試験。OpenAI・Azure AI Searchの代わりにfake_upstreamsを同じプロセスで起動し、
+アプリ本体（app.main。lifespan・ミドルウェアを含む）をASGIで直接呼び出す。
+
+    python -m app.tools.benchmark_api --concurrency 16
+    python -m app.tools.benchmark_api --save-baseline benchmarks/baseline.json
+    python -m app.tools.benchmark_api --baseline benchmarks/baseline.json --markdown
+
+シナリオごとにp50/p95/p99のレイテンシ・スループット・エラー数とメモリ（RSS）を出す。
+--baselineを指定すると保存済みの結果と比べ、p95・スループット・ピークRSSが
+--toleranceを超えて悪化するかエラーが増えていれば終了コード1で終わる。
+PRのCI（.github/workflows/benchmark.yml）は同じランナーでベースブランチを計測して比べ、
+benchmarks/baseline.jsonはその手元での参考値・代替として使う（値はマシンに依存する）。
+DBは既定で一時ファイルのSQLite（テーブルはcreate_allで作る）。--database-urlには
+マイグレーション済みのPostgreSQLも指定できる（計測用のユーザーと履歴を追加する）
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import ipaddress
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import certifi
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+BENCHMARK_API_KEY = "benchmark"
+BENCHMARK_USER_NAME = "benchmark"
+BENCHMARK_PASSWORD = "benchmark-password"
+BENCHMARK_HISTORIES = 200
+SCENARIOS = ("login", "user", "history", "rag", "rag_stream")
+# 既定のリクエスト数（--scaleで増減する）
+DEFAULT_REQUESTS = {
+    "login": 32,
+    "user": 2000,
+    "history": 1000,
+    "rag": 200,
+    "rag_stream": 100,
+}
+# 基準値との比較に使う値（1: 大きいほど悪い / -1: 小さいほど悪い）
+COMPARED_METRICS = (("p95_ms", 1), ("requests_per_sec", -1))
+
+
+def is_ok(response: httpx.Response) -> bool:
+    return response.status_code < 400
+
+
+def is_stream_ok(response: httpx.Response) -> bool:
+    # ストリーミングは200で始まり、失敗はerrorイベントで返る
+    return is_ok(response) and b"event: error" not in response.content
+
+
+@dataclass
+class Scenario:
+    name: str
+    requests: int
+    send: Callable[[int], Awaitable[httpx.Response]]
+    check: Callable[[httpx.Response], bool] = is_ok
+
+
+def prepare_tls(directory: str) -> Tuple[str, str]:
+    """
+    代替のAzure AI Search用に127.0.0.1の自己署名証明書を作り、
+    既定のCA証明書と合わせたバンドルを信頼させる。
+    aiohttpはimport時に既定のSSLコンテキストを作るため、aiohttpを読み込む前に呼ぶこと
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [
+                    x509.DNSName("localhost"),
+                    x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+                ]
+            ),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(
+            x509.SubjectKeyIdentifier.from_public_key(key.public_key()),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    bundle = os.path.join(directory, "ca-bundle.pem")
+    certificate_pem = certificate.public_bytes(serialization.Encoding.PEM)
+    with open(certfile, "wb") as file:
+        file.write(certificate_pem)
+    with open(keyfile, "wb") as file:
+        file.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    with open(certifi.where(), "rb") as source, open(bundle, "wb") as file:
+        file.write(source.read() + b"\n" + certificate_pem)
+    # aiohttp・httpx（OpenSSLの既定）とrequestsがそれぞれ参照する
+    os.environ["SSL_CERT_FILE"] = bundle
+    os.environ["REQUESTS_CA_BUNDLE"] = bundle
+    return certfile, keyfile
+
+
+def configure_environment(
+    openai_base_url: str, search_endpoint: str, database_url: str
+) -> None:
+    """
+    アプリの設定を代替サーバーと計測用DBに向ける。
+    設定はimport時に読まれるため、appのモジュールを読み込む前に呼ぶこと
+    """
+    os.environ.update(
+        {
+            "DATABASE_URL": database_url,
+            # 空ならDATABASE_URLから作る（.envの値を使わせない）
+            "ASYNC_DATABASE_URL": "",
+            "OPENAI_API_KEY": BENCHMARK_API_KEY,
+            "OPENAI_API_BASE": openai_base_url,
+            "OPENAI_BASE_URL": openai_base_url,
+            "AZURE_API_KEY": BENCHMARK_API_KEY,
+            "AZURE_SEARCH_ENDPOINT": search_endpoint,
+            "AZURE_INDEX_NAME": "benchmark",
+            "RAG_RETRIEVER": "azure",
+            # 前回の実行結果を使わないよう、埋め込みキャッシュのファイル層は無効にする
+            "EMBEDDING_CACHE_DIR": "",
+        }
+    )
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("SESSION_SECRET_KEY", "benchmark-secret")
+    no_proxy = os.environ.get("NO_PROXY", "")
+    os.environ["NO_PROXY"] = ",".join(
+        filter(None, [no_proxy, "127.0.0.1", "localhost"])
+    )
+
+
+async def prepare_database() -> int:
+    """計測用のユーザーと履歴を用意し、ユーザーIDを返す"""
+    from sqlalchemy import func, insert, select
+
+    from app.db.db import AsyncSessionLocal, Base, engine
+    from app.db.models import History
+    from app.db.schema.user import UserCreate
+    from app.repositories.user_repository import UserRepository
+    from app.services.auth_service import AuthService
+
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+
+    async with AsyncSessionLocal() as db:
+        repository = UserRepository(db)
+        user = await repository.get_user_by_name(BENCHMARK_USER_NAME)
+        if user is None:
+            user = await repository.create_user(
+                UserCreate(
+                    name=BENCHMARK_USER_NAME,
+                    email="benchmark@example.com",
+                    role="user",
+                ),
+                hashed_password=AuthService.get_password_hash(BENCHMARK_PASSWORD),
+            )
+        user_id = user.id
+        count = await db.scalar(select(func.count()).where(History.user_id == user_id))
+        if count < BENCHMARK_HISTORIES:
+            await db.execute(
+                insert(History.__table__),
+                [
+                    {
+                        "user_id": user_id,
+                        "type": "rag",
+                        "title": f"ベンチマーク作業{i}",
+                        "description": "ベンチマーク作業要素",
+                        "content": {"rags": [], "llms": []},
+                    }
+                    for i in range(BENCHMARK_HISTORIES - count)
+                ],
+            )
+            await db.commit()
+    return user_id
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近傍順位法のパーセンタイル（sorted_valuesは昇順）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def peak_rss_mb() -> float:
+    # Linuxのru_maxrssはKB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def measure(scenario: Scenario, concurrency: int) -> dict:
+    # ウォームアップ（初回の接続・クライアント生成を計測に含めない）
+    await scenario.send(-1)
+    gc.collect()
+
+    latencies: List[float] = []
+    errors = 0
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal errors, issued
+        while issued < scenario.requests:
+            index = issued
+            issued += 1
+            started = time.perf_counter()
+            try:
+                response = await scenario.send(index)
+                failed = not scenario.check(response)
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            if failed:
+                errors += 1
+
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "scenario": scenario.name,
+        "requests": scenario.requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(scenario.requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "rss_mb": round(current_rss_mb(), 1),
+        "rss_growth_mb": round(current_rss_mb() - rss_before, 1),
+    }
+
+
+def build_scenarios(
+    app, user_id: int, access_token: str, names: List[str], scale: float
+) -> tuple:
+    """シナリオと、終了時に閉じるクライアント"""
+    # アプリ内の未処理の例外は500として数える
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # ログインは認証Cookie無し、それ以外はログインで得たアクセストークン付き
+    anonymous = httpx.AsyncClient(transport=transport, base_url="http://benchmark")
+    authenticated = httpx.AsyncClient(
+        transport=transport,
+        base_url="http://benchmark",
+        headers={"Cookie": f"access_token={access_token}"},
+        timeout=httpx.Timeout(300),
+    )
+
+    def rag_body(index: int) -> dict:
+        # 結果キャッシュに当たらないよう、リクエストごとに別の入力にする
+        return {"task": f"ベンチマーク作業{index}", "element": "足場の組立て"}
+
+    senders = {
+        "login": lambda i: anonymous.post(
+            "/api/v1/auth/login",
+            json={"name": BENCHMARK_USER_NAME, "password": BENCHMARK_PASSWORD},
+        ),
+        "user": lambda i: authenticated.get(f"/api/v1/user/{user_id}"),
+        "history": lambda i: authenticated.get("/api/v1/history?limit=20"),
+        "rag": lambda i: authenticated.post("/api/v1/rag/", json=rag_body(i)),
+        "rag_stream": lambda i: authenticated.post(
+            "/api/v1/rag/stream", json=rag_body(-2 - i)
+        ),
+    }
+    scenarios = [
+        Scenario(
+            name,
+            max(int(DEFAULT_REQUESTS[name] * scale), 1),
+            senders[name],
+            is_stream_ok if name == "rag_stream" else is_ok,
+        )
+        for name in names
+    ]
+    return scenarios, (anonymous, authenticated)
+
+
+async def run(args: argparse.Namespace, work_dir: str) -> dict:
+    certfile, keyfile = prepare_tls(work_dir)
+    # 証明書を信頼させてから読み込む（prepare_tlsを参照）
+    from app.tools.fake_upstreams import FakeEndpoint, FakeUpstreamConfig, FakeUpstreams
+
+    config = FakeUpstreamConfig(
+        embeddings=FakeEndpoint(
+            args.embedding_ms, args.jitter, args.embedding_error_rate
+        ),
+        chat=FakeEndpoint(args.chat_ms, args.jitter, args.chat_error_rate),
+        search=FakeEndpoint(args.search_ms, args.jitter, args.search_error_rate),
+        seed=args.seed,
+    )
+    upstreams = FakeUpstreams(config)
+    await upstreams.start(certfile=certfile, keyfile=keyfile)
+    database_url = args.database_url or f"sqlite:///{work_dir}/benchmark.db"
+    configure_environment(
+        upstreams.openai_base_url, upstreams.search_endpoint, database_url
+    )
+
+    # 設定を反映させるため、appのモジュールはここで読み込む
+    from app.main import app
+    from app.services.auth_service import BCRYPT_ROUNDS
+
+    try:
+        async with app.router.lifespan_context(app):
+            user_id = await prepare_database()
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+            ) as client:
+                response = await client.post(
+                    "/api/v1/auth/login",
+                    json={"name": BENCHMARK_USER_NAME, "password": BENCHMARK_PASSWORD},
+                )
+                response.raise_for_status()
+                access_token = response.cookies["access_token"]
+
+            scenarios, clients = build_scenarios(
+                app, user_id, access_token, args.scenarios, args.scale
+            )
+            results = []
+            try:
+                for scenario in scenarios:
+                    results.append(await measure(scenario, args.concurrency))
+            finally:
+                for client in clients:
+                    await client.aclose()
+    finally:
+        await upstreams.stop()
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "scale": args.scale,
+            "embedding_ms": args.embedding_ms,
+            "chat_ms": args.chat_ms,
+            "search_ms": args.search_ms,
+            "jitter": args.jitter,
+            "embedding_error_rate": args.embedding_error_rate,
+            "chat_error_rate": args.chat_error_rate,
+            "search_error_rate": args.search_error_rate,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "database": database_url.split(":", 1)[0],
+        },
+        "results": results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "upstreams": upstreams.stats(),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float):
+    """
+    基準値より悪化した値の一覧（シナリオ, 項目, 基準値, 今回の値）。
+    p95はmin_delta_ms未満の差は揺らぎとして無視する
+    """
+    regressions = []
+    base_results = {result["scenario"]: result for result in baseline["results"]}
+    for result in report["results"]:
+        base = base_results.get(result["scenario"])
+        if base is None:
+            continue
+        if result["errors"] > base["errors"]:
+            regressions.append(
+                (result["scenario"], "errors", base["errors"], result["errors"])
+            )
+        for key, direction in COMPARED_METRICS:
+            value, base_value = result[key], base[key]
+            if not base_value:
+                continue
+            change = (value - base_value) / base_value * direction
+            if key.endswith("_ms") and abs(value - base_value) < min_delta_ms:
+                continue
+            if change > tolerance:
+                regressions.append((result["scenario"], key, base_value, value))
+    base_peak = baseline.get("peak_rss_mb")
+    if base_peak and report["peak_rss_mb"] > base_peak * (1 + tolerance):
+        regressions.append(("*", "peak_rss_mb", base_peak, report["peak_rss_mb"]))
+    return regressions
+
+
+def _delta(value: float, base: Optional[float]) -> str:
+    if not base:
+        return ""
+    return f"{(value - base) / base * 100:+.0f}%"
+
+
+def print_text(report: dict, baseline: Optional[dict]) -> None:
+    base_results = {r["scenario"]: r for r in (baseline or {}).get("results", [])}
+    print(
+        f"{'scenario':<11} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'errors':>6} {'rss MB':>7} {'vs base p95 / req/s':>20}"
+    )
+    for result in report["results"]:
+        base = base_results.get(result["scenario"], {})
+        versus = ""
+        if base:
+            p95 = _delta(result["p95_ms"], base.get("p95_ms"))
+            throughput = _delta(
+                result["requests_per_sec"], base.get("requests_per_sec")
+            )
+            versus = f"{p95} / {throughput}"
+        print(
+            f"{result['scenario']:<11} {result['requests_per_sec']:>8.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['errors']:>6} "
+            f"{result['rss_mb']:>7.1f} {versus:>20}"
+        )
+    print(f"ピークRSS {report['peak_rss_mb']:.1f}MB")
+
+
+def print_markdown(report: dict, baseline: Optional[dict], regressions: list) -> None:
+    """CIのジョブサマリー用"""
+    base_results = {r["scenario"]: r for r in (baseline or {}).get("results", [])}
+    print("## APIベンチマーク\n")
+    print(
+        "| scenario | req/s | p50 ms | p95 ms | p99 ms | errors | p95 vs base | req/s vs base |"
+    )
+    print("|---|---:|---:|---:|---:|---:|---:|---:|")
+    for result in report["results"]:
+        base = base_results.get(result["scenario"], {})
+        print(
+            f"| {result['scenario']} | {result['requests_per_sec']:.1f} "
+            f"| {result['p50_ms']:.2f} | {result['p95_ms']:.2f} "
+            f"| {result['p99_ms']:.2f} | {result['errors']} "
+            f"| {_delta(result['p95_ms'], base.get('p95_ms'))} "
+            f"| {_delta(result['requests_per_sec'], base.get('requests_per_sec'))} |"
+        )
+    print(f"\nピークRSS {report['peak_rss_mb']:.1f}MB\n")
+    for scenario, key, base_value, value in regressions:
+        print(f"- :warning: {scenario} {key}: {base_value} → {value}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=lambda value: value.split(","),
+        default=list(SCENARIOS),
+        help=f"カンマ区切り（{','.join(SCENARIOS)}）",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="既定のリクエスト数に掛ける倍率"
+    )
+    parser.add_argument("--embedding-ms", type=float, default=50)
+    parser.add_argument("--chat-ms", type=float, default=800)
+    parser.add_argument("--search-ms", type=float, default=80)
+    parser.add_argument(
+        "--jitter", type=float, default=0.2, help="応答時間の揺らぎ（±の割合）"
+    )
+    parser.add_argument("--embedding-error-rate", type=float, default=0.0)
+    parser.add_argument("--chat-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database-url", help="省略時は一時ファイルのSQLite（sqlite:///...）"
+    )
+    parser.add_argument("--baseline", help="比較する基準値のJSON")
+    parser.add_argument("--save-baseline", help="結果を基準値として保存するパス")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="悪化とみなす変化の割合"
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=5.0,
+        help="p95の差がこれ未満なら悪化とみなさない",
+    )
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    parser.add_argument(
+        "--markdown", action="store_true", help="結果をMarkdownの表で出力"
+    )
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知のシナリオです: {','.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        report = asyncio.run(run(args, work_dir))
+
+    baseline = None
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("config") != report["config"]:
+            print("警告: 基準値と計測条件が異なります", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+            file.write("\n")
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif args.markdown:
+        print_markdown(report, baseline, regressions)
+    else:
+        print_text(report, baseline)
+        for scenario, key, base_value, value in regressions:
+            print(f"悪化: {scenario} {key} {base_value} → {value}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
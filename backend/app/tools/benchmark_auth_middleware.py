@@ -0,0 +1,149 @@
+# app/tools/benchmark_auth_middleware.py
+"""
+認証ミドルウェアのスループット（requests/sec）を計測する。
+
+    python -m app.tools.benchmark_auth_middleware --requests 20000 --concurrency 64
+
+/healthのような軽いエンドポイントに対し、ミドルウェア無し・従来のBaseHTTPMiddleware版・
+ASGIミドルウェア版を同じ条件で比較する。JWT_SECRET_KEYが設定されていれば、
+認証キャッシュに載ったユーザーでの認証付きリクエストも計測する。
+ネットワークを介さずASGIアプリを直接呼ぶため、ミドルウェア自体のオーバーヘッドが比較できる
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.db.schema.user import UserInfo
+from app.middleware.auth_middleware import AuthMiddleware
+from app.services.auth_cache import auth_cache
+from app.services.auth_service import AuthService
+
+BENCHMARK_USER_ID = 2**31 - 1
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    """比較用: 従来の実装の公開パス判定（startswithの線形探索）まで"""
+
+    public_paths = [
+        "/api/v1/auth/login",
+        "/api/v1/auth/google",
+        "/api/v1/auth/google/callback",
+        "/api/v1/auth/refresh",
+        "/",
+        "/docs",
+        "/redoc",
+        "/openapi.json",
+    ]
+
+    async def dispatch(self, request, call_next):
+        if any(request.url.path.startswith(p) for p in self.public_paths):
+            return await call_next(request)
+        raise RuntimeError("公開パス以外は計測対象外")
+
+
+def build_app(middleware) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy", "message": "Application is running"}
+
+    @app.get("/api/v1/benchmark")
+    def authenticated():
+        return {"status": "ok"}
+
+    return app
+
+
+async def measure(
+    app: FastAPI, path: str, requests: int, concurrency: int, cookies: dict
+) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", cookies=cookies
+    ) as client:
+        # ウォームアップ
+        response = await client.get(path)
+        response.raise_for_status()
+
+        remaining = requests
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(requests / elapsed, 1),
+    }
+
+
+async def run(requests: int, concurrency: int) -> list:
+    scenarios = [
+        ("none", None, "/health", {}),
+        ("base_http_middleware", LegacyAuthMiddleware, "/health", {}),
+        ("asgi_middleware", AuthMiddleware, "/health", {}),
+    ]
+    if AuthService.SECRET_KEY:
+        # DBを使わないよう、計測用のユーザーを認証キャッシュに載せておく
+        auth_cache.put_user(
+            BENCHMARK_USER_ID, UserInfo(name="benchmark", is_active=True)
+        )
+        token = AuthService.create_access_token({"sub": str(BENCHMARK_USER_ID)})
+        scenarios.append(
+            (
+                "asgi_middleware",
+                AuthMiddleware,
+                "/api/v1/benchmark",
+                {"access_token": token},
+            )
+        )
+
+    results = []
+    for name, middleware, path, cookies in scenarios:
+        result = await measure(
+            build_app(middleware), path, requests, concurrency, cookies
+        )
+        results.append({"middleware": name, **result})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'middleware':<22} {'path':<20} {'req/s':>10} {'seconds':>8}")
+    for result in results:
+        print(
+            f"{result['middleware']:<22} {result['path']:<20} "
+            f"{result['requests_per_sec']:>10.1f} {result['seconds']:>8.3f}"
+        )
+    stats = auth_cache.stats()
+    if stats["requests"]:
+        print(f"認証 平均{stats['avg_us']:.1f}µs / 最大{stats['max_us']:.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
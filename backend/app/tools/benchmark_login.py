@@ -0,0 +1,102 @@
+# app/tools/benchmark_login.py
+"""
+ログイン時のパスワード検証のスループットを計測する。
+
+    python -m app.tools.benchmark_login --logins 64 --concurrency 16
+
+同時にログインが集中した状況で、イベントループ上で直接bcryptを検証する従来の方式と
+PasswordHasher（プロセスプール）を比較する。logins/secに加えて、
+同じイベントループ上の他のリクエストがどれだけ待たされるか（ループの最大停止時間）も出す
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.services.auth_service import BCRYPT_ROUNDS, AuthService
+from app.services.password_hasher import PasswordHasher
+
+HEARTBEAT_SECONDS = 0.005
+
+
+async def _heartbeat(stop: asyncio.Event) -> float:
+    """イベントループが止まっていた最大時間（秒）"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        worst = max(worst, time.perf_counter() - started - HEARTBEAT_SECONDS)
+    return worst
+
+
+async def measure(name: str, verify, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with semaphore:
+            await verify()
+
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    stall = await heartbeat
+    return {
+        "mode": name,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round(logins / elapsed, 1),
+        "max_loop_stall_ms": round(stall * 1000, 1),
+    }
+
+
+async def run(logins: int, concurrency: int, workers: int) -> list:
+    password = "benchmark-password"
+    hashed = AuthService.get_password_hash(password)
+
+    async def inline() -> None:
+        # 従来の実装: async defの中で同期的に検証する
+        assert AuthService.verify_password(password, hashed)
+
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+
+    async def pooled() -> None:
+        valid, _ = await hasher.verify_and_update(password, hashed)
+        assert valid
+
+    try:
+        # ワーカープロセスの起動時間を計測に含めない
+        await asyncio.gather(*[pooled() for _ in range(workers)])
+        return [
+            await measure("inline", inline, logins, concurrency),
+            await measure(f"process_pool({workers})", pooled, logins, concurrency),
+        ]
+    finally:
+        hasher.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.logins, args.concurrency, args.workers))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}")
+    print(f"{'mode':<18} {'logins/s':>9} {'seconds':>8} {'max stall ms':>13}")
+    for result in results:
+        print(
+            f"{result['mode']:<18} {result['logins_per_sec']:>9.1f} "
+            f"{result['seconds']:>8.3f} {result['max_loop_stall_ms']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# app/tools/benchmark_retrieval.py
+"""
+ローカルインデックスで次元数・量子化方式ごとの recall@k と検索レイテンシを比較する。
+
+    python -m app.tools.benchmark_retrieval --index /tmp/daiichi-local-index
+
+正解は全次元・float32での完全検索の上位k件。
+--queries に1行1クエリのテキストファイルを渡すとOpenAIで埋め込んで使い、
+省略時はインデックス内のベクトルを無作為に選んでクエリにする。
+インデックスは全次元（3072）で書き出したものを使うこと
+"""
+import argparse
+import json
+import time
+from typing import List
+
+import numpy as np
+
+from app.services.client_registry import EMBEDDING_MODEL, OPENAI_API_KEY
+from app.services.local_vector_index import (
+    QUANTIZATIONS,
+    RAG_LOCAL_INDEX_DIR,
+    LocalVectorIndex,
+    reduce_dimensions,
+)
+
+
+def _embed_queries(path: str, dim: int) -> np.ndarray:
+    from langchain_openai import OpenAIEmbeddings
+
+    with open(path, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model=EMBEDDING_MODEL)
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    return reduce_dimensions(vectors, dim)
+
+
+def _sample_queries(index: LocalVectorIndex, sample: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.sort(
+        rng.choice(index.count, size=min(sample, index.count), replace=False)
+    )
+    return np.asarray(index.vectors[rows])
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run(
+    index: LocalVectorIndex,
+    queries: np.ndarray,
+    dimensions: List[int],
+    quantizations: List[str],
+    k: int,
+    rescore_candidates: int,
+) -> List[dict]:
+    truth = [{row for row, _ in index.search(query, k)} for query in queries]
+
+    results = []
+    for dim in dimensions:
+        if dim == index.dim:
+            vectors, reduced_queries = index.vectors, queries
+        else:
+            vectors = np.concatenate(
+                [
+                    reduce_dimensions(
+                        np.asarray(index.vectors[start : start + index.block_rows]), dim
+                    )
+                    for start in range(0, index.count, index.block_rows)
+                ]
+            )
+            reduced_queries = reduce_dimensions(queries, dim)
+        for quantization in quantizations:
+            variant = LocalVectorIndex(
+                vectors,
+                index.metadata,
+                quantization=quantization,
+                rescore_candidates=rescore_candidates,
+                block_rows=index.block_rows,
+            )
+            latencies, recalls = [], []
+            for query, expected in zip(reduced_queries, truth):
+                started = time.perf_counter()
+                hits = variant.search(query, k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                recalls.append(len(expected & {row for row, _ in hits}) / k)
+            results.append(
+                {
+                    "dimensions": dim,
+                    "quantization": quantization,
+                    "scan_mb": round(variant.scan_bytes / 1024 / 1024, 2),
+                    f"recall@{k}": round(float(np.mean(recalls)), 4),
+                    "p50_ms": round(_percentile(latencies, 50), 3),
+                    "p95_ms": round(_percentile(latencies, 95), 3),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index", default=RAG_LOCAL_INDEX_DIR)
+    parser.add_argument("--queries", help="1行1クエリのテキストファイル")
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dimensions", default="3072,1536,1024,512,256")
+    parser.add_argument("--quantizations", default=",".join(QUANTIZATIONS))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-candidates", type=int, default=100)
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    index = LocalVectorIndex.load(args.index, quantization="none")
+    if args.queries:
+        queries = _embed_queries(args.queries, index.dim)
+    else:
+        queries = _sample_queries(index, args.sample, args.seed)
+    dimensions = [int(d) for d in args.dimensions.split(",") if int(d) <= index.dim]
+    quantizations = args.quantizations.split(",")
+
+    results = run(
+        index, queries, dimensions, quantizations, args.k, args.rescore_candidates
+    )
+    columns = list(results[0])
+    print(f"{index.count}件 / クエリ{len(queries)}件")
+    print("\t".join(columns))
+    for result in results:
+        print("\t".join(str(result[column]) for column in columns))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
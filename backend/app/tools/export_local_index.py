@@ -0,0 +1,109 @@
+# app/tools/export_local_index.py
+"""
+Azure AI Searchのナレッジインデックスをローカルインデックス形式に書き出す。
+
+    python -m app.tools.export_local_index --out /tmp/daiichi-local-index
+
+--dimensionsを指定すると先頭の次元に切り詰めて書き出す（EMBEDDING_DIMENSIONSと揃えること）。
+ベクトルフィールドがretrievableでないインデックスは書き出せない
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+from langchain_community.vectorstores.azuresearch import (
+    FIELDS_CONTENT,
+    FIELDS_CONTENT_VECTOR,
+    FIELDS_ID,
+    FIELDS_METADATA,
+)
+
+from app.services.client_registry import (
+    AZURE_API_KEY,
+    AZURE_INDEX_NAME,
+    AZURE_SEARCH_ENDPOINT,
+    EMBEDDING_MODEL,
+    VECTOR_DIM,
+)
+from app.services.local_vector_index import (
+    METADATA_FIELDS,
+    RAG_LOCAL_INDEX_DIR,
+    LocalVectorIndexWriter,
+)
+
+
+def _to_item(result: dict, with_content: bool) -> dict:
+    metadata = result.get(FIELDS_METADATA) or {}
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    item = {"id": result.get(FIELDS_ID)}
+    item.update({key: metadata.get(key) for key in METADATA_FIELDS})
+    if with_content:
+        item["content"] = result.get(FIELDS_CONTENT)
+    return item
+
+
+def export(out: str, batch_size: int, with_content: bool, dimensions: int) -> dict:
+    client = SearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=AZURE_INDEX_NAME,
+        credential=AzureKeyCredential(AZURE_API_KEY),
+    )
+    select = [FIELDS_ID, FIELDS_METADATA, FIELDS_CONTENT_VECTOR]
+    if with_content:
+        select.append(FIELDS_CONTENT)
+
+    writer = LocalVectorIndexWriter(
+        out,
+        dim=dimensions,
+        source={
+            "endpoint": AZURE_SEARCH_ENDPOINT,
+            "index_name": AZURE_INDEX_NAME,
+            "embedding_model": EMBEDDING_MODEL,
+            "dimensions": dimensions,
+        },
+    )
+    vectors, items = [], []
+    try:
+        with client:
+            for result in client.search(search_text="*", select=select):
+                vector = result.get(FIELDS_CONTENT_VECTOR)
+                if not vector or len(vector) < dimensions:
+                    continue
+                vectors.append(vector)
+                items.append(_to_item(result, with_content))
+                if len(vectors) >= batch_size:
+                    writer.add(np.asarray(vectors, dtype=np.float32), items)
+                    vectors, items = [], []
+                    print(f"{writer.count}件書き出しました")
+        if vectors:
+            writer.add(np.asarray(vectors, dtype=np.float32), items)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default=RAG_LOCAL_INDEX_DIR)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=VECTOR_DIM)
+    parser.add_argument(
+        "--with-content", action="store_true", help="本文も書き出す（既定は省略）"
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = export(args.out, args.batch_size, args.with_content, args.dimensions)
+    print(
+        f"{manifest['count']}件を{args.out}に書き出しました"
+        f"（{time.perf_counter() - started:.1f}秒）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# app/tools/fake_upstreams.py
+"""
+ベンチマーク用の、OpenAI（埋め込み・チャット）とAzure AI Searchの代替サーバー。
+同じプロセス内でaiohttpのHTTPサーバーとして動かし、アプリは実際のクライアント
+（接続プール・リトライ・レスポンスの解析を含む）でここに接続する。
+Azure SDKはhttpsのエンドポイントしか受け付けないため、証明書を渡すとhttpsでも待ち受ける。
+応答までの時間と、エラー（503）を返す割合はエンドポイントごとに設定できる
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import ssl
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+import numpy as np
+from aiohttp import web
+
+FAKE_FILE_NAME = "benchmark.pdf"
+# llmsの要素のファイル名（rag_prompt.LLM_FILE_NAMEと同じ値）
+FAKE_LLM_FILE_NAME = "LLMによる生成"
+FULL_VECTOR_DIM = 3072
+# ストリーミング応答を分割する文字数と、チャンク間の待ち時間（秒）
+STREAM_CHUNK_CHARS = 16
+STREAM_CHUNK_SECONDS = 0.002
+
+
+@dataclass
+class FakeEndpoint:
+    """応答までの時間（ミリ秒、jitterは±の割合）とエラー率"""
+
+    latency_ms: float = 0.0
+    jitter: float = 0.2
+    error_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+
+    async def wait(self, rng: random.Random) -> bool:
+        """設定した時間だけ待ち、エラーを返すべきならFalse"""
+        self.requests += 1
+        delay = self.latency_ms * (1 + rng.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < self.error_rate:
+            self.errors += 1
+            return False
+        return True
+
+
+@dataclass
+class FakeUpstreamConfig:
+    embeddings: FakeEndpoint = field(default_factory=lambda: FakeEndpoint(50))
+    chat: FakeEndpoint = field(default_factory=lambda: FakeEndpoint(800))
+    search: FakeEndpoint = field(default_factory=lambda: FakeEndpoint(80))
+    # 検索で返す件数の上限とLLMが返す要素数
+    search_results: int = 10
+    items: int = 5
+    seed: int = 0
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    """入力ごとに決まる単位ベクトル（同じ入力なら同じベクトルになる）"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimensions, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def fake_items(group: str, count: int) -> dict:
+    return {
+        group: [
+            {
+                "危険性・有害性": f"ベンチマーク用の危険性{i + 1}",
+                "リスク低減措置": f"ベンチマーク用の低減措置{i + 1}",
+                "対策分類": "管理的対策",
+                "使用ナレッジファイル名": (
+                    FAKE_FILE_NAME if group == "rags" else FAKE_LLM_FILE_NAME
+                ),
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response(
+        {"error": {"message": message, "type": "server_error", "code": status}},
+        status=status,
+    )
+
+
+class FakeUpstreams:
+    """
+    /v1/embeddings, /v1/chat/completions（OpenAI互換）と
+    /indexes('<name>')/docs/search.post.search（Azure AI Search互換）を返す
+    """
+
+    def __init__(self, config: Optional[FakeUpstreamConfig] = None):
+        self.config = config or FakeUpstreamConfig()
+        self.rng = random.Random(self.config.seed)
+        self.runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+        self.tls_base_url = ""
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.base_url}/v1"
+
+    @property
+    def search_endpoint(self) -> str:
+        return self.tls_base_url or self.base_url
+
+    async def start(
+        self,
+        host: str = "127.0.0.1",
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+    ) -> None:
+        """空いているポートで待ち受ける（certfileを渡すとhttpsのポートも開く）"""
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_post("/v1/chat/completions", self.chat)
+        app.router.add_post(r"/indexes{name:.*}/docs/search.post.search", self.search)
+        app.router.add_get(r"/indexes{name:.*}", self.get_index)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, 0).start()
+        self.base_url = "http://{}:{}".format(*self.runner.addresses[0][:2])
+        if certfile is not None:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(certfile, keyfile)
+            await web.TCPSite(self.runner, host, 0, ssl_context=context).start()
+            self.tls_base_url = "https://{}:{}".format(*self.runner.addresses[1][:2])
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if not await self.config.embeddings.wait(self.rng):
+            return _error(503, "fake embeddings error")
+        inputs = body["input"]
+        if isinstance(inputs, (str, int)) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or FULL_VECTOR_DIM
+        data = []
+        for index, text in enumerate(inputs):
+            # トークン列で送られた場合も、内容ごとに決まるベクトルにする
+            vector = fake_embedding(json.dumps(text, ensure_ascii=False), dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        return web.json_response(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if not await self.config.chat.wait(self.rng):
+            return _error(503, "fake chat error")
+        prompt = body["messages"][-1]["content"]
+        group = "rags" if '"rags"配列' in prompt else "llms"
+        content = json.dumps(fake_items(group, self.config.items), ensure_ascii=False)
+        completion = {
+            "id": "chatcmpl-benchmark",
+            "created": int(time.time()),
+            "model": body.get("model"),
+        }
+        # toolsが渡された場合は、最初の関数の呼び出しとして引数にJSONを返す
+        tools = body.get("tools") or []
+        function_name = tools[0]["function"]["name"] if tools else None
+        finish_reason = "tool_calls" if function_name else "stop"
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": content}
+            if function_name:
+                message = {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": "call_benchmark",
+                            "type": "function",
+                            "function": {"name": function_name, "arguments": content},
+                        }
+                    ],
+                }
+            return web.json_response(
+                {
+                    **completion,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": message,
+                            "finish_reason": finish_reason,
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": len(prompt),
+                        "completion_tokens": len(content),
+                        "total_tokens": len(prompt) + len(content),
+                    },
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        try:
+            await response.prepare(request)
+            if function_name:
+                delta = {
+                    "role": "assistant",
+                    "tool_calls": [
+                        {
+                            "index": 0,
+                            "id": "call_benchmark",
+                            "type": "function",
+                            "function": {"name": function_name, "arguments": ""},
+                        }
+                    ],
+                }
+                await self._send_chunk(response, completion, delta, None)
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                piece = content[start : start + STREAM_CHUNK_CHARS]
+                delta = {"content": piece}
+                if function_name:
+                    delta = {
+                        "tool_calls": [{"index": 0, "function": {"arguments": piece}}]
+                    }
+                await self._send_chunk(response, completion, delta, None)
+                await asyncio.sleep(STREAM_CHUNK_SECONDS)
+            await self._send_chunk(response, completion, {}, finish_reason)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # 呼び出し側が生成を取り消して切断した
+            pass
+        return response
+
+    @staticmethod
+    async def _send_chunk(
+        response: web.StreamResponse,
+        completion: dict,
+        delta: dict,
+        finish_reason: Optional[str],
+    ) -> None:
+        chunk = {
+            **completion,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        data = json.dumps(chunk, ensure_ascii=False)
+        await response.write(f"data: {data}\n\n".encode("utf-8"))
+
+    async def search(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if not await self.config.search.wait(self.rng):
+            return _error(503, "fake search error")
+        top = min(body.get("top") or 50, self.config.search_results)
+        return web.json_response(
+            {
+                "value": [
+                    {
+                        "@search.score": round(0.9 - i * 0.01, 4),
+                        "id": f"benchmark-{i}",
+                        "content": f"ベンチマーク用の参考事例{i + 1}",
+                        "metadata": json.dumps(
+                            {
+                                "hazard": f"参考事例の危険性{i + 1}",
+                                "risk_mitigation": f"参考事例の低減措置{i + 1}",
+                                "file_name": FAKE_FILE_NAME,
+                            },
+                            ensure_ascii=False,
+                        ),
+                    }
+                    for i in range(top)
+                ]
+            }
+        )
+
+    async def get_index(self, request: web.Request) -> web.Response:
+        """AzureSearchの生成時に存在確認されるインデックスの定義"""
+        name = request.match_info["name"].strip("()'/")
+        return web.json_response(
+            {
+                "name": name,
+                "fields": [
+                    {"name": "id", "type": "Edm.String", "key": True},
+                    {"name": "content", "type": "Edm.String", "searchable": True},
+                    {"name": "metadata", "type": "Edm.String"},
+                ],
+            }
+        )
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                key: value
+                for key, value in asdict(endpoint).items()
+                if key in ("requests", "errors")
+            }
+            for name, endpoint in (
+                ("embeddings", self.config.embeddings),
+                ("chat", self.config.chat),
+                ("search", self.config.search),
+            )
+        }
@@ -0,0 +1,66 @@
+# app/tools/ingest_knowledge.py
+"""
+サーバー上のナレッジファイル（PDF / CSV / XLSX）をまとめて取り込む。
+
+    python -m app.tools.ingest_knowledge /data/assessments
+    python -m app.tools.ingest_knowledge --resume <job_id>
+
+ディレクトリは再帰的に走査する。取り込み済みの内容のファイルは--forceを付けない限り読み飛ばし、
+中断したジョブは--resumeでファイルごとのチェックポイントから再開する
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.db.db import async_engine
+from app.services.client_registry import client_registry
+from app.usecases.ingest_usecase import IngestUseCase, shutdown_extract_pool
+
+
+async def run(paths, force: bool, resume: str) -> dict:
+    usecase = IngestUseCase()
+    if resume:
+        job_id = resume
+    else:
+        job = usecase.create_job_from_paths(paths, force)
+        job_id = job["job_id"]
+        print(f"ジョブ {job_id}: {len(job['files'])}ファイル")
+    await client_registry.startup()
+    try:
+        return await usecase.run_job(job_id)
+    finally:
+        shutdown_extract_pool()
+        await client_registry.shutdown()
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument(
+        "--force", action="store_true", help="取り込み済みでも再登録する"
+    )
+    parser.add_argument("--resume", help="再開するジョブID")
+    args = parser.parse_args()
+    if not args.paths and not args.resume:
+        parser.error("取り込むファイルかディレクトリ、または--resumeを指定してください")
+
+    started = time.perf_counter()
+    job = asyncio.run(run(args.paths, args.force, args.resume))
+    for file in job["files"]:
+        print(
+            f"{file['status']:>9} {file['upserted']:>7}/{file['records']:<7} "
+            f"{file['file_name']} {file['error'] or ''}"
+        )
+    print(
+        json.dumps(
+            {k: job[k] for k in ("job_id", "status", "records", "upserted")},
+            ensure_ascii=False,
+        )
+    )
+    print(f"{time.perf_counter() - started:.1f}秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# app/tools/rebuild_risk_summary.py
+"""
+リスク集計表（risk_metrics_summary）をrisk_assessmentsから作り直す。
+
+    python -m app.tools.rebuild_risk_summary
+    python -m app.tools.rebuild_risk_summary --user-id 3
+
+PostgreSQLでは集計表はトリガーで更新されるため通常は不要。
+トリガーのないSQLiteの開発環境や、集計表を修復したいときに使う
+"""
+import argparse
+import asyncio
+
+from app.db.db import AsyncSessionLocal, async_engine
+from app.repositories.analytics_repository import AnalyticsRepository
+
+
+async def run(user_id) -> int:
+    try:
+        async with AsyncSessionLocal() as db:
+            return await AnalyticsRepository(db).rebuild_summary(user_id)
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--user-id", type=int, help="対象のユーザー（省略時は全ユーザー）"
+    )
+    args = parser.parse_args()
+    rows = asyncio.run(run(args.user_id))
+    print(f"集計表を{rows}行で作り直しました")
+
+
+if __name__ == "__main__":
+    main()
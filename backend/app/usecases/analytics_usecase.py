@@ -0,0 +1,116 @@
+# app/usecases/analytics_usecase.py
+from collections import Counter
+from typing import List
+
+from app.db.models.risk_assessment import HIGH_RISK_LEVELS, RISK_LEVEL_THRESHOLDS
+from app.db.schema.analytics import (
+    RiskDashboard,
+    RiskLevelCount,
+    RiskMatrixCell,
+    RiskMetrics,
+    SankeyLink,
+)
+from app.repositories.analytics_repository import AnalyticsRepository
+
+# フロントエンドのRISK_LEVEL_COLORSと同じ
+RISK_LEVEL_COLORS = {
+    "IV": "#ef4444",
+    "III": "#f97316",
+    "II": "#eab308",
+    "I": "#22c55e",
+}
+RISK_LEVELS = tuple(level for level, _ in reversed(RISK_LEVEL_THRESHOLDS))
+
+
+def _rate(numerator: float, denominator: float) -> float:
+    return round(numerator / denominator * 100, 2) if denominator else 0.0
+
+
+class AnalyticsUseCase:
+    """ダッシュボード用のリスク集計（計算はフロントエンドのrisk-calculations.tsに合わせる）"""
+
+    def __init__(self, analytics_repo: AnalyticsRepository):
+        self.analytics_repo = analytics_repo
+
+    @staticmethod
+    def _metrics(totals: list) -> RiskMetrics:
+        before = Counter()
+        after = Counter()
+        score_sum = score_after_sum = 0
+        for row in totals:
+            before[row.risk_level] += row.count
+            after[row.risk_level_after] += row.count
+            score_sum += row.risk_score_sum
+            score_after_sum += row.risk_score_after_sum
+        total = sum(before.values())
+        high = sum(before[level] for level in HIGH_RISK_LEVELS)
+        high_after = sum(after[level] for level in HIGH_RISK_LEVELS)
+        return RiskMetrics(
+            total_risks=total,
+            high_risks=high,
+            medium_risks=before["II"],
+            low_risks=before["I"],
+            average_risk_score=round(score_sum / total, 2) if total else 0.0,
+            average_risk_score_after=(
+                round(score_after_sum / total, 2) if total else 0.0
+            ),
+            # 高リスク（III・IV）の減少率
+            improvement_rate=_rate(high - high_after, high),
+            risk_reduction_rate=_rate(score_sum - score_after_sum, score_sum),
+        )
+
+    @staticmethod
+    def _levels(totals: list, after: bool) -> List[RiskLevelCount]:
+        counts = Counter()
+        for row in totals:
+            counts[row.risk_level_after if after else row.risk_level] += row.count
+        return [
+            RiskLevelCount(
+                level=level, count=counts[level], color=RISK_LEVEL_COLORS[level]
+            )
+            for level in RISK_LEVELS
+        ]
+
+    @staticmethod
+    def _sankey(flows: list) -> List[SankeyLink]:
+        links = Counter()
+        for row in flows:
+            links[(f"対策前 {row.risk_level}", row.measure_type)] += row.count
+            links[(row.measure_type, f"対策後 {row.risk_level_after}")] += row.count
+        return [
+            SankeyLink(source=source, target=target, value=value)
+            for (source, target), value in links.items()
+        ]
+
+    async def get_metrics(self, user_id: int) -> RiskMetrics:
+        return self._metrics(await self.analytics_repo.level_totals(user_id))
+
+    async def get_risk_levels(
+        self, user_id: int, after: bool = False
+    ) -> List[RiskLevelCount]:
+        return self._levels(await self.analytics_repo.level_totals(user_id), after)
+
+    async def get_risk_matrix(
+        self, user_id: int, after: bool = False
+    ) -> List[RiskMatrixCell]:
+        rows = await self.analytics_repo.matrix(user_id, after)
+        return [
+            RiskMatrixCell(
+                severity=row.severity, probability=row.probability, count=row.count
+            )
+            for row in rows
+        ]
+
+    async def get_sankey(self, user_id: int) -> List[SankeyLink]:
+        return self._sankey(await self.analytics_repo.flows(user_id))
+
+    async def get_dashboard(self, user_id: int) -> RiskDashboard:
+        totals = await self.analytics_repo.level_totals(user_id)
+        return RiskDashboard(
+            metrics=self._metrics(totals),
+            risk_levels=self._levels(totals, after=False),
+            risk_levels_after=self._levels(totals, after=True),
+            risk_matrix=await self.get_risk_matrix(user_id),
+            risk_matrix_after=await self.get_risk_matrix(user_id, after=True),
+            sankey=await self.get_sankey(user_id),
+        )
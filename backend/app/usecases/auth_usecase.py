@@ -4,6 +4,7 @@ from app.db.schema.user import UserInfo, UserCreate
 from app.db.schema.auth import LoginRequest, LoginResponse, TokenData
 from app.repositories.user_repository import UserRepository
 from app.services.auth_service import AuthService # REVOKED_ACCESS_TOKENS, REVOKED_REFRESH_TOKENS は削除された
+from app.services.password_hasher import password_hasher
 from app.db.models import User
 from typing import Optional
 import httpx
@@ -18,12 +19,16 @@ class AuthUseCase:
     def __init__(self, user_repo: UserRepository):
         self.user_repo = user_repo
 
-    def login(self, name: str, password: str, response: Response) -> LoginResponse:
+    async def login(self, name: str, password: str, response: Response) -> LoginResponse:
         """
         アクセストークンとリフレッシュトークンをCookieに設定
         """
-        user = self.user_repo.get_user_by_name(name)
-        if not user or not user.hashed_password or not AuthService.verify_password(password, user.hashed_password):
+        user = await self.user_repo.get_user_by_name(name)
+        valid, new_hash = False, None
+        if user and user.hashed_password:
+            # bcryptはプロセスプールで検証し、イベントループを止めない
+            valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect name or password",
@@ -36,6 +41,10 @@ class AuthUseCase:
                 detail="Inactive user"
             )
 
+        if new_hash:
+            # BCRYPT_ROUNDSが変わっていれば、新しいコストのハッシュに置き換える
+            await self.user_repo.update_user(user, hashed_password=new_hash)
+
         access_token = AuthService.create_access_token(data={"sub": str(user.id)})
         refresh_token = AuthService.create_refresh_token(data={"sub": str(user.id)})
 
@@ -43,7 +52,7 @@ class AuthUseCase:
 
         return LoginResponse(message="Login successful")
     
-    def refresh_tokens(self, request: Request, response: Response) -> LoginResponse:
+    async def refresh_tokens(self, request: Request, response: Response) -> LoginResponse:
         """
         新しいアクセストークンとリフレッシュトークン
         """
@@ -71,7 +80,7 @@ class AuthUseCase:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        user = self.user_repo.get_user_by_id(int(user_id))
+        user = await self.user_repo.get_user_by_id(int(user_id))
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
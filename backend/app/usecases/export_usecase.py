@@ -0,0 +1,157 @@
+# app/usecases/export_usecase.py
+import codecs
+import os
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Callable, Optional, Sequence
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.db.db import AsyncSessionLocal
+from app.db.schema.user import ADMIN_ROLE, UserInfo
+from app.repositories.history_repository import HistoryRepository
+from app.repositories.risk_assessment_repository import RiskAssessmentRepository
+from app.services.spreadsheet import XlsxStreamWriter, csv_bytes
+
+# エクスポートの設定（サーバー側カーソルから1回に読む件数）
+EXPORT_PARTITION_ROWS = int(os.getenv("EXPORT_PARTITION_ROWS", "1000"))
+EXPORT_READ_BYTES = 1024 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+HISTORY_EXPORT_HEADERS = (
+    "ID",
+    "ユーザーID",
+    "種別",
+    "タイトル",
+    "説明",
+    "内容",
+    "作成日",
+    "更新日",
+)
+# フロントエンドのExcel出力と同じ列名（取り込みにもそのまま使える）
+RISK_ASSESSMENT_EXPORT_HEADERS = (
+    "ID",
+    "作業",
+    "作業要素",
+    "使用ナレッジファイル名",
+    "参照",
+    "危険性・有害性",
+    "リスク低減措置",
+    "対策分類",
+    "重篤度",
+    "発生確率",
+    "暴露頻度",
+    "リスク点数",
+    "リスクレベル",
+    "低減後重篤度",
+    "低減後発生確率",
+    "低減後暴露頻度",
+    "低減後リスク点数",
+    "低減後リスクレベル",
+    "作成日",
+    "更新日",
+    "ユーザーID",
+)
+
+
+def export_headers(name: str, format: str) -> dict:
+    """ダウンロード用のContent-Disposition（例: histories_20250101_120000.csv）"""
+    file_name = f"{name}_{datetime.now():%Y%m%d_%H%M%S}.{format}"
+    return {"Content-Disposition": f'attachment; filename="{file_name}"'}
+
+
+async def _stream_csv(
+    header: Sequence[str], partitions: AsyncIterator[list]
+) -> AsyncIterator[bytes]:
+    # ExcelでUTF-8として開けるようBOMを付ける
+    yield codecs.BOM_UTF8 + csv_bytes([header])
+    async for partition in partitions:
+        yield csv_bytes(partition)
+
+
+async def _stream_xlsx(
+    header: Sequence[str], partitions: AsyncIterator[list]
+) -> AsyncIterator[bytes]:
+    # XLSXはzipのため、全行を書き終えてから一時ファイルを先頭から送る
+    writer = XlsxStreamWriter(header)
+    async for partition in partitions:
+        await run_in_threadpool(writer.append, partition)
+    with tempfile.TemporaryFile() as file:
+        await run_in_threadpool(writer.save, file)
+        file.seek(0)
+        while chunk := await run_in_threadpool(file.read, EXPORT_READ_BYTES):
+            yield chunk
+
+
+class ExportUseCase:
+    """
+    履歴・リスクアセスメントのCSV / XLSXエクスポート。
+    サーバー側カーソルからEXPORT_PARTITION_ROWS件ずつ読んで書き出すため、
+    件数が増えてもメモリは一定
+    """
+
+    def __init__(self, current_user: UserInfo):
+        self.current_user = current_user
+
+    def _resolve_user_id(self, user_id: Optional[int]) -> Optional[int]:
+        """管理者は任意のユーザー（省略時は全ユーザー）、それ以外は自分の分だけ"""
+        if self.current_user.role == ADMIN_ROLE:
+            return user_id
+        if user_id is not None and user_id != self.current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="他のユーザーのデータはエクスポートできません",
+            )
+        return self.current_user.id
+
+    @staticmethod
+    async def _stream(
+        format: str,
+        header: Sequence[str],
+        open_partitions: Callable,
+    ) -> AsyncIterator[bytes]:
+        # レスポンスの送信中もカーソルを開いておくため、リクエストとは別のセッションを使う
+        async with AsyncSessionLocal() as db:
+            partitions = open_partitions(db)
+            stream = _stream_csv if format == "csv" else _stream_xlsx
+            async for chunk in stream(header, partitions):
+                yield chunk
+
+    def export_histories(
+        self,
+        format: str,
+        user_id: Optional[int] = None,
+        type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        user_id = self._resolve_user_id(user_id)
+        return self._stream(
+            format,
+            HISTORY_EXPORT_HEADERS,
+            lambda db: HistoryRepository(db).stream_export(
+                EXPORT_PARTITION_ROWS, user_id, type, created_from, created_to
+            ),
+        )
+
+    def export_risk_assessments(
+        self,
+        format: str,
+        user_id: Optional[int] = None,
+        measure_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        user_id = self._resolve_user_id(user_id)
+        return self._stream(
+            format,
+            RISK_ASSESSMENT_EXPORT_HEADERS,
+            lambda db: RiskAssessmentRepository(db).stream_export(
+                EXPORT_PARTITION_ROWS, user_id, measure_type, created_from, created_to
+            ),
+        )
@@ -0,0 +1,104 @@
+# app/usecases/history_usecase.py
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.db.schema.history import HistoryDetail, HistoryPage, HistorySummary
+from app.repositories.history_repository import HistoryRepository
+
+HISTORY_PAGE_DEFAULT_LIMIT = 20
+HISTORY_PAGE_MAX_LIMIT = 100
+HISTORY_SEARCH_MAX_LENGTH = 100
+HISTORY_SEARCH_MAX_TERMS = 5
+
+
+def encode_cursor(created_at: datetime, history_id: int) -> str:
+    """ページ末尾の(created_at, id)を不透明なカーソル文字列にする"""
+    raw = json.dumps({"c": created_at.isoformat(), "i": history_id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="cursorが不正です"
+        )
+
+
+def search_ngrams(terms: List[str]) -> List[str]:
+    """
+    検索語のn-gram。DBのhistory_ngrams()と同じく小文字化し、
+    1文字の語はその文字、2文字以上の語は2文字ずつの組を使う
+    """
+    grams = set()
+    for term in terms:
+        term = term.lower()
+        if len(term) == 1:
+            grams.add(term)
+        grams.update(term[i : i + 2] for i in range(len(term) - 1))
+    return sorted(grams)
+
+
+class HistoryUseCase:
+    def __init__(self, history_repo: HistoryRepository):
+        self.history_repo = history_repo
+
+    async def list_histories(
+        self,
+        user_id: int,
+        limit: int = HISTORY_PAGE_DEFAULT_LIMIT,
+        type: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> HistoryPage:
+        """
+        履歴を新しい順にlimit件返す。
+        OFFSETを使わないため、何ページ目でもインデックスを辿る件数は変わらない
+        """
+        before = decode_cursor(cursor) if cursor else None
+        # 次のページの有無を知るため1件多く読む
+        rows = await self.history_repo.list_summaries(user_id, limit + 1, type, before)
+        return self._page(rows, limit)
+
+    async def search_histories(
+        self,
+        user_id: int,
+        q: str,
+        limit: int = HISTORY_PAGE_DEFAULT_LIMIT,
+        type: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> HistoryPage:
+        """qを空白で区切った語をすべて含む履歴を新しい順に返す"""
+        terms = list(dict.fromkeys(q.split()))
+        if not terms or len(terms) > HISTORY_SEARCH_MAX_TERMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"検索語は1〜{HISTORY_SEARCH_MAX_TERMS}個で指定してください",
+            )
+        before = decode_cursor(cursor) if cursor else None
+        rows = await self.history_repo.search_summaries(
+            user_id, terms, search_ngrams(terms), limit + 1, type, before
+        )
+        return self._page(rows, limit)
+
+    @staticmethod
+    def _page(rows: list, limit: int) -> HistoryPage:
+        items = [HistorySummary.model_validate(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and items[-1].created_at is not None:
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        return HistoryPage(items=items, next_cursor=next_cursor)
+
+    async def get_history(self, user_id: int, history_id: int) -> HistoryDetail:
+        history = await self.history_repo.get_by_id(user_id, history_id)
+        if history is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="History not found"
+            )
+        return HistoryDetail.model_validate(history)
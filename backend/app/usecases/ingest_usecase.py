@@ -0,0 +1,319 @@
+# app/usecases/ingest_usecase.py
+import asyncio
+import copy
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.db.schema.ingest import IngestJob
+from app.repositories.ingest_repository import IngestRepository
+from app.services.client_registry import client_registry
+from app.services.knowledge_extractor import SUPPORTED_EXTENSIONS, extract_records
+from app.services.knowledge_index import KnowledgeIndexService
+from app.services.rag_result_cache import rag_result_cache
+
+# ナレッジ取り込みの設定
+RAG_INGEST_DIR = os.getenv("RAG_INGEST_DIR", "/tmp/daiichi-ingest")
+RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", "4"))
+RAG_INGEST_FILE_CONCURRENCY = int(os.getenv("RAG_INGEST_FILE_CONCURRENCY", "4"))
+RAG_INGEST_EMBED_BATCH_SIZE = int(os.getenv("RAG_INGEST_EMBED_BATCH_SIZE", "512"))
+# Azure AI Searchの1リクエストの上限（16MB）に収まる件数
+RAG_INGEST_UPSERT_PAGE_SIZE = int(os.getenv("RAG_INGEST_UPSERT_PAGE_SIZE", "200"))
+RAG_INGEST_UPSERT_CONCURRENCY = int(os.getenv("RAG_INGEST_UPSERT_CONCURRENCY", "4"))
+RAG_INGEST_MAX_FILE_BYTES = int(
+    os.getenv("RAG_INGEST_MAX_FILE_BYTES", str(100 * 1024 * 1024))
+)
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+# 実行中のジョブ（同じジョブを二重に実行しないため）
+_running: Dict[str, asyncio.Task] = {}
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """テキスト抽出用のプロセスプール（初回利用時に生成）"""
+    global _pool
+    if _pool is None:
+        # イベントループのスレッドを引き継がないようspawnで起動
+        _pool = ProcessPoolExecutor(
+            max_workers=RAG_INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_extract_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _unique(entries: List[dict]) -> List[dict]:
+    """同じ内容のファイルは1回だけ取り込む"""
+    unique: Dict[str, dict] = {}
+    for entry in entries:
+        unique.setdefault(entry["sha256"], entry)
+    return list(unique.values())
+
+
+class IngestUseCase:
+    """
+    ナレッジファイルの一括取り込み。
+    抽出はプロセスプール、埋め込みは大きなバッチ、登録はページ単位の並行upsertで行い、
+    ファイルごとのチェックポイントから再開できる
+    """
+
+    def __init__(self, repository: Optional[IngestRepository] = None):
+        self.repository = repository or IngestRepository(RAG_INGEST_DIR)
+
+    async def create_job_from_uploads(
+        self, files: List[UploadFile], force: bool = False
+    ) -> dict:
+        if not files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ファイルが指定されていません",
+            )
+        for file in files:
+            self._check_extension(file.filename or "")
+
+        entries = []
+        for file in files:
+            try:
+                entries.append(
+                    await run_in_threadpool(
+                        self.repository.save_upload,
+                        file.file,
+                        os.path.basename(file.filename),
+                        RAG_INGEST_MAX_FILE_BYTES,
+                    )
+                )
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=str(e),
+                )
+        job = await run_in_threadpool(
+            self.repository.create_job, _unique(entries), force
+        )
+        self.start(job["job_id"])
+        return await run_in_threadpool(self.describe, job)
+
+    def create_job_from_paths(self, paths: List[str], force: bool = False) -> dict:
+        """サーバー上のファイル・ディレクトリから取り込みジョブを作る（CLI用）"""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(
+                        os.path.join(root, name)
+                        for name in sorted(names)
+                        if name.lower().endswith(SUPPORTED_EXTENSIONS)
+                    )
+            else:
+                self._check_extension(path)
+                files.append(path)
+        entries = [self.repository.register_local_file(path) for path in files]
+        return self.repository.create_job(_unique(entries), force)
+
+    def get_job(self, job_id: str) -> dict:
+        job = self.repository.get_job(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ジョブが見つかりません",
+            )
+        return self.describe(job)
+
+    async def resume(self, job_id: str) -> dict:
+        """中断・失敗したジョブをチェックポイントから再開"""
+        job = await run_in_threadpool(self.get_job, job_id)
+        self.start(job_id)
+        return job
+
+    def start(self, job_id: str) -> None:
+        """ジョブをバックグラウンドで実行（実行中なら何もしない）"""
+        task = _running.get(job_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self.run_job(job_id))
+        _running[job_id] = task
+        task.add_done_callback(lambda _: _running.pop(job_id, None))
+
+    async def run_job(self, job_id: str) -> dict:
+        job = await run_in_threadpool(self.repository.get_job, job_id)
+        job["status"] = "running"
+        job["error"] = None
+        await self._save_job(job)
+
+        semaphore = asyncio.Semaphore(RAG_INGEST_FILE_CONCURRENCY)
+
+        async def ingest(entry: dict) -> int:
+            async with semaphore:
+                return await self._ingest_file(job, entry)
+
+        outcomes = await asyncio.gather(
+            *[ingest(entry) for entry in job["files"]], return_exceptions=True
+        )
+        upserted = sum(o for o in outcomes if isinstance(o, int))
+        if upserted:
+            # ナレッジが変わったため、古い検索結果に基づくRAG回答を破棄する。
+            # 世代番号はDBで共有するため、CLIでの取り込みでも全APIワーカーのキャッシュが無効になる
+            try:
+                await rag_result_cache.invalidate()
+            except Exception:
+                logger.exception(
+                    "RAG結果キャッシュを無効化できませんでした"
+                    "（/api/v1/rag/cache/invalidateで破棄してください）"
+                )
+
+        errors = [o for o in outcomes if isinstance(o, BaseException)]
+        job["status"] = "failed" if errors else "completed"
+        job["error"] = f"{len(errors)}件のファイルで失敗しました" if errors else None
+        await self._save_job(job)
+        return await run_in_threadpool(self.describe, job)
+
+    async def _ingest_file(self, job: dict, entry: dict) -> int:
+        """1ファイルの抽出→埋め込み→登録。登録済みの件数までチェックポイントに記録する"""
+        repository = self.repository
+        sha256 = entry["sha256"]
+        checkpoint = await run_in_threadpool(repository.get_checkpoint, sha256)
+        # forceは各ファイルの初回実行時だけ効かせ、再開時は途中から続ける
+        reset = job["force"] and not entry.get("started")
+        if checkpoint and checkpoint["status"] == "done" and not reset:
+            entry["skipped"] = not entry.get("started")
+            return 0
+        entry["started"] = True
+        entry["skipped"] = False
+        await self._save_job(job)
+        if checkpoint is None or reset:
+            checkpoint = {
+                "sha256": sha256,
+                "file_name": entry["file_name"],
+                "status": "pending",
+                "records": 0,
+                "upserted": 0,
+                "error": None,
+            }
+
+        try:
+            if checkpoint["status"] == "pending" or not await run_in_threadpool(
+                repository.has_records, sha256
+            ):
+                records = await asyncio.get_running_loop().run_in_executor(
+                    get_extract_pool(),
+                    extract_records,
+                    entry["path"],
+                    entry["file_name"],
+                )
+                await run_in_threadpool(repository.save_records, sha256, records)
+                checkpoint.update(status="extracted", records=len(records), upserted=0)
+                await run_in_threadpool(repository.save_checkpoint, checkpoint)
+            else:
+                records = await run_in_threadpool(repository.load_records, sha256)
+
+            upserted = await self._index_records(records, checkpoint)
+            checkpoint.update(status="done", error=None)
+            await run_in_threadpool(repository.save_checkpoint, checkpoint)
+            await run_in_threadpool(repository.remove_upload, entry["path"])
+            return upserted
+        except Exception as e:
+            checkpoint.update(status="failed", error=str(e))
+            await run_in_threadpool(repository.save_checkpoint, checkpoint)
+            raise
+
+    async def _index_records(self, records: List[dict], checkpoint: dict) -> int:
+        """
+        埋め込みはキャッシュを通さずバッチ単位で次のバッチを先行して生成し、
+        登録は各バッチをページに分けて並行に送る
+        """
+        offset = start_offset = checkpoint["upserted"]
+        batch_size = RAG_INGEST_EMBED_BATCH_SIZE
+        upsert_semaphore = asyncio.Semaphore(RAG_INGEST_UPSERT_CONCURRENCY)
+
+        async def upsert(page: List[dict], vectors) -> None:
+            async with upsert_semaphore:
+                await KnowledgeIndexService.upsert(page, vectors)
+
+        def embed(batch: List[dict]) -> "asyncio.Task":
+            return asyncio.create_task(
+                client_registry.embeddings.aembed_arrays_uncached(
+                    [record["content"] for record in batch]
+                )
+            )
+
+        next_embedding = embed(records[offset : offset + batch_size])
+        try:
+            while offset < len(records):
+                batch = records[offset : offset + batch_size]
+                vectors = await next_embedding
+                if offset + batch_size < len(records):
+                    next_embedding = embed(
+                        records[offset + batch_size : offset + 2 * batch_size]
+                    )
+                page_size = RAG_INGEST_UPSERT_PAGE_SIZE
+                await asyncio.gather(
+                    *[
+                        upsert(batch[i : i + page_size], vectors[i : i + page_size])
+                        for i in range(0, len(batch), page_size)
+                    ]
+                )
+                offset += len(batch)
+                checkpoint["upserted"] = offset
+                await run_in_threadpool(self.repository.save_checkpoint, checkpoint)
+        finally:
+            if not next_embedding.done():
+                next_embedding.cancel()
+        return offset - start_offset
+
+    async def _save_job(self, job: dict) -> None:
+        # 並行実行中のファイル処理が書き換えないよう、複製を書き込む
+        await run_in_threadpool(self.repository.save_job, copy.deepcopy(job))
+
+    def describe(self, job: dict) -> dict:
+        """
+        ジョブとファイルごとのチェックポイントをまとめたレスポンス。
+        チェックポイントをファイルから読むため、非同期処理からはスレッドプールで呼ぶ
+        """
+        files = []
+        for entry in job["files"]:
+            checkpoint = self.repository.get_checkpoint(entry["sha256"]) or {}
+            file_status = checkpoint.get("status", "pending")
+            if entry.get("skipped"):
+                file_status = "skipped"
+            files.append(
+                {
+                    "file_name": entry["file_name"],
+                    "sha256": entry["sha256"],
+                    "size": entry["size"],
+                    "status": file_status,
+                    "records": checkpoint.get("records", 0),
+                    "upserted": checkpoint.get("upserted", 0),
+                    "error": checkpoint.get("error"),
+                }
+            )
+        return IngestJob(
+            job_id=job["job_id"],
+            status=job["status"],
+            force=job["force"],
+            files=files,
+            records=sum(f["records"] for f in files),
+            upserted=sum(f["upserted"] for f in files),
+            error=job["error"],
+            created_at=job["created_at"],
+            updated_at=job["updated_at"],
+        ).model_dump()
+
+    def _check_extension(self, file_name: str) -> None:
+        if not file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"未対応のファイル形式です: {file_name}（PDF・CSV・XLSXのみ）",
+            )
@@ -0,0 +1,385 @@
+# app/usecases/rag_prompt.py
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+
+from app.services.embedding_cache import normalize_text
+
+# プロンプト組み立ての設定
+RAG_PROMPT_EXAMPLE_TOKEN_BUDGET = int(
+    os.getenv("RAG_PROMPT_EXAMPLE_TOKEN_BUDGET", "1500")
+)
+RAG_PROMPT_DEDUP_THRESHOLD = float(os.getenv("RAG_PROMPT_DEDUP_THRESHOLD", "0.85"))
+
+MEASURE_TYPES = ["設計時対策", "工学的対策", "管理的対策", "個人用保護具"]
+LLM_FILE_NAME = "LLMによる生成"
+
+OUTPUT_EXAMPLE = """{
+  "%(group)s": [
+    {
+      "危険性・有害性": "...",
+      "リスク低減措置": "...",
+      "対策分類": "...",
+      "使用ナレッジファイル名": "%(file_name)s"
+    },
+    ...
+  ]
+}"""
+
+# プロンプトは「固定の指示 → リクエストごとの可変部分」の順に並べ、
+# OpenAIのプロンプトキャッシュ（前方一致）が効くようにする
+RAGS_INSTRUCTIONS = f"""
+次の作業と作業要素について、「新たに想定される危険性・有害性」と「リスク低減措置」を
+下記の「参考事例」を必ず参考にして5件、"rags"配列として構造化して出力してください。
+各組には必ず「もっとも関連性の高い（類似度スコアが高い）ナレッジファイル名」を1つ選び、
+「使用ナレッジファイル名」として記載してください。
+ただし、危険性・有害性とリスク低減措置については体言止めを用いず、全て文章形式で出力してください。
+
+配列の順番は1件目から順に昇順で並べてください。
+
+出力例：
+{OUTPUT_EXAMPLE % {"group": "rags", "file_name": "..."}}
+"""
+
+LLMS_INSTRUCTIONS = f"""
+次の作業と作業要素について、「新たに想定される危険性・有害性」と「リスク低減措置」を
+あなた自身の知識と推論のみで5件、"llms"配列として構造化して出力してください。
+「使用ナレッジファイル名」には「{LLM_FILE_NAME}」と記載してください。
+ただし、危険性・有害性とリスク低減措置については体言止めを用いず、全て文章形式で出力してください。
+
+配列の順番は1件目から順に昇順で並べてください。
+
+出力例：
+{OUTPUT_EXAMPLE % {"group": "llms", "file_name": LLM_FILE_NAME}}
+"""
+
+
+def build_input_text(task: str, element: str) -> str:
+    return f"""
+作業名: {task}
+この作業に含まれる作業要素の一例として「{element}」があります。
+"""
+
+
+def collect_file_names(docs: List[Document]) -> List[str]:
+    # 検索順を保って重複を除く（関数定義のキャッシュが効くよう順序を安定させる）
+    return list(
+        dict.fromkeys(
+            doc.metadata.get("file_name")
+            for doc in docs
+            if doc.metadata.get("file_name")
+        )
+    )[:10]
+
+
+def format_example(number: int, doc: Document) -> str:
+    return f"{number}. 危険性: {doc.metadata.get('hazard')}\n   リスク低減措置: {doc.metadata.get('risk_mitigation')}\n   ファイル名: {doc.metadata.get('file_name')}"
+
+
+def _risk_items_schema(description: str, file_names: Tuple[str, ...]) -> dict:
+    return {
+        "type": "array",
+        "description": description,
+        "items": {
+            "type": "object",
+            "properties": {
+                "危険性・有害性": {"type": "string"},
+                "リスク低減措置": {"type": "string"},
+                "対策分類": {
+                    "type": "string",
+                    "enum": MEASURE_TYPES,
+                },
+                "使用ナレッジファイル名": {
+                    "type": "string",
+                    "enum": list(file_names),
+                },
+            },
+            "required": [
+                "危険性・有害性",
+                "リスク低減措置",
+                "対策分類",
+                "使用ナレッジファイル名",
+            ],
+        },
+        "maxItems": 5,
+    }
+
+
+def _function_def(group: str, description: str, items_schema: dict) -> list:
+    return [
+        {
+            "name": f"output_safety_risks_and_controls_{group}",
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {group: items_schema},
+                "required": [group],
+            },
+        }
+    ]
+
+
+@lru_cache(maxsize=512)
+def _rags_function_def(file_names: Tuple[str, ...]) -> list:
+    return _function_def(
+        "rags",
+        "参考事例を元にした危険性・有害性・リスク低減措置・対策分類・使用ナレッジファイル名を返す",
+        _risk_items_schema(
+            "参考事例を元にした危険性・有害性等の配列（最大5件）", file_names
+        ),
+    )
+
+
+def build_rags_function_def(file_names: List[str]) -> list:
+    """ファイル名の組み合わせごとにキャッシュした関数定義（呼び出し側で変更しないこと）"""
+    return _rags_function_def(tuple(file_names))
+
+
+@lru_cache(maxsize=1)
+def build_llms_function_def() -> list:
+    """固定の関数定義（呼び出し側で変更しないこと）"""
+    return _function_def(
+        "llms",
+        "LLM自身の知識による危険性・有害性・リスク低減措置・対策分類を返す",
+        _risk_items_schema(
+            "LLMによる生成の危険性・有害性等の配列（最大5件）", (LLM_FILE_NAME,)
+        ),
+    )
+
+
+def build_rags_prompt(task: str, element: str, examples: str) -> str:
+    return f"""{RAGS_INSTRUCTIONS}
+# 作業: {task}
+# 作業要素: {element}
+
+【参考事例】
+{examples}
+
+出力は必ず上記JSON形式（オブジェクトで"rags"配列を持つ）でお願いします。
+"""
+
+
+def build_llms_prompt(task: str, element: str) -> str:
+    return f"""{LLMS_INSTRUCTIONS}
+# 作業: {task}
+# 作業要素: {element}
+
+出力は必ず上記JSON形式（オブジェクトで"llms"配列を持つ）でお願いします。
+"""
+
+
+class TokenCounter:
+    """
+    tiktokenによるローカルのトークン数計測。
+    エンコーディングを取得できない環境では文字数で概算する
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        try:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # BPEファイルをダウンロードできない環境など
+            self._encoding = None
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return len(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:max_tokens]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self._encoding.decode(tokens[:max_tokens])
+
+
+_token_counters: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(model: str) -> TokenCounter:
+    """モデルごとにTokenCounterを1つだけ生成して共有"""
+    counter = _token_counters.get(model)
+    if counter is None:
+        counter = _token_counters.setdefault(model, TokenCounter(model))
+    return counter
+
+
+def _shingles(text: str) -> set:
+    text = normalize_text(text).replace(" ", "")
+    if len(text) < 2:
+        return {text}
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def dedupe_examples(
+    docs: List[Document], threshold: float = RAG_PROMPT_DEDUP_THRESHOLD
+) -> List[Document]:
+    """
+    危険性・リスク低減措置がほぼ同じ参考事例を除く（文字bigramのJaccard係数）。
+    検索スコア順に並んでいる前提で、先に出た事例を残す
+    """
+    kept: List[Tuple[Document, set]] = []
+    for doc in docs:
+        shingles = _shingles(
+            f"{doc.metadata.get('hazard') or ''} {doc.metadata.get('risk_mitigation') or ''}"
+        )
+        if any(_similarity(shingles, other) >= threshold for _, other in kept):
+            continue
+        kept.append((doc, shingles))
+    return [doc for doc, _ in kept]
+
+
+@dataclass
+class BuiltPrompt:
+    """組み立てたプロンプトと、そのトークン数の内訳"""
+
+    group: str
+    text: str
+    function_def: list
+    prompt_tokens: int
+    examples_retrieved: int = 0
+    examples_deduplicated: int = 0
+    examples_included: int = 0
+    example_tokens: int = 0
+    file_names: List[str] = field(default_factory=list)
+
+    def stats(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "examples_retrieved": self.examples_retrieved,
+            "examples_deduplicated": self.examples_deduplicated,
+            "examples_included": self.examples_included,
+            "example_tokens": self.example_tokens,
+        }
+
+
+@dataclass
+class PromptStats:
+    prompts: int = 0
+    prompt_tokens: int = 0
+    example_tokens: int = 0
+    examples_retrieved: int = 0
+    examples_deduplicated: int = 0
+    examples_truncated: int = 0
+
+
+class PromptBuilder:
+    """
+    トークン予算つきのプロンプト組み立て。
+    参考事例は重複を除いたうえでスコア順に予算内に収まるまで詰める
+    """
+
+    def __init__(
+        self,
+        model: str,
+        example_token_budget: int = RAG_PROMPT_EXAMPLE_TOKEN_BUDGET,
+        dedup_threshold: float = RAG_PROMPT_DEDUP_THRESHOLD,
+    ):
+        self.counter = get_token_counter(model)
+        self.example_token_budget = example_token_budget
+        self.dedup_threshold = dedup_threshold
+
+    def build_rags(self, task: str, element: str, docs: List[Document]) -> BuiltPrompt:
+        docs = docs[:10]
+        unique_docs = dedupe_examples(docs, self.dedup_threshold)
+        lines: List[str] = []
+        included: List[Document] = []
+        example_tokens = 0
+        for doc in unique_docs:
+            line = format_example(len(lines) + 1, doc)
+            tokens = self.counter.count(line) + 1
+            if example_tokens + tokens > self.example_token_budget:
+                if not lines:
+                    # 1件目だけで予算を超える場合は切り詰めて採用
+                    line = self.counter.truncate(line, self.example_token_budget)
+                    lines.append(line)
+                    included.append(doc)
+                    example_tokens = self.counter.count(line)
+                break
+            lines.append(line)
+            included.append(doc)
+            example_tokens += tokens
+
+        file_names = collect_file_names(included)
+        text = build_rags_prompt(task, element, "\n".join(lines))
+        built = BuiltPrompt(
+            group="rags",
+            text=text,
+            function_def=build_rags_function_def(file_names),
+            prompt_tokens=self.counter.count(text),
+            examples_retrieved=len(docs),
+            examples_deduplicated=len(docs) - len(unique_docs),
+            examples_included=len(included),
+            example_tokens=example_tokens,
+            file_names=file_names,
+        )
+        _record(built)
+        return built
+
+    def build_llms(self, task: str, element: str) -> BuiltPrompt:
+        text = build_llms_prompt(task, element)
+        built = BuiltPrompt(
+            group="llms",
+            text=text,
+            function_def=build_llms_function_def(),
+            prompt_tokens=self.counter.count(text),
+        )
+        _record(built)
+        return built
+
+
+prompt_stats = PromptStats()
+_stats_lock = threading.Lock()
+
+
+def _record(built: BuiltPrompt) -> None:
+    with _stats_lock:
+        prompt_stats.prompts += 1
+        prompt_stats.prompt_tokens += built.prompt_tokens
+        prompt_stats.example_tokens += built.example_tokens
+        prompt_stats.examples_retrieved += built.examples_retrieved
+        prompt_stats.examples_deduplicated += built.examples_deduplicated
+        prompt_stats.examples_truncated += (
+            built.examples_retrieved
+            - built.examples_deduplicated
+            - built.examples_included
+        )
+
+
+def get_prompt_stats() -> dict:
+    """組み立てたプロンプトのトークン数の累計"""
+    data = asdict(prompt_stats)
+    data["avg_prompt_tokens"] = (
+        prompt_stats.prompt_tokens / prompt_stats.prompts
+        if prompt_stats.prompts
+        else 0.0
+    )
+    data["example_token_budget"] = RAG_PROMPT_EXAMPLE_TOKEN_BUDGET
+    # Falseのモデルは文字数による概算
+    data["exact_token_count"] = {
+        model: counter.exact for model, counter in _token_counters.items()
+    }
+    return data
@@ -0,0 +1,74 @@
+# app/usecases/rag_stream_parser.py
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class IncrementalItemParser:
+    """
+    LLMのストリーミング出力から {"rags": [...], "llms": [...]} の各要素を、
+    オブジェクトが閉じた時点で1件ずつ取り出すインクリメンタルJSONパーサ
+    """
+
+    def __init__(self, groups: Iterable[str] = ("rags", "llms")):
+        self.groups = set(groups)
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._group: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._counts: Dict[str, int] = {}
+
+    def feed(self, text: str) -> List[Tuple[str, int, dict]]:
+        """受け取ったテキストを走査し、完成した (グループ名, 番号, 要素) を返す"""
+        self.buffer += text
+        items = []
+        buffer = self.buffer
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = buffer[self._string_start + 1 : self._pos]
+            elif not self._stack and ch != "{":
+                # ```json などJSON本体より前の文字は読み飛ばす
+                pass
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch in "{[":
+                if ch == "[" and self._stack == ["{"]:
+                    self._group = self._last_key
+                if ch == "{" and self._stack == ["{", "["]:
+                    self._item_start = self._pos
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._stack == ["{", "["]:
+                    item = self._load_item(buffer[self._item_start : self._pos + 1])
+                    if item is not None and self._group in self.groups:
+                        index = self._counts.get(self._group, 0)
+                        self._counts[self._group] = index + 1
+                        items.append((self._group, index, item))
+                    self._item_start = None
+                elif ch == "]" and self._stack == ["{"]:
+                    self._group = None
+            self._pos += 1
+        return items
+
+    @staticmethod
+    def _load_item(text: str) -> Optional[dict]:
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return None
+        return item if isinstance(item, dict) else None
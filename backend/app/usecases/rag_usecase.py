@@ -0,0 +1,537 @@
+# app/usecases/rag_usecase.py
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+
+from app.db.schema.rag import RAGRequest, RAGResult
+from app.services.client_registry import CHAT_MODEL, VECTOR_DIM
+from app.services.history_writer import history_writer
+from app.services.rag_metrics import (
+    RAG_LLM_FIRST_TOKEN_SECONDS,
+    RAG_PROMPT_EXAMPLES,
+    observe_completion,
+    observe_parse,
+    observe_prompt,
+    stage,
+)
+from app.services.rag_result_cache import rag_result_cache, with_cache_info
+from app.services.rag_service import RAGService
+from app.services.singleflight import rag_singleflight
+from app.usecases.rag_prompt import (
+    BuiltPrompt,
+    PromptBuilder,
+    build_input_text,
+    get_token_counter,
+)
+from app.usecases.rag_stream_parser import IncrementalItemParser
+
+# 一括RAGの設定
+RAG_BATCH_MAX_ITEMS = int(os.getenv("RAG_BATCH_MAX_ITEMS", "100"))
+RAG_BATCH_LLM_CONCURRENCY = int(os.getenv("RAG_BATCH_LLM_CONCURRENCY", "8"))
+# rags（参考事例ベース）/ llms（LLMの知識のみ）それぞれの生成に使うモデル
+RAG_RAGS_MODEL = os.getenv("RAG_RAGS_MODEL", CHAT_MODEL)
+RAG_LLMS_MODEL = os.getenv("RAG_LLMS_MODEL", CHAT_MODEL)
+
+NO_DOCS_RESULT = {"message": "類似事例が見つかりませんでした。", "results": []}
+# histories.typeに記録する種別
+HISTORY_TYPE_RAG = "rag"
+# レスポンスにだけ付け、履歴には残さないキー（キャッシュ利用・プロンプトの内訳）
+RESPONSE_ONLY_KEYS = ("cache", "prompt_stats")
+
+
+def warm_up_token_counters() -> None:
+    """トークナイザーの読み込み（初回はファイル取得が走るため起動時に済ませる）"""
+    for model in (RAG_RAGS_MODEL, RAG_LLMS_MODEL):
+        get_token_counter(model)
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Server-Sent Eventsの1イベント分の文字列"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def merge_results(rags_response: str, llms_response: str) -> Optional[dict]:
+    """rags・llmsそれぞれの生成結果を1つのレスポンスにまとめる"""
+    try:
+        rags = json.loads(rags_response)
+        llms = json.loads(llms_response)
+    except ValueError:
+        return None
+    return {"rags": _pick(rags, "rags"), "llms": _pick(llms, "llms")}
+
+
+def parse_result(rags_response: str, llms_response: str) -> Optional[dict]:
+    """まとめた結果をRAGResultで検証する（JSON・スキーマが不正ならNone）"""
+    merged = merge_results(rags_response, llms_response)
+    if merged is None:
+        return None
+    try:
+        return RAGResult.model_validate(merged).model_dump(by_alias=True)
+    except ValidationError:
+        return None
+
+
+def with_prompt_stats(result: dict, rags: BuiltPrompt, llms: BuiltPrompt) -> dict:
+    """新規生成したレスポンスにプロンプトのトークン数の内訳を付与"""
+    return {**result, "prompt_stats": {"rags": rags.stats(), "llms": llms.stats()}}
+
+
+def _pick(parsed, group: str) -> list:
+    if isinstance(parsed, list):
+        return parsed
+    if isinstance(parsed, dict):
+        return parsed.get(group) or []
+    return []
+
+
+class RAGUseCase:
+    """
+    危険性・有害性の生成は2回のLLM呼び出しに分ける。
+    完全一致・近似一致のキャッシュに無ければ、参考事例を使わないllmsは検索と同時に開始し、
+    ragsは検索完了後に開始する
+    """
+
+    def __init__(self, user_id: Optional[int] = None):
+        # 結果を履歴に残すユーザー（Noneなら記録しない）
+        self.user_id = user_id
+
+    async def run(self, task: str, element: str) -> dict:
+        """
+        作業・作業要素から危険性・有害性とリスク低減措置を生成
+        """
+        task, element = self._validate(task, element)
+        index_version = await rag_result_cache.refresh_version()
+        # 同じ入力・モデル・インデックス世代の処理が実行中なら、その結果を共有する
+        flight_key = rag_result_cache.make_key(
+            task,
+            element,
+            RAG_RAGS_MODEL,
+            RAG_LLMS_MODEL,
+            str(index_version),
+        )
+        result, _ = await rag_singleflight.do(
+            flight_key, lambda: self._run(task, element)
+        )
+        await self._record(task, element, result)
+        return result
+
+    async def _run(self, task: str, element: str) -> dict:
+
+        # 1. 完全一致のキャッシュ
+        cache_key = rag_result_cache.make_key(task, element)
+        index_version = rag_result_cache.index_version
+        entry = rag_result_cache.get_exact(cache_key)
+        if entry is not None:
+            return with_cache_info(entry.result, "exact", entry)
+
+        input_text = build_input_text(task, element)
+        [embedding] = await RAGService.get_openai_embeddings([input_text])
+        return await self._run_with_embedding(
+            task, element, input_text, cache_key, embedding, index_version
+        )
+
+    async def run_batch(self, requests: List[RAGRequest]) -> dict:
+        """
+        複数の作業要素をまとめて処理する。
+        埋め込みは1回のAPI呼び出しにまとめ、検索は並行、LLM呼び出しは同時実行数を制限して並行実行。
+        結果・エラーはリクエストの順番で返す
+        """
+        if not requests:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="リクエストが空です",
+            )
+        if len(requests) > RAG_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"一度に処理できるのは{RAG_BATCH_MAX_ITEMS}件までです",
+            )
+
+        results: List[Optional[dict]] = [None] * len(requests)
+        index_version = await rag_result_cache.refresh_version()
+        # 同じ(作業, 作業要素)は1回だけ処理し、結果を共有する
+        pending: Dict[str, List[int]] = {}
+        inputs: Dict[str, Tuple[str, str]] = {}
+
+        for i, req in enumerate(requests):
+            try:
+                task, element = self._validate(req.task, req.element)
+            except HTTPException as e:
+                results[i] = _batch_error(i, e.status_code, e.detail)
+                continue
+            cache_key = rag_result_cache.make_key(task, element)
+            if cache_key in pending:
+                pending[cache_key].append(i)
+                continue
+            entry = rag_result_cache.get_exact(cache_key)
+            if entry is not None:
+                results[i] = _batch_ok(i, with_cache_info(entry.result, "exact", entry))
+                continue
+            pending[cache_key] = [i]
+            inputs[cache_key] = (task, element)
+
+        if pending:
+            cache_keys = list(pending)
+            input_texts = [build_input_text(*inputs[key]) for key in cache_keys]
+            llm_semaphore = asyncio.Semaphore(RAG_BATCH_LLM_CONCURRENCY)
+            try:
+                embeddings = await RAGService.get_openai_embeddings(input_texts)
+            except Exception as e:
+                outcomes = [e] * len(cache_keys)
+            else:
+                outcomes = await asyncio.gather(
+                    *[
+                        self._run_with_embedding(
+                            *inputs[key],
+                            input_text,
+                            key,
+                            embedding,
+                            index_version,
+                            llm_semaphore=llm_semaphore,
+                        )
+                        for key, input_text, embedding in zip(
+                            cache_keys, input_texts, embeddings
+                        )
+                    ],
+                    return_exceptions=True,
+                )
+
+            for key, outcome in zip(cache_keys, outcomes):
+                for i in pending[key]:
+                    if isinstance(outcome, HTTPException):
+                        results[i] = _batch_error(
+                            i, outcome.status_code, outcome.detail
+                        )
+                    elif isinstance(outcome, BaseException):
+                        results[i] = _batch_error(
+                            i,
+                            status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            f"RAG処理に失敗しました: {outcome}",
+                        )
+                    else:
+                        results[i] = _batch_ok(i, outcome)
+
+        for req, result in zip(requests, results):
+            if result["status"] == "ok":
+                await self._record(
+                    req.task.strip(), req.element.strip(), result["result"]
+                )
+
+        failed = sum(1 for result in results if result["status"] == "error")
+        return {
+            "count": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
+
+    async def run_stream(self, task: str, element: str) -> AsyncIterator[str]:
+        """
+        ストリーミング版のRAG。入力チェックはストリーム開始前に行い、
+        以降はSSEイベントのイテレータを返す
+        """
+        task, element = self._validate(task, element)
+        return self._stream(task, element)
+
+    async def _stream(self, task: str, element: str) -> AsyncIterator[str]:
+        """
+        token: LLM出力の断片 / item: 閉じたrags・llmsの要素 /
+        result: 検証済みの最終結果 / error: エラー の各イベントを送る。
+        llmsは検索の完了を待たずに流し始める
+        """
+        try:
+            cache_key = rag_result_cache.make_key(task, element)
+            index_version = await rag_result_cache.refresh_version()
+            entry = rag_result_cache.get_exact(cache_key)
+            if entry is not None:
+                result = with_cache_info(entry.result, "exact", entry)
+                await self._record(task, element, result)
+                for event in _cached_events(result):
+                    yield event
+                return
+
+            input_text = build_input_text(task, element)
+            [embedding] = await RAGService.get_openai_embeddings([input_text])
+            self._check_embedding(embedding)
+            similar = rag_result_cache.get_similar(embedding)
+            if similar is not None:
+                entry, similarity = similar
+                result = with_cache_info(entry.result, "semantic", entry, similarity)
+                await self._record(task, element, result)
+                for event in _cached_events(result):
+                    yield event
+                return
+
+            # 課金されるllmsの生成はキャッシュに無いと分かってから、検索と並行して始める
+            queue: asyncio.Queue = asyncio.Queue()
+            with stage("build_prompt"):
+                llms_prompt = PromptBuilder(RAG_LLMS_MODEL).build_llms(task, element)
+            llms_task = asyncio.create_task(
+                _produce(
+                    queue,
+                    self._stream_group(queue, llms_prompt, RAG_LLMS_MODEL),
+                )
+            )
+            rags_task = asyncio.create_task(
+                _produce(queue, self._stream_rags(queue, task, element, input_text))
+            )
+            try:
+                responses: Dict[str, str] = {}
+                prompts: Dict[str, BuiltPrompt] = {}
+                while len(responses) < 2:
+                    kind, payload = await queue.get()
+                    if kind == "failed":
+                        raise payload
+                    if kind == "done":
+                        built, buffer = payload
+                        responses[built.group] = buffer
+                        prompts[built.group] = built
+                    elif kind == "no_docs":
+                        yield format_sse("result", NO_DOCS_RESULT)
+                        return
+                    else:
+                        yield format_sse(kind, payload)
+            finally:
+                _discard(llms_task)
+                _discard(rags_task)
+
+            with stage("parse"):
+                result = parse_result(responses["rags"], responses["llms"])
+            observe_parse(result is not None)
+            if result is None:
+                yield format_sse(
+                    "result",
+                    {"raw_response": _join_raw(responses["rags"], responses["llms"])},
+                )
+                return
+
+            rag_result_cache.put(cache_key, embedding, result, index_version)
+            result = with_cache_info(
+                with_prompt_stats(result, prompts["rags"], prompts["llms"])
+            )
+            await self._record(task, element, result)
+            yield format_sse("result", result)
+        except HTTPException as e:
+            yield format_sse(
+                "error", {"status_code": e.status_code, "detail": e.detail}
+            )
+        except Exception as e:
+            yield format_sse(
+                "error",
+                {
+                    "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "detail": f"RAG処理に失敗しました: {e}",
+                },
+            )
+
+    async def _stream_rags(
+        self, queue: asyncio.Queue, task: str, element: str, input_text: str
+    ) -> None:
+        """検索→ragsの生成をキューに流す"""
+        rags_prompt = await self._build_generation(task, element, input_text)
+        if rags_prompt is None:
+            await queue.put(("no_docs", None))
+            return
+        await self._stream_group(queue, rags_prompt, RAG_RAGS_MODEL)
+
+    async def _stream_group(
+        self,
+        queue: asyncio.Queue,
+        built: BuiltPrompt,
+        model: str,
+    ) -> None:
+        group = built.group
+        parser = IncrementalItemParser(groups=(group,))
+        observe_prompt(group, built.prompt_tokens)
+        started = time.perf_counter()
+        first_token = True
+        with stage(f"llm_{group}"):
+            async for token in RAGService.stream_chatgpt_with_function_calling(
+                built.text, built.function_def, model
+            ):
+                if first_token:
+                    first_token = False
+                    RAG_LLM_FIRST_TOKEN_SECONDS.labels(group=group).observe(
+                        time.perf_counter() - started
+                    )
+                await queue.put(("token", {"group": group, "text": token}))
+                for item_group, index, item in parser.feed(token):
+                    await queue.put(
+                        ("item", {"group": item_group, "index": index, "item": item})
+                    )
+        observe_completion(group, get_token_counter(model).count(parser.buffer))
+        await queue.put(("done", (built, parser.buffer)))
+
+    async def _run_with_embedding(
+        self,
+        task: str,
+        element: str,
+        input_text: str,
+        cache_key: str,
+        embedding: np.ndarray,
+        index_version: int,
+        llm_semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> dict:
+        self._check_embedding(embedding)
+
+        # 2. 入力埋め込みのコサイン類似度による近似一致のキャッシュ
+        # （埋め込みはEmbeddingCacheに載るため、続くベクトル検索では再計算されない）
+        similar = rag_result_cache.get_similar(embedding)
+        if similar is not None:
+            entry, similarity = similar
+            return with_cache_info(entry.result, "semantic", entry, similarity)
+
+        # 課金されるllmsの生成はキャッシュに無いと分かってから、検索と並行して始める
+        llms_task = asyncio.create_task(
+            self._generate_llms(task, element, llm_semaphore=llm_semaphore)
+        )
+        try:
+            rags_prompt = await self._build_generation(task, element, input_text)
+            if rags_prompt is None:
+                return NO_DOCS_RESULT
+
+            rags_response = await self._call_llm(
+                rags_prompt, RAG_RAGS_MODEL, llm_semaphore
+            )
+            llms_response, llms_prompt = await llms_task
+        finally:
+            _discard(llms_task)
+
+        with stage("parse"):
+            result = parse_result(rags_response, llms_response)
+        observe_parse(result is not None)
+        if result is None:
+            return {"raw_response": _join_raw(rags_response, llms_response)}
+
+        rag_result_cache.put(cache_key, embedding, result, index_version)
+        return with_cache_info(with_prompt_stats(result, rags_prompt, llms_prompt))
+
+    async def _generate_llms(
+        self,
+        task: str,
+        element: str,
+        llm_semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Tuple[str, BuiltPrompt]:
+        """参考事例を使わないllmsの生成（検索結果を待たずに実行できる）"""
+        with stage("build_prompt"):
+            built = PromptBuilder(RAG_LLMS_MODEL).build_llms(task, element)
+        response = await self._call_llm(built, RAG_LLMS_MODEL, llm_semaphore)
+        return response, built
+
+    async def _call_llm(
+        self,
+        built: BuiltPrompt,
+        model: str,
+        llm_semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> str:
+        if llm_semaphore is None:
+            return await self._generate(built, model)
+        async with llm_semaphore:
+            return await self._generate(built, model)
+
+    async def _generate(self, built: BuiltPrompt, model: str) -> str:
+        """LLM呼び出し（所要時間にはセマフォの待ち時間を含めない）"""
+        observe_prompt(built.group, built.prompt_tokens)
+        with stage(f"llm_{built.group}"):
+            response = await RAGService.call_chatgpt_with_function_calling(
+                built.text, built.function_def, model
+            )
+        observe_completion(built.group, get_token_counter(model).count(response))
+        return response
+
+    async def _build_generation(
+        self, task: str, element: str, input_text: str
+    ) -> Optional[BuiltPrompt]:
+        """
+        類似事例を検索し、ragsの生成に渡すプロンプトと関数定義を組み立てる。
+        参考事例は重複を除き、トークン予算内に収める
+        """
+        docs = await RAGService.search_azure_vector(input_text)
+
+        if not docs:
+            return None
+
+        with stage("build_prompt"):
+            built = PromptBuilder(RAG_RAGS_MODEL).build_rags(task, element, docs)
+        RAG_PROMPT_EXAMPLES.observe(built.examples_included)
+        return built
+
+    async def _record(self, task: str, element: str, result: dict) -> None:
+        """生成結果を履歴に積む（書き込みはHistoryWriterがまとめて行う）"""
+        if self.user_id is None or "raw_response" in result:
+            return
+        await history_writer.enqueue(
+            {
+                "user_id": self.user_id,
+                "type": HISTORY_TYPE_RAG,
+                "title": task[:200],
+                "description": element,
+                "content": {
+                    key: value
+                    for key, value in result.items()
+                    if key not in RESPONSE_ONLY_KEYS
+                },
+            }
+        )
+
+    def _check_embedding(self, embedding: np.ndarray) -> None:
+        if embedding.size != VECTOR_DIM:
+            raise HTTPException(status_code=500, detail="埋め込み生成に失敗しました")
+
+    def _validate(self, task: str, element: str) -> Tuple[str, str]:
+        task = task.strip()
+        element = element.strip()
+        if not task or not element:
+            raise HTTPException(status_code=400, detail="task/elementが未入力です")
+        return task, element
+
+
+async def _produce(queue: asyncio.Queue, coro):
+    """キューへの書き込み側タスク。例外はキュー経由で読み出し側に伝える"""
+    try:
+        return await coro
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await queue.put(("failed", e))
+
+
+def _discard(task: asyncio.Task) -> None:
+    """不要になったタスクを取り消し、未回収の例外警告を出さないようにする"""
+    if not task.done():
+        task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def _join_raw(rags_response: str, llms_response: str) -> str:
+    return f"{rags_response}\n{llms_response}"
+
+
+def _cached_events(result: dict) -> List[str]:
+    """キャッシュ済みの結果を、ストリーミング時と同じイベント列で返す"""
+    events = []
+    for group in ("rags", "llms"):
+        for index, item in enumerate(result.get(group) or []):
+            events.append(
+                format_sse("item", {"group": group, "index": index, "item": item})
+            )
+    events.append(format_sse("result", result))
+    return events
+
+
+def _batch_ok(index: int, result: dict) -> dict:
+    return {"index": index, "status": "ok", "result": result}
+
+
+def _batch_error(index: int, status_code: int, detail: str) -> dict:
+    return {
+        "index": index,
+        "status": "error",
+        "error": {"status_code": status_code, "detail": detail},
+    }
@@ -0,0 +1,178 @@
+# app/usecases/risk_assessment_usecase.py
+import asyncio
+import os
+import time
+from typing import Iterator, List, Sequence
+
+from fastapi import HTTPException, UploadFile, status
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.db.schema.risk_assessment import (
+    ImportRowError,
+    RiskAssessmentImportResult,
+    RiskAssessmentRow,
+)
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.risk_assessment_repository import (
+    COPY_COLUMNS,
+    RiskAssessmentRepository,
+)
+from app.services.spreadsheet import SPREADSHEET_EXTENSIONS, iter_rows
+
+# リスクアセスメント取り込みの設定
+RISK_IMPORT_CHUNK_ROWS = int(os.getenv("RISK_IMPORT_CHUNK_ROWS", "5000"))
+# レスポンスに含める行エラーの上限（件数は上限を超えても数える）
+RISK_IMPORT_MAX_ERRORS = int(os.getenv("RISK_IMPORT_MAX_ERRORS", "1000"))
+RISK_IMPORT_MAX_FILE_BYTES = int(
+    os.getenv("RISK_IMPORT_MAX_FILE_BYTES", str(100 * 1024 * 1024))
+)
+
+# 列名 → フィールド名
+IMPORT_HEADERS = {
+    field.alias: name for name, field in RiskAssessmentRow.model_fields.items()
+}
+REQUIRED_HEADERS = [
+    field.alias
+    for field in RiskAssessmentRow.model_fields.values()
+    if field.is_required()
+]
+RECORD_FIELDS = COPY_COLUMNS[1:]
+
+
+class ImportReport:
+    """取り込み件数と行エラー（保持するエラーは上限まで）"""
+
+    def __init__(self, max_errors: int = RISK_IMPORT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.total_rows = 0
+        self.rejected = 0
+        self.errors: List[ImportRowError] = []
+
+    def reject(self, row: int, messages: List[str]) -> None:
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(ImportRowError(row=row, errors=messages))
+
+
+def _format_errors(error: ValidationError) -> List[str]:
+    return [
+        f"{e['loc'][0]}: {e['msg']}" if e["loc"] else e["msg"] for e in error.errors()
+    ]
+
+
+def iter_record_chunks(
+    rows: Iterator[Sequence],
+    user_id: int,
+    report: ImportReport,
+    chunk_rows: int = RISK_IMPORT_CHUNK_ROWS,
+) -> Iterator[List[tuple]]:
+    """
+    ヘッダー行の列名で列を対応づけて1行ずつ検証し、
+    通った行をCOPY_COLUMNSの順のタプルにしてchunk_rows件ずつ返す
+    """
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("ファイルが空です")
+    columns = [
+        (index, str(name).strip())
+        for index, name in enumerate(header)
+        if name is not None and str(name).strip() in IMPORT_HEADERS
+    ]
+    found = {name for _, name in columns}
+    missing = [name for name in REQUIRED_HEADERS if name not in found]
+    if missing:
+        raise ValueError(f"必須の列がありません: {'、'.join(missing)}")
+
+    validate = RiskAssessmentRow.model_validate
+    chunk = []
+    for number, row in enumerate(rows, start=2):
+        values = {
+            name: row[index]
+            for index, name in columns
+            if index < len(row) and row[index] not in (None, "")
+        }
+        if not values:
+            continue
+        report.total_rows += 1
+        try:
+            item = validate(values)
+        except ValidationError as e:
+            report.reject(number, _format_errors(e))
+            continue
+        chunk.append((user_id, *(getattr(item, name) for name in RECORD_FIELDS)))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RiskAssessmentUseCase:
+    def __init__(self, risk_assessment_repo: RiskAssessmentRepository):
+        self.risk_assessment_repo = risk_assessment_repo
+
+    async def import_file(
+        self, user_id: int, file: UploadFile
+    ) -> RiskAssessmentImportResult:
+        """
+        CSV・XLSXを1行ずつ検証し、RISK_IMPORT_CHUNK_ROWS件ずつCOPYで投入する。
+        検証を通らなかった行は取り込まずに行番号とエラーを返す。
+        保持するのは読み込み中と投入中の2チャンクだけなので、メモリはファイルの大きさによらない
+        """
+        file_name = os.path.basename(file.filename or "")
+        if not file_name.lower().endswith(SPREADSHEET_EXTENSIONS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"対応しているファイル形式は{'・'.join(SPREADSHEET_EXTENSIONS)}です",
+            )
+        if file.size is not None and file.size > RISK_IMPORT_MAX_FILE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"ファイルサイズの上限（{RISK_IMPORT_MAX_FILE_BYTES}バイト）を超えています",
+            )
+
+        started = time.perf_counter()
+        report = ImportReport()
+        rows = iter_rows(file.file, file_name)
+        try:
+            imported = await self._copy_chunks(
+                iter_record_chunks(rows, user_id, report)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        finally:
+            rows.close()
+        # 全行を1トランザクションで投入し、途中で失敗した場合は何も残さない
+        await self.risk_assessment_repo.commit()
+        if not self.risk_assessment_repo.is_postgresql:
+            # 集計表を更新するトリガーはPostgreSQLにしかない
+            await AnalyticsRepository(self.risk_assessment_repo.db).rebuild_summary(
+                user_id
+            )
+        return RiskAssessmentImportResult(
+            file_name=file_name,
+            total_rows=report.total_rows,
+            imported=imported,
+            rejected=report.rejected,
+            errors=report.errors,
+            errors_truncated=report.rejected > len(report.errors),
+            seconds=round(time.perf_counter() - started, 3),
+        )
+
+    async def _copy_chunks(self, chunks: Iterator[List[tuple]]) -> int:
+        """次のチャンクの読み込み・検証（スレッド）と、今のチャンクのCOPYを並行して行う"""
+        imported = 0
+        pending = asyncio.ensure_future(run_in_threadpool(next, chunks, None))
+        try:
+            while (chunk := await pending) is not None:
+                pending = asyncio.ensure_future(run_in_threadpool(next, chunks, None))
+                imported += await self.risk_assessment_repo.copy_records(chunk)
+        finally:
+            # 読み込み中のスレッドが終わってからジェネレーターを閉じる
+            if not pending.done():
+                await asyncio.wait([pending])
+            if not pending.cancelled():
+                pending.exception()
+            chunks.close()
+        return imported
@@ -6,8 +6,8 @@ class UserUseCase:
     def __init__(self, user_repo: UserRepository):
         self.user_repo = user_repo
 
-    def get_user_info(self, name: str) -> UserInfo:
-        user = self.user_repo.get_user_by_name(name)
+    async def get_user_info(self, name: str) -> UserInfo:
+        user = await self.user_repo.get_user_by_name(name)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -17,4 +17,5 @@ class UserUseCase:
             name=user.name,
             email=user.email,
             is_active=user.is_active,
+            role=user.role,
         )
@@ -0,0 +1,5 @@
+# tests/conftest.py
+import os
+
+# app.db.dbはimport時にエンジンを作るため、DBを使わないテストでもURLが要る
+os.environ.setdefault("DATABASE_URL", "sqlite://")
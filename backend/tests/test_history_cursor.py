@@ -0,0 +1,89 @@
+# tests/test_history_cursor.py
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.usecases.history_usecase import HistoryUseCase, decode_cursor, encode_cursor
+
+JST = timezone(timedelta(hours=9))
+
+
+@pytest.mark.parametrize(
+    "created_at",
+    [
+        datetime(2026, 10, 17, 9, 30, 15, 123456, tzinfo=timezone.utc),
+        datetime(2026, 1, 1, tzinfo=JST),
+        datetime(2026, 10, 17, 9, 30),
+    ],
+)
+def test_cursor_round_trip(created_at):
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    decoded = decode_cursor(cursor)
+    assert decoded == (created_at, 42)
+    assert decoded[0].tzinfo == created_at.tzinfo
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        "ｶｰｿﾙ",
+        _b64(b"\xff\xfe"),
+        _b64(b"[]"),
+        _b64(b'{"c": "2026-10-17T00:00:00"}'),
+        _b64(b'{"c": "yesterday", "i": 1}'),
+        _b64(b'{"c": 1, "i": 1}'),
+        _b64(b'{"c": "2026-10-17T00:00:00", "i": "x"}'),
+        _b64(b'{"c": "2026-10-17T00:00:00", "i": null}'),
+    ],
+)
+def test_invalid_cursor_is_rejected_with_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
+
+
+class FakeHistoryRepository:
+    """(created_at, id) の降順・タプル比較でページングするlist_summariesの代わり"""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+
+    async def list_summaries(self, user_id, limit, type=None, before=None):
+        rows = [
+            row
+            for row in self.rows
+            if before is None or (row["created_at"], row["id"]) < before
+        ]
+        return rows[:limit]
+
+
+async def test_pages_cover_every_row_once_with_equal_timestamps():
+    base = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    rows = [
+        {
+            "id": i,
+            "type": "rag",
+            "title": f"t{i}",
+            # 3件ずつ同じ時刻にしてidでの順序付けを確かめる
+            "created_at": base + timedelta(seconds=i // 3),
+        }
+        for i in range(1, 24)
+    ]
+    usecase = HistoryUseCase(FakeHistoryRepository(rows))
+    seen, cursor = [], None
+    while True:
+        page = await usecase.list_histories(1, limit=5, cursor=cursor)
+        assert len(page.items) <= 5
+        seen.extend(item.id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == sorted(seen, reverse=True) == list(range(23, 0, -1))
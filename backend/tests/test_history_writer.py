@@ -0,0 +1,99 @@
+# tests/test_history_writer.py
+import asyncio
+
+from app.services.history_writer import HistoryWriter
+
+
+class RecordingWriter(HistoryWriter):
+    """DBの代わりに、書き込んだバッチを記録する"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("enabled", True)
+        super().__init__(**kwargs)
+        self.batches = []
+        self.fail = False
+
+    async def _insert(self, rows):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("insert failed")
+        self.batches.append([row["id"] for row in rows])
+
+
+async def wait_written(writer: HistoryWriter, count: int) -> None:
+    async with asyncio.timeout(2):
+        while writer.counters.written + writer.counters.failed < count:
+            await asyncio.sleep(0.005)
+
+
+async def test_flushes_when_batch_is_full():
+    writer = RecordingWriter(flush_interval_ms=60_000, flush_max_rows=3)
+    await writer.start()
+    for i in range(7):
+        assert await writer.enqueue({"id": i})
+    await wait_written(writer, 6)
+    assert writer.batches == [[0, 1, 2], [3, 4, 5]]
+    await writer.stop()
+    assert writer.batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+async def test_flushes_after_interval():
+    writer = RecordingWriter(flush_interval_ms=50, flush_max_rows=100)
+    await writer.start()
+    await writer.enqueue({"id": 0})
+    await writer.enqueue({"id": 1})
+    await wait_written(writer, 2)
+    assert writer.batches == [[0, 1]]
+    assert writer.counters.flushes == 1
+    await writer.stop()
+
+
+async def test_stop_writes_pending_and_queued_rows():
+    writer = RecordingWriter(flush_interval_ms=60_000, flush_max_rows=2)
+    await writer.start()
+    for i in range(5):
+        await writer.enqueue({"id": i})
+    await writer.stop()
+    assert sorted(i for batch in writer.batches for i in batch) == list(range(5))
+    assert all(len(batch) <= 2 for batch in writer.batches)
+    assert writer.counters.written == 5
+    assert writer.stats()["running"] is False
+    # 停止後は受け付けない
+    assert not await writer.enqueue({"id": 5})
+
+
+async def test_failed_batch_is_counted_and_writer_keeps_running():
+    writer = RecordingWriter(flush_interval_ms=10, flush_max_rows=10)
+    await writer.start()
+    writer.fail = True
+    await writer.enqueue({"id": 0})
+    await wait_written(writer, 1)
+    writer.fail = False
+    await writer.enqueue({"id": 1})
+    await wait_written(writer, 2)
+    await writer.stop()
+    assert writer.counters.failed == 1
+    assert writer.batches == [[1]]
+
+
+async def test_full_queue_drops_after_timeout():
+    writer = RecordingWriter(
+        flush_interval_ms=60_000,
+        flush_max_rows=10,
+        queue_max_size=1,
+        enqueue_timeout_ms=10,
+    )
+    # ライターを起動せずにキューだけ用意し、満杯の状態を作る
+    writer._queue = asyncio.Queue(maxsize=1)
+    assert await writer.enqueue({"id": 0})
+    assert not await writer.enqueue({"id": 1})
+    assert writer.counters.dropped == 1
+    assert writer.counters.backpressure_waits == 1
+
+
+async def test_disabled_writer_does_not_accept_rows():
+    writer = RecordingWriter(enabled=False)
+    await writer.start()
+    assert not await writer.enqueue({"id": 0})
+    await writer.stop()
+    assert writer.batches == []
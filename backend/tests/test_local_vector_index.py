@@ -0,0 +1,102 @@
+# tests/test_local_vector_index.py
+import numpy as np
+import pytest
+
+from app.services.local_vector_index import (
+    LocalVectorIndex,
+    LocalVectorIndexWriter,
+    quantize_binary,
+    quantize_int8,
+)
+
+COUNT = 4000
+DIM = 256
+K = 10
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """クラスタを持つ埋め込み風のベクトルと、既存ベクトルの近くのクエリ"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((40, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), COUNT)] + rng.standard_normal(
+        (COUNT, DIM)
+    ).astype(np.float32)
+    queries = vectors[rng.choice(COUNT, 50, replace=False)] + 0.5 * rng.standard_normal(
+        (50, DIM)
+    ).astype(np.float32)
+    return vectors, queries
+
+
+@pytest.fixture(scope="module")
+def index_dir(corpus, tmp_path_factory):
+    vectors, _ = corpus
+    directory = str(tmp_path_factory.mktemp("index"))
+    writer = LocalVectorIndexWriter(directory, DIM, block_rows=512)
+    writer.add(vectors, [{"hazard": str(i)} for i in range(COUNT)])
+    writer.commit()
+    return directory
+
+
+def recall(index: LocalVectorIndex, exact: LocalVectorIndex, queries) -> float:
+    hits = 0
+    for query in queries:
+        expected = {row for row, _ in exact.search(query, K)}
+        hits += len(expected & {row for row, _ in index.search(query, K)})
+    return hits / (K * len(queries))
+
+
+def test_float32_search_matches_brute_force(corpus, index_dir):
+    vectors, queries = corpus
+    index = LocalVectorIndex.load(index_dir, quantization="none", block_rows=300)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query in queries[:10]:
+        scores = unit @ (query / np.linalg.norm(query))
+        expected = np.argsort(scores)[::-1][:K]
+        result = index.search(query, K)
+        assert [row for row, _ in result] == expected.tolist()
+        assert [score for _, score in result] == pytest.approx(scores[expected])
+
+
+@pytest.mark.parametrize("quantization, minimum", [("int8", 0.99), ("binary", 0.95)])
+def test_quantized_recall_against_float32(corpus, index_dir, quantization, minimum):
+    _, queries = corpus
+    exact = LocalVectorIndex.load(index_dir, quantization="none")
+    index = LocalVectorIndex.load(
+        index_dir, quantization=quantization, rescore_candidates=100, block_rows=512
+    )
+    assert index.scan_bytes < exact.scan_bytes
+    assert recall(index, exact, queries) >= minimum
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_scores_are_rescored_in_float32(corpus, index_dir, quantization):
+    _, queries = corpus
+    exact = LocalVectorIndex.load(index_dir, quantization="none")
+    index = LocalVectorIndex.load(index_dir, quantization=quantization)
+    exact_scores = dict(exact.search(queries[0], 100))
+    for row, score in index.search(queries[0], K):
+        if row in exact_scores:
+            assert score == pytest.approx(exact_scores[row])
+
+
+def test_quantized_files_match_in_memory_quantization(corpus, index_dir):
+    loaded = LocalVectorIndex.load(index_dir, quantization="int8")
+    built = LocalVectorIndex(
+        np.asarray(loaded.vectors), loaded.metadata, quantization="int8"
+    )
+    np.testing.assert_array_equal(loaded._int8, built._int8)
+    np.testing.assert_allclose(loaded._int8_scales, built._int8_scales)
+
+    loaded = LocalVectorIndex.load(index_dir, quantization="binary")
+    np.testing.assert_array_equal(
+        loaded._binary, quantize_binary(np.asarray(loaded.vectors))
+    )
+
+
+def test_int8_round_trip_error_is_small():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((100, DIM)).astype(np.float32)
+    quantized, scales = quantize_int8(vectors)
+    restored = quantized.astype(np.float32) * scales[:, None]
+    assert np.abs(restored - vectors).max() <= scales.max() / 2 + 1e-6
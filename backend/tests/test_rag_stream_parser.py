@@ -0,0 +1,65 @@
+# tests/test_rag_stream_parser.py
+import json
+
+import pytest
+
+from app.usecases.rag_stream_parser import IncrementalItemParser
+
+RESPONSE = json.dumps(
+    {
+        "rags": [
+            {"hazard": "挟まれ {注意}", "reduction": 'カバー "A" を設置'},
+            {"hazard": "転倒", "reduction": "床の整理\\n清掃"},
+        ],
+        "llms": [{"hazard": "墜落", "reduction": "手すり [高さ1m]"}],
+    },
+    ensure_ascii=False,
+)
+EXPECTED = [
+    ("rags", 0, {"hazard": "挟まれ {注意}", "reduction": 'カバー "A" を設置'}),
+    ("rags", 1, {"hazard": "転倒", "reduction": "床の整理\\n清掃"}),
+    ("llms", 0, {"hazard": "墜落", "reduction": "手すり [高さ1m]"}),
+]
+
+
+def feed_chunks(parser: IncrementalItemParser, chunks) -> list:
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(RESPONSE)])
+def test_items_are_independent_of_chunk_boundaries(size):
+    chunks = [RESPONSE[i : i + size] for i in range(0, len(RESPONSE), size)]
+    parser = IncrementalItemParser()
+    assert feed_chunks(parser, chunks) == EXPECTED
+    assert parser.buffer == RESPONSE
+
+
+def test_item_is_emitted_when_its_object_closes():
+    parser = IncrementalItemParser()
+    end = RESPONSE.index("}, ")
+    assert parser.feed(RESPONSE[:end]) == []
+    assert parser.feed("}") == EXPECTED[:1]
+    assert parser.feed(RESPONSE[end + 1 :]) == EXPECTED[1:]
+
+
+def test_split_inside_escaped_quote():
+    text = '{"rags": [{"hazard": "a\\"}b"}]}'
+    split = text.index("\\") + 1
+    parser = IncrementalItemParser()
+    assert parser.feed(text[:split]) == []
+    assert parser.feed(text[split:]) == [("rags", 0, {"hazard": 'a"}b'})]
+
+
+def test_skips_code_fence_and_other_groups():
+    text = '```json\n{"notes": [{"x": 1}], "llms": [{"hazard": "感電"}]}\n```'
+    parser = IncrementalItemParser(groups=("llms",))
+    assert feed_chunks(parser, list(text)) == [("llms", 0, {"hazard": "感電"})]
+
+
+def test_invalid_item_is_dropped():
+    text = '{"rags": [{"hazard": 01}, {"hazard": "火災"}]}'
+    parser = IncrementalItemParser()
+    assert parser.feed(text) == [("rags", 0, {"hazard": "火災"})]
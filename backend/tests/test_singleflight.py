@@ -0,0 +1,119 @@
+# tests/test_singleflight.py
+import asyncio
+
+from app.services.singleflight import SingleFlight
+
+
+class Work:
+    """呼ばれた回数を数え、releaseされるまで結果を返さない処理"""
+
+    def __init__(self, result="done"):
+        self.result = result
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight, work = SingleFlight("test"), Work()
+    calls = [asyncio.create_task(flight.do("k", work)) for _ in range(5)]
+    await settle()
+    work.release.set()
+    results = await asyncio.gather(*calls)
+    assert work.calls == 1
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert {result for result, _ in results} == {"done"}
+    assert flight.stats()["executed"] == 1
+    assert flight.stats()["shared"] == 4
+    assert flight.stats()["inflight"] == 0
+
+
+async def test_exception_is_shared_and_key_is_released():
+    flight, work = SingleFlight("test"), Work(RuntimeError("boom"))
+    calls = [asyncio.create_task(flight.do("k", work)) for _ in range(3)]
+    await settle()
+    work.release.set()
+    outcomes = await asyncio.gather(*calls, return_exceptions=True)
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert work.calls == 1
+
+    retry = Work("ok")
+    retry.release.set()
+    assert await flight.do("k", retry) == ("ok", False)
+
+
+async def test_cancelled_waiter_does_not_cancel_others():
+    flight, work = SingleFlight("test"), Work()
+    leader = asyncio.create_task(flight.do("k", work))
+    follower = asyncio.create_task(flight.do("k", work))
+    await settle()
+
+    leader.cancel()
+    await settle()
+    assert leader.cancelled()
+    assert not work.cancelled
+
+    work.release.set()
+    assert await follower == ("done", True)
+    stats = flight.stats()
+    assert stats["cancelled_waiters"] == 1
+    assert stats["abandoned"] == 0
+
+
+async def test_last_waiter_cancelled_abandons_work():
+    flight, work = SingleFlight("test"), Work()
+    calls = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+    await settle()
+    for call in calls:
+        call.cancel()
+    await settle()
+
+    assert all(call.cancelled() for call in calls)
+    assert work.cancelled
+    stats = flight.stats()
+    assert stats["cancelled_waiters"] == 2
+    assert stats["abandoned"] == 1
+    assert stats["inflight"] == 0
+
+    # 取り消した処理には相乗りせず、新しく実行する
+    fresh = Work("fresh")
+    fresh.release.set()
+    assert await flight.do("k", fresh) == ("fresh", False)
+
+
+async def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    first, second = Work("a"), Work("b")
+    calls = [
+        asyncio.create_task(flight.do("a", first)),
+        asyncio.create_task(flight.do("b", second)),
+    ]
+    await settle()
+    assert flight.stats()["inflight"] == 2
+    first.release.set()
+    second.release.set()
+    assert await asyncio.gather(*calls) == [("a", False), ("b", False)]
+
+
+async def test_disabled_runs_every_call():
+    flight, work = SingleFlight("test", enabled=False), Work()
+    work.release.set()
+    results = await asyncio.gather(*[flight.do("k", work) for _ in range(3)])
+    assert results == [("done", False)] * 3
+    assert work.calls == 3
@@ -0,0 +1,112 @@
+# tests/test_spreadsheet.py
+import io
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.spreadsheet import (
+    XLSX_MAX_CELL_CHARS,
+    XlsxStreamWriter,
+    csv_bytes,
+    format_cell,
+    iter_rows,
+    unescape_cell,
+)
+
+HEADER = ["作業", "危険性・有害性"]
+
+
+def save_xlsx(writer: XlsxStreamWriter) -> io.BytesIO:
+    file = io.BytesIO()
+    writer.save(file)
+    file.seek(0)
+    return file
+
+
+def test_xlsx_rolls_over_to_new_sheet_with_header():
+    writer = XlsxStreamWriter(HEADER, max_rows=4)
+    writer.append([[f"作業{i}", i] for i in range(10)])
+    workbook = load_workbook(save_xlsx(writer), read_only=True)
+    sheets = [list(sheet.iter_rows(values_only=True)) for sheet in workbook]
+    workbook.close()
+
+    # 1シート4行（ヘッダー + 3行）ずつ、最後のシートに残りの1行
+    assert [len(rows) for rows in sheets] == [4, 4, 4, 2]
+    assert all(rows[0] == tuple(HEADER) for rows in sheets)
+    body = [row for rows in sheets for row in rows[1:]]
+    assert body == [(f"作業{i}", i) for i in range(10)]
+
+
+def test_xlsx_does_not_add_empty_sheet_at_exact_limit():
+    writer = XlsxStreamWriter(HEADER, max_rows=4)
+    writer.append([["a", 1]] * 3)
+    workbook = load_workbook(save_xlsx(writer), read_only=True)
+    assert len(workbook.worksheets) == 1
+    workbook.close()
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["=1+1", "+81-3", "-1", "@SUM(A1)", "\tx", "\rx", '=HYPERLINK("x")', "'=1", "''-1"],
+)
+def test_formula_like_text_is_escaped(value):
+    assert format_cell(value) == "'" + value
+    assert unescape_cell(format_cell(value)) == value
+
+
+@pytest.mark.parametrize("value", ["転倒", "'quoted", "a=b", "", 3, -1, None])
+def test_other_values_are_not_escaped(value):
+    assert format_cell(value) == value
+    assert unescape_cell(value) == value
+
+
+def test_format_cell_serializes_dates_and_json():
+    assert format_cell(datetime(2026, 10, 17, 9, 30, 15, 999)) == "2026-10-17 09:30:15"
+    assert format_cell({"rags": ["挟まれ"]}) == '{"rags": ["挟まれ"]}'
+
+
+ROWS = [HEADER, ["=cmd|' /C calc'!A0", "-2"], ["'=keep", "@user"], ["転倒", 5]]
+
+
+def test_csv_round_trip_through_importer():
+    data = csv_bytes(ROWS)
+    assert b"'=cmd" in data and b"'-2" in data
+    assert list(iter_rows(io.BytesIO(data), "export.csv")) == [
+        HEADER,
+        ["=cmd|' /C calc'!A0", "-2"],
+        ["'=keep", "@user"],
+        ["転倒", "5"],
+    ]
+
+
+def test_xlsx_round_trip_through_importer():
+    writer = XlsxStreamWriter(ROWS[0])
+    writer.append(ROWS[1:])
+    file = save_xlsx(writer)
+
+    workbook = load_workbook(file, read_only=True)
+    stored = list(workbook.worksheets[0].iter_rows(values_only=True))
+    workbook.close()
+    assert stored[1] == ("'=cmd|' /C calc'!A0", "'-2")
+
+    file.seek(0)
+    assert list(iter_rows(file, "export.xlsx")) == [list(row) for row in ROWS]
+
+
+def test_xlsx_strips_illegal_characters_and_truncates():
+    writer = XlsxStreamWriter(HEADER)
+    writer.append([["a\x00b\x1fc", "x" * (XLSX_MAX_CELL_CHARS + 10)]])
+    workbook = load_workbook(save_xlsx(writer), read_only=True)
+    row = list(workbook.worksheets[0].iter_rows(values_only=True))[1]
+    workbook.close()
+    assert row[0] == "abc"
+    assert len(row[1]) == XLSX_MAX_CELL_CHARS
+
+
+def test_csv_import_detects_shift_jis():
+    data = "作業,危険性・有害性\n組立,挟まれ\n".encode("cp932")
+    assert list(iter_rows(io.BytesIO(data), "sjis.csv")) == [
+        HEADER,
+        ["組立", "挟まれ"],
+    ]